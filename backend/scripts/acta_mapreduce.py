@@ -0,0 +1,127 @@
+# Resumen por tramos (map-reduce) para transcripciones que no caben en una
+# sola llamada al modelo. Cada tramo se resume en paralelo y una llamada final
+# combina los resúmenes parciales en el formato de acta definitivo.
+import asyncio
+
+from llm_providers import LLMRequest
+from token_budget import count_tokens
+
+DEFAULT_OVERLAP_TOKENS = 200
+DEFAULT_MAP_WORKERS = 4
+
+MAP_SYSTEM_PROMPT = """Eres un asistente experto en actas de asambleas. Vas a recibir un tramo de una transcripción larga de una reunión (parte {index} de {total}). El tramo puede empezar o terminar a mitad de una frase porque se solapa con los tramos vecinos.
+
+Extrae de este tramo, de forma fiel y sin inventar nada:
+- Fecha, hora, lugar y modalidad si se mencionan.
+- Asistentes, cargos, presidente y secretario si se mencionan.
+- Cada tema tratado: quién lo presentó, argumentos del debate y decisión.
+- Acuerdos, con responsables y plazos.
+- Temas pendientes y temas controvertidos.
+
+Escribe un resumen parcial estructurado en pasado narrativo. No redactes introducción, cierre ni firmas: solo el contenido de este tramo."""
+
+MERGE_SYSTEM_PROMPT = """Eres un asistente experto en actas de asambleas. Vas a recibir resúmenes parciales de tramos consecutivos de la misma reunión. Combínalos en un único resumen parcial, en orden, sin perder ningún tema, acuerdo ni pendiente y eliminando las repeticiones causadas por el solapamiento entre tramos."""
+
+REDUCE_INTRO = """La transcripción de esta reunión era demasiado larga y se resumió por tramos consecutivos. A continuación tienes los resúmenes parciales de cada tramo, en orden. Combínalos en una sola acta siguiendo exactamente las instrucciones y el formato indicados, sin perder ningún acuerdo ni pendiente y eliminando las repeticiones causadas por el solapamiento entre tramos."""
+
+def split_windows(text, window_tokens, overlap_tokens=DEFAULT_OVERLAP_TOKENS, model=None):
+    """
+    Divide el texto en tramos de como mucho window_tokens con overlap_tokens
+    de solapamiento. Se corta por palabras porque las transcripciones
+    automáticas no suelen tener puntuación.
+    """
+    words = text.split()
+    if not words:
+        return []
+    total_tokens = count_tokens(text, model)
+    if total_tokens <= window_tokens:
+        return [text.strip()]
+
+    tokens_per_word = max(total_tokens / float(len(words)), 1e-6)
+    window_words = max(1, int(window_tokens / tokens_per_word))
+    overlap_words = min(int(overlap_tokens / tokens_per_word), window_words // 2)
+    step = max(1, window_words - overlap_words)
+
+    windows = []
+    for start in range(0, len(words), step):
+        windows.append(" ".join(words[start:start + window_words]))
+        if start + window_words >= len(words):
+            break
+    return windows
+
+async def _call(provider, system, user, max_tokens):
+    response = await provider.complete(LLMRequest(system, user, max_tokens))
+    return response.text if response else None
+
+async def _merge_partials(provider, partials, budget_tokens, map_max_tokens, model):
+    """
+    Combina los resúmenes parciales por grupos hasta que quepan juntos en
+    budget_tokens, para que la llamada final no exceda el contexto
+    """
+    while len(partials) > 1 and count_tokens("\n\n".join(partials), model) > budget_tokens:
+        groups = []
+        current = []
+        for partial in partials:
+            if current and count_tokens("\n\n".join(current + [partial]), model) > budget_tokens:
+                groups.append(current)
+                current = []
+            current.append(partial)
+        groups.append(current)
+
+        if len(groups) == len(partials):
+            # Ningún par cabe junto; no se puede reducir más
+            break
+
+        print(f"Combinando {len(partials)} resúmenes parciales en {len(groups)} grupos...")
+        async def merge(group):
+            if len(group) == 1:
+                return group[0]
+            return await _call(provider, MERGE_SYSTEM_PROMPT, _numbered(group), map_max_tokens)
+        partials = await asyncio.gather(*(merge(group) for group in groups))
+        if any(not partial for partial in partials):
+            return None
+    return partials
+
+def _numbered(partials):
+    return "\n\n".join(f"### Parte {n}\n\n{partial}" for n, partial in enumerate(partials, 1))
+
+async def map_reduce_acta(provider, system_prompt, transcript, plan, overlap_tokens=DEFAULT_OVERLAP_TOKENS,
+                          final_call=None, on_window=None):
+    """
+    Genera el acta de una transcripción larga por tramos según un BudgetPlan
+    (token_budget.plan_request) con chunked=True. Los tramos se envían a la
+    vez y el proveedor limita cuántas llamadas hay en curso. Devuelve el acta
+    final o None si alguna llamada falla.
+    final_call(system, user, max_tokens) sustituye a la llamada final (por
+    ejemplo para recibirla en streaming) y on_window(index, total) se llama
+    al terminar cada tramo.
+    """
+    model = plan.model
+    window_tokens = plan.window_tokens
+    map_max_tokens = plan.map_max_tokens
+    windows = split_windows(transcript, window_tokens, overlap_tokens, model)
+    total = len(windows)
+    print(f"Transcripción dividida en {total} tramos de hasta {window_tokens} tokens")
+
+    async def summarize(index, window):
+        print(f"Resumiendo tramo {index}/{total}...")
+        partial = await _call(provider, MAP_SYSTEM_PROMPT.format(index=index, total=total), window, map_max_tokens)
+        if on_window is not None and partial:
+            on_window(index, total)
+        return partial
+
+    partials = await asyncio.gather(*(summarize(index, window) for index, window in enumerate(windows, 1)))
+    if any(not partial for partial in partials):
+        print("Error: no se pudieron resumir todos los tramos")
+        return None
+
+    partials = await _merge_partials(provider, list(partials), plan.reduce_tokens, map_max_tokens, model)
+    if not partials:
+        print("Error: no se pudieron combinar los resúmenes parciales")
+        return None
+
+    print("Combinando los resúmenes parciales en el acta final...")
+    user = REDUCE_INTRO + "\n\n" + _numbered(partials)
+    if final_call is not None:
+        return await final_call(system_prompt, user, plan.max_tokens)
+    return await _call(provider, system_prompt, user, plan.max_tokens)
@@ -0,0 +1,345 @@
+# Flujo común de los scripts de actas: leer la transcripción, medir el
+# presupuesto de tokens y generar el acta con un proveedor de llm_providers.
+# Cada script solo configura el proveedor, el prompt y cómo guarda el resultado.
+#
+# En modo streaming el acta se escribe en el archivo de salida a medida que
+# llega y se emiten eventos JSON-lines de progreso (jsonl_worker.emit_event):
+#   {"event": "start", "output": ...}            al empezar la respuesta
+#   {"event": "window", "index": 2, "total": 5}  al resumir cada tramo
+#   {"event": "delta", "text": ..., "chars": N}  por cada fragmento de texto
+#   {"event": "done", "output": ..., "chars": N, "elapsed": s}
+#   {"event": "error", "error": ...}
+#
+# ActaScript reúne el resto del flujo (guardar TXT, JSON y DOCX, el modo
+# --worker y la línea de comandos); process_transcript*.py solo lo configuran.
+import os
+import sys
+import time
+import asyncio
+import argparse
+import unicodedata
+
+from acta_mapreduce import DEFAULT_MAP_WORKERS, map_reduce_acta
+from acta_schema import (REPAIR_SYSTEM_PROMPT, ActaValidationError, acta_sections, parse_acta_json,
+                         render_text, save_structured_acta, structured_prompt)
+from docx_renderer import save_acta_docx
+from jsonl_worker import DEFAULT_MAX_JOBS, emit_event, events_to_stdout, serve
+from llm_providers import LLMRequest, ProviderError, create_provider, response_cache
+from output_cleaner import clean_model_output
+from provider_router import PROVIDER_KEY_VARS, parse_fallback, with_fallback
+from token_budget import count_tokens, model_limits, plan_request
+from transcript_writer import FULL_TRANSCRIPT_MARKER
+
+# Sufijo del acta generada junto a la transcripción
+ACTA_SUFFIX = "_acta_formatada.txt"
+
+def read_transcript(path):
+    """
+    Lee el archivo de transcripción en UTF-8 (o latin-1 si no lo es) y
+    normaliza los caracteres especiales
+    """
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            text = f.read()
+    except UnicodeDecodeError:
+        with open(path, 'r', encoding='latin-1') as f:
+            text = f.read()
+        print("Aviso: Se utilizó codificación latin-1 para leer el archivo")
+    return unicodedata.normalize('NFC', text)
+
+def extract_full_transcript(text):
+    """
+    Devuelve la sección de transcripción completa, o todo el texto si el
+    archivo no la tiene
+    """
+    if FULL_TRANSCRIPT_MARKER in text:
+        return text.split(FULL_TRANSCRIPT_MARKER, 1)[1].strip()
+    return text
+
+async def stream_to_file(provider, request, output_file):
+    """
+    Recibe la respuesta en streaming, la escribe en output_file a medida que
+    llega y emite eventos de progreso. Si falla borra el archivo parcial y
+    devuelve None; si no, devuelve el texto completo.
+    """
+    start_time = time.time()
+    parts = []
+    chars = 0
+    emit_event({"event": "start", "output": output_file, "provider": provider.name, "model": provider.model})
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            async for text in provider.stream(request):
+                f.write(text)
+                f.flush()
+                parts.append(text)
+                chars += len(text)
+                emit_event({"event": "delta", "text": text, "chars": chars})
+    except (ProviderError, OSError) as e:
+        print(f"Error en la respuesta en streaming de {provider.name}: {e}")
+        emit_event({"event": "error", "error": str(e)})
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        return None
+
+    emit_event({"event": "done", "output": output_file, "chars": chars,
+                "elapsed": round(time.time() - start_time, 3)})
+    return "".join(parts)
+
+async def generate_acta_async(provider, system_prompt, transcript, chunked=None, window_tokens=None,
+                              stream_to=None):
+    """
+    Decide con token_budget si la transcripción cabe en una sola llamada y
+    genera el acta directamente o por tramos. Devuelve el texto o None.
+    Con stream_to la respuesta final se recibe en streaming y se va
+    escribiendo en ese archivo.
+    """
+    try:
+        plan = plan_request(provider.model, provider.fixed_prompt(system_prompt), transcript,
+                            map_workers=provider.concurrency, window_tokens=window_tokens, chunked=chunked)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
+    print(plan.describe())
+
+    async def stream_final_call(system, user, max_tokens):
+        return await stream_to_file(provider, LLMRequest(system, user, max_tokens), stream_to)
+
+    def emit_window(index, total):
+        emit_event({"event": "window", "index": index, "total": total})
+
+    final_call = stream_final_call if stream_to else None
+    on_window = emit_window if stream_to else None
+
+    # Las transcripciones largas se resumen por tramos para no exceder el contexto
+    if plan.chunked:
+        return await map_reduce_acta(provider, system_prompt, transcript, plan,
+                                     final_call=final_call, on_window=on_window)
+
+    print(f"Llamando a la API de {provider.name}...")
+    if final_call is not None:
+        return await final_call(system_prompt, transcript, plan.max_tokens)
+    response = await provider.complete(LLMRequest(system_prompt, transcript, plan.max_tokens))
+    return response.text if response else None
+
+async def generate_structured_acta_async(provider, system_prompt, transcript, chunked=None, window_tokens=None,
+                                        stream_to=None):
+    """
+    Genera el acta en JSON (acta_schema) y la devuelve validada, o None. Si
+    la respuesta no cumple el esquema se pide una corrección una sola vez.
+    """
+    reply = await generate_acta_async(provider, structured_prompt(system_prompt), transcript, chunked,
+                                      window_tokens, stream_to)
+    if not reply:
+        return None
+    try:
+        return parse_acta_json(reply)
+    except ActaValidationError as e:
+        print(f"Aviso: la respuesta no cumple el esquema del acta ({e}); solicitando una corrección...")
+        errors = "\n".join(f"- {error}" for error in e.errors)
+        max_tokens = min(model_limits(provider.model)["max_output"], count_tokens(reply, provider.model) + 500)
+        response = await provider.complete(LLMRequest(
+            REPAIR_SYSTEM_PROMPT, f"Errores:\n{errors}\n\nActa:\n{reply}", max_tokens))
+    if not response:
+        return None
+    try:
+        return parse_acta_json(response.text)
+    except ActaValidationError as e:
+        print(f"Error: el acta corregida tampoco cumple el esquema: {e}")
+        return None
+
+def generate_acta(provider, system_prompt, transcript, chunked=None, window_tokens=None, stream_to=None):
+    """
+    Versión bloqueante de generate_acta_async para los scripts. Cierra el
+    proveedor al terminar.
+    """
+    return _run_and_close(provider, generate_acta_async(provider, system_prompt, transcript, chunked,
+                                                        window_tokens, stream_to))
+
+def generate_structured_acta(provider, system_prompt, transcript, chunked=None, window_tokens=None,
+                             stream_to=None):
+    """
+    Versión bloqueante de generate_structured_acta_async. Cierra el proveedor
+    al terminar.
+    """
+    return _run_and_close(provider, generate_structured_acta_async(provider, system_prompt, transcript,
+                                                                   chunked, window_tokens, stream_to))
+
+def _run_and_close(provider, coroutine):
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await provider.aclose()
+    return asyncio.run(run())
+
+def acta_output_path(transcript_file, suffix=ACTA_SUFFIX):
+    """
+    Ruta del acta que se genera por defecto para una transcripción
+    """
+    return os.path.splitext(transcript_file)[0] + suffix
+
+class ActaScript:
+    """
+    Configuración de un script de actas: proveedor (nombre de
+    llm_providers.PROVIDERS), modelo, prompt por defecto y cómo se guarda el
+    acta. markdown conserva el Markdown que pide el prompt al limpiar la
+    respuesta y bom escribe el TXT con BOM UTF-8.
+    """
+    def __init__(self, name, label, provider, model, prompt, provider_options=None,
+                 markdown=False, bom=False, suffix=ACTA_SUFFIX):
+        self.name = name
+        self.label = label
+        self.provider = provider
+        self.model = model
+        self.prompt = prompt
+        self.provider_options = provider_options or {}
+        self.markdown = markdown
+        self.bom = bom
+        self.suffix = suffix
+
+    @property
+    def key_var(self):
+        return PROVIDER_KEY_VARS[self.provider]
+
+    def process(self, transcript_file, api_key, custom_prompt=None, output_file=None, chunked=None,
+                window_tokens=None, map_workers=DEFAULT_MAP_WORKERS, stream=False, use_cache=True,
+                fallback=None, hedge_after=None, structured=False):
+        """
+        Genera el acta de transcript_file y la guarda en TXT y DOCX (por
+        defecto junto a la transcripción). Devuelve la ruta del TXT, o None
+        si no se pudo generar.
+        Si la transcripción no cabe en el contexto del modelo (o chunked=True)
+        se resume por tramos en paralelo y se combinan los resúmenes
+        Con stream=True el acta se escribe en el archivo a medida que llega y
+        se emiten eventos de progreso JSON-lines; al terminar se reescribe limpia
+        Con use_cache=False no se consulta la caché de respuestas
+        fallback es una lista de proveedores de respaldo (openai, anthropic,
+        perplexity) a los que se reenvía cada llamada si esta falla o tarda
+        más de hedge_after segundos
+        Con structured=True el modelo devuelve el acta en JSON (acta_schema),
+        que se valida y se guarda junto al TXT y el DOCX generados a partir de ella
+        """
+        # Leer el archivo y enviar solo la transcripción completa, sin la lista de fragmentos
+        try:
+            transcript = extract_full_transcript(read_transcript(transcript_file))
+        except (OSError, UnicodeError) as e:
+            print(f"Error al leer el archivo de transcripción: {e}")
+            return None
+
+        output_file = output_file or acta_output_path(transcript_file, self.suffix)
+        try:
+            provider = with_fallback(create_provider(self.provider, api_key, model=self.model,
+                                                     concurrency=map_workers,
+                                                     cache=response_cache() if use_cache else None,
+                                                     **self.provider_options),
+                                     fallback, hedge_after)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
+        system_prompt = custom_prompt or self.prompt
+
+        sections = None
+        if structured:
+            # El TXT y el DOCX se generan a partir del acta validada
+            json_file = os.path.splitext(output_file)[0] + ".json"
+            acta = generate_structured_acta(provider, system_prompt, transcript, chunked, window_tokens,
+                                            stream_to=json_file if stream else None)
+            if not acta:
+                return None
+            sections = acta_sections(acta)
+            text = render_text(acta, sections)
+            save_structured_acta(acta, json_file, text)
+        else:
+            text = generate_acta(provider, system_prompt, transcript, chunked, window_tokens,
+                                 stream_to=output_file if stream else None)
+            if not text:
+                return None
+            # Normalizar etiquetas HTML, entidades y viñetas. En streaming el
+            # archivo se reescribe ya limpio.
+            text = clean_model_output(text, markdown=self.markdown)
+
+        text = unicodedata.normalize('NFC', text)
+        try:
+            with open(output_file, 'w', encoding='utf-8-sig' if self.bom else 'utf-8') as f:
+                f.write(text)
+        except OSError as e:
+            print(f"Error al guardar el archivo de salida: {e}")
+            return None
+        print(f"Acta formateada guardada en: {output_file}")
+
+        # También crear una versión Word del documento
+        save_acta_docx(text, os.path.splitext(output_file)[0] + ".docx", sections)
+        return output_file
+
+    def handle_worker_job(self, params):
+        """
+        Atiende un trabajo del modo --worker. Claves: transcript_file (o
+        transcript_path), api_key (o la variable de entorno del proveedor),
+        prompt, output y las mismas opciones que la línea de comandos
+        """
+        api_key = params.get("api_key") or os.environ.get(self.key_var)
+        if not api_key:
+            raise ValueError(f"Se requiere API Key de {self.label}")
+        transcript_file = params.get("transcript_file") or params.get("transcript_path")
+        if not transcript_file:
+            raise ValueError("Falta transcript_file")
+        parse_fallback(params.get("fallback"))
+        output_file = self.process(transcript_file, api_key, params.get("prompt"), params.get("output"),
+                                   chunked=params.get("chunked"), window_tokens=params.get("window_tokens"),
+                                   map_workers=params.get("map_workers", DEFAULT_MAP_WORKERS),
+                                   stream=params.get("stream", False), use_cache=params.get("use_cache", True),
+                                   fallback=params.get("fallback"), hedge_after=params.get("hedge_after"),
+                                   structured=params.get("structured", False))
+        if not output_file:
+            raise RuntimeError("No se pudo generar el acta formateada")
+        return {"output_file": output_file}
+
+    def main(self, argv=None):
+        parser = argparse.ArgumentParser(
+            description=f'Procesa transcripciones con {self.label} para formatear actas de asambleas')
+        parser.add_argument('transcript_file', nargs='?', help='Ruta al archivo de transcripción')
+        parser.add_argument('--api_key', help=f'API Key de {self.label} (por defecto {self.key_var})')
+        parser.add_argument('--prompt', help='Prompt personalizado para la IA')
+        parser.add_argument('--output', help='Ruta de salida para el archivo formateado')
+        parser.add_argument('--chunked', action='store_true', default=None,
+                            help='Resumir por tramos aunque la transcripción quepa en una sola llamada')
+        parser.add_argument('--window_tokens', type=int,
+                            help='Tokens de transcripción por tramo (por defecto según el contexto del modelo)')
+        parser.add_argument('--stream', action='store_true',
+                            help='Escribir el acta a medida que llega y emitir progreso JSON-lines en stdout')
+        parser.add_argument('--no_cache', action='store_true',
+                            help='No usar la caché de respuestas: llamar siempre a la API')
+        parser.add_argument('--fallback',
+                            help='Proveedores de respaldo separados por comas (openai, anthropic, perplexity)')
+        parser.add_argument('--hedge_after', type=float,
+                            help='Segundos antes de enviar la petición de respaldo (por defecto según la latencia medida)')
+        parser.add_argument('--structured', action='store_true',
+                            help='Pedir el acta en JSON validado y generar el TXT y el DOCX a partir de ella')
+        parser.add_argument('--worker', action='store_true',
+                            help='Modo trabajador persistente: recibe trabajos JSON por stdin')
+        parser.add_argument('--max_jobs', type=int, default=DEFAULT_MAX_JOBS,
+                            help='Trabajos simultáneos en modo trabajador')
+
+        args = parser.parse_args(argv)
+
+        if args.worker:
+            serve(self.handle_worker_job, args.max_jobs, name=self.name)
+            sys.exit(0)
+        if not args.transcript_file:
+            parser.error("se requiere transcript_file")
+        api_key = args.api_key or os.environ.get(self.key_var)
+        if not api_key:
+            parser.error(f"se requiere --api_key o la variable {self.key_var}")
+        try:
+            parse_fallback(args.fallback)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.stream:
+            events_to_stdout()
+
+        output_file = self.process(args.transcript_file, api_key, args.prompt, args.output,
+                                   chunked=args.chunked, window_tokens=args.window_tokens,
+                                   stream=args.stream,
+                                   use_cache=not args.no_cache, fallback=args.fallback,
+                                   hedge_after=args.hedge_after, structured=args.structured)
+        sys.exit(0 if output_file else 1)
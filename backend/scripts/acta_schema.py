@@ -0,0 +1,279 @@
+# Acta estructurada: el modelo devuelve un objeto JSON con los datos de la
+# reunión, que se valida contra ACTA_SCHEMA y del que se generan el TXT, el
+# DOCX y el documento para la búsqueda, sin volver a analizar el texto.
+#
+# Archivo <base>_acta_formatada.json:
+#   {"version": 1, "acta": {...}, "search": {...}}
+import re
+import json
+
+from output_cleaner import clean_model_output
+from docx_renderer import Section
+
+ACTA_JSON_VERSION = 1
+
+_TEXT = {"type": "string"}
+_OPTIONAL_TEXT = {"type": ["string", "null"]}
+_PERSON = {
+    "type": "object",
+    "required": ["nombre"],
+    "properties": {"nombre": _TEXT, "cargo": _OPTIONAL_TEXT},
+    # Si el modelo devuelve solo una cadena se usa como este campo
+    "x-string-field": "nombre",
+}
+_TASK = {
+    "type": "object",
+    "required": ["descripcion"],
+    "properties": {"descripcion": _TEXT, "responsable": _OPTIONAL_TEXT, "plazo": _OPTIONAL_TEXT},
+    "x-string-field": "descripcion",
+}
+
+# Subconjunto de JSON Schema que entiende validate()
+ACTA_SCHEMA = {
+    "type": "object",
+    "required": ["titulo", "asistentes", "orden_del_dia", "desarrollo", "acuerdos", "pendientes"],
+    "properties": {
+        "titulo": _TEXT,
+        "organizacion": _OPTIONAL_TEXT,
+        "fecha": _OPTIONAL_TEXT,
+        "hora_inicio": _OPTIONAL_TEXT,
+        "hora_cierre": _OPTIONAL_TEXT,
+        "lugar": _OPTIONAL_TEXT,
+        "modalidad": _OPTIONAL_TEXT,
+        "asistentes": {"type": "array", "items": _PERSON},
+        "orden_del_dia": {"type": "array", "items": _TEXT},
+        "desarrollo": {"type": "array", "items": {
+            "type": "object",
+            "required": ["tema", "resumen"],
+            "properties": {"tema": _TEXT, "resumen": _TEXT, "decision": _OPTIONAL_TEXT},
+        }},
+        "acuerdos": {"type": "array", "items": _TASK},
+        "pendientes": {"type": "array", "items": _TASK},
+        "cierre": _OPTIONAL_TEXT,
+        "firmas": {"type": "array", "items": _PERSON},
+    },
+}
+
+STRUCTURED_INSTRUCTIONS = """
+
+FORMATO DE SALIDA ESTRUCTURADO (tiene prioridad sobre cualquier formato visual indicado antes):
+Mantén todas las reglas de contenido anteriores, pero devuelve ÚNICAMENTE un objeto JSON válido, sin texto antes ni después y sin bloques de código, con esta estructura:
+{
+  "titulo": "ACTA DE ASAMBLEA ...",
+  "organizacion": "nombre o null",
+  "fecha": "fecha o null",
+  "hora_inicio": "hora o null",
+  "hora_cierre": "hora o null",
+  "lugar": "lugar o null",
+  "modalidad": "presencial, virtual, híbrida o null",
+  "asistentes": [{"nombre": "...", "cargo": "... o null"}],
+  "orden_del_dia": ["tema 1", "tema 2"],
+  "desarrollo": [{"tema": "...", "resumen": "narración en pasado", "decision": "... o null"}],
+  "acuerdos": [{"descripcion": "...", "responsable": "... o null", "plazo": "... o null"}],
+  "pendientes": [{"descripcion": "...", "responsable": "... o null", "plazo": "... o null"}],
+  "cierre": "texto del cierre o null",
+  "firmas": [{"nombre": "...", "cargo": "..."}]
+}
+Usa null para los datos que no aparezcan en la transcripción y listas vacías si no hay elementos. No uses Markdown ni HTML dentro de los textos."""
+
+REPAIR_SYSTEM_PROMPT = """Eres un asistente que corrige objetos JSON. Vas a recibir un acta en JSON (o en texto) que no cumple el esquema requerido y la lista de errores. Devuelve ÚNICAMENTE el objeto JSON corregido, con la estructura indicada, sin texto adicional, sin bloques de código y sin inventar datos que no estén en el original.""" + STRUCTURED_INSTRUCTIONS
+
+class ActaValidationError(ValueError):
+    """
+    La respuesta no es JSON válido o no cumple ACTA_SCHEMA
+    """
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("; ".join(self.errors[:5]) + (" ..." if len(self.errors) > 5 else ""))
+
+def structured_prompt(system_prompt):
+    """
+    Prompt de sistema con las instrucciones para devolver el acta en JSON
+    """
+    return system_prompt + STRUCTURED_INSTRUCTIONS
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+def extract_json(text):
+    """
+    Extrae el objeto JSON de la respuesta aunque venga entre ``` o con texto
+    alrededor
+    """
+    text = _FENCE_RE.sub("", text.strip())
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end <= start:
+        raise ActaValidationError(["la respuesta no contiene un objeto JSON"])
+    try:
+        return json.loads(text[start:end + 1])
+    except ValueError as e:
+        raise ActaValidationError([f"JSON no válido: {e}"])
+
+_TYPES = {"object": dict, "array": list, "string": str, "null": type(None)}
+
+def validate(value, schema, path="acta", errors=None):
+    """
+    Valida value contra schema y devuelve (valor normalizado, errores). Las
+    propiedades opcionales que faltan se rellenan con None o con una lista
+    vacía y las cadenas se limpian de Markdown y HTML.
+    """
+    if errors is None:
+        errors = []
+    types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+
+    if isinstance(value, str) and "object" in types and "x-string-field" in schema:
+        value = {schema["x-string-field"]: value}
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and "string" in types:
+        value = str(value)
+
+    if not any(isinstance(value, _TYPES[name]) for name in types):
+        errors.append(f"{path}: se esperaba {' o '.join(types)}")
+        return value, errors
+
+    if isinstance(value, str):
+        return clean_model_output(value).strip(), errors
+    if isinstance(value, list):
+        item_schema = schema.get("items")
+        if item_schema:
+            value = [validate(item, item_schema, f"{path}[{index}]", errors)[0]
+                     for index, item in enumerate(value)]
+        return value, errors
+    if isinstance(value, dict):
+        result = {}
+        for name, property_schema in schema.get("properties", {}).items():
+            if name in value:
+                result[name] = validate(value[name], property_schema, f"{path}.{name}", errors)[0]
+            elif name in schema.get("required", ()):
+                errors.append(f"{path}.{name}: falta el campo obligatorio")
+            else:
+                result[name] = [] if property_schema["type"] == "array" else None
+        return result, errors
+    return value, errors
+
+def parse_acta_json(text):
+    """
+    Convierte la respuesta del modelo en el acta validada o lanza
+    ActaValidationError con la lista de errores
+    """
+    acta, errors = validate(extract_json(text), ACTA_SCHEMA)
+    if errors:
+        raise ActaValidationError(errors)
+    return acta
+
+def _person(person):
+    return person["nombre"] + (f" - {person['cargo']}" if person.get("cargo") else "")
+
+def _task(task):
+    text = task["descripcion"]
+    if (task.get("responsable") or task.get("plazo")) and not text.endswith((".", "!", "?")):
+        text += "."
+    if task.get("responsable"):
+        text += f" Responsable: {task['responsable']}."
+    if task.get("plazo"):
+        text += f" Plazo: {task['plazo']}."
+    return text
+
+def acta_sections(acta):
+    """
+    Secciones del acta para docx_renderer, en el mismo orden que render_text
+    """
+    title = acta["titulo"]
+    if acta.get("organizacion") and acta["organizacion"].lower() not in title.lower():
+        title += f" - {acta['organizacion']}"
+    sections = [Section("title", title)]
+
+    details = Section("heading", "DETALLES DE LA REUNIÓN")
+    for label, field in (("Fecha", "fecha"), ("Hora de inicio", "hora_inicio"), ("Lugar", "lugar"),
+                         ("Modalidad", "modalidad")):
+        if acta.get(field):
+            details.blocks.append(("label", f"{label}: {acta[field]}"))
+    sections.append(details)
+
+    def listing(heading, items, kind="bullet", empty="No se registraron"):
+        section = Section("heading", heading)
+        section.blocks.extend((kind, item) for item in items)
+        if not items:
+            section.blocks.append(("paragraph", f"{empty} en la transcripción."))
+        sections.append(section)
+
+    listing("ASISTENTES", [_person(person) for person in acta["asistentes"]], empty="No se registraron asistentes")
+    listing("ORDEN DEL DÍA", acta["orden_del_dia"], "numbered", empty="No se registró el orden del día")
+
+    sections.append(Section("heading", "DESARROLLO"))
+    if not acta["desarrollo"]:
+        sections[-1].blocks.append(("paragraph", "No se registró el desarrollo en la transcripción."))
+    for topic in acta["desarrollo"]:
+        section = Section("heading", topic["tema"], level=2)
+        section.blocks.append(("paragraph", topic["resumen"]))
+        if topic.get("decision"):
+            section.blocks.append(("label", f"Decisión: {topic['decision']}"))
+        sections.append(section)
+
+    listing("ACUERDOS", [_task(task) for task in acta["acuerdos"]], empty="No se registraron acuerdos")
+    listing("TAREAS PENDIENTES", [_task(task) for task in acta["pendientes"]], empty="No se registraron pendientes")
+
+    closing = Section("heading", "CIERRE")
+    if acta.get("hora_cierre"):
+        closing.blocks.append(("label", f"Hora de cierre: {acta['hora_cierre']}"))
+    if acta.get("cierre"):
+        closing.blocks.append(("paragraph", acta["cierre"]))
+    if closing.blocks:
+        sections.append(closing)
+
+    if acta.get("firmas"):
+        signatures = Section("heading", "FIRMAS")
+        for person in acta["firmas"]:
+            signatures.blocks.append(("blank", ""))
+            signatures.blocks.append(("paragraph", _person(person)))
+        sections.append(signatures)
+    return sections
+
+def render_text(acta, sections=None):
+    """
+    Acta en texto plano con el formato de secciones de los scripts
+    """
+    lines = []
+    for section in sections or acta_sections(acta):
+        if lines:
+            lines.append("")
+        lines.append(section.heading)
+        number = 0
+        for kind, text in section.blocks:
+            if kind == "bullet":
+                lines.append(f"- {text}")
+            elif kind == "numbered":
+                number += 1
+                lines.append(f"{number}. {text}")
+            else:
+                lines.append(text)
+    return "\n".join(lines) + "\n"
+
+def search_document(acta, text=None):
+    """
+    Campos para la búsqueda: datos de la reunión, personas, temas, acuerdos,
+    pendientes y el texto completo del acta
+    """
+    tasks = acta["acuerdos"] + acta["pendientes"]
+    return {
+        "titulo": acta["titulo"],
+        "organizacion": acta.get("organizacion"),
+        "fecha": acta.get("fecha"),
+        "lugar": acta.get("lugar"),
+        "modalidad": acta.get("modalidad"),
+        "personas": sorted({person["nombre"] for person in acta["asistentes"] + acta.get("firmas", [])}),
+        "responsables": sorted({task["responsable"] for task in tasks if task.get("responsable")}),
+        "temas": acta["orden_del_dia"] + [topic["tema"] for topic in acta["desarrollo"]],
+        "acuerdos": [task["descripcion"] for task in acta["acuerdos"]],
+        "pendientes": [task["descripcion"] for task in acta["pendientes"]],
+        "texto": text if text is not None else render_text(acta),
+    }
+
+def save_structured_acta(acta, json_path, text=None):
+    """
+    Guarda el acta y su documento de búsqueda en json_path
+    """
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"version": ACTA_JSON_VERSION, "acta": acta, "search": search_document(acta, text)},
+                  f, ensure_ascii=False, indent=2)
+    print(f"Acta estructurada guardada en: {json_path}")
+    return json_path
@@ -0,0 +1,423 @@
+# Motores de reconocimiento de voz para transcribe_audio. Todos reciben un
+# AudioSegment y devuelven (texto, marcas de palabra), de modo que el
+# reconocedor web de Google y los modelos locales en CPU (Vosk y
+# faster-whisper) son intercambiables.
+#
+# Uso:
+#   engine = create_engine("whisper", "es-ES", model="small")
+#   text, words = engine.recognize(segment)
+#   results = engine.recognize_batch(segments)  # (texto, palabras) o la excepción de cada uno
+#
+# Las marcas de palabra son relativas al fragmento:
+#   [{"word": "acta", "start_ms": 120, "end_ms": 480, "confidence": 0.93}]
+# Los modelos locales se cargan una sola vez por proceso (también entre los
+# trabajos del modo --worker) y los comparten todos los hilos. Whisper procesa
+# los fragmentos por lotes: el audio se rellena a 30 segundos, el espectrograma
+# log-mel se calcula con numpy para todo el lote a la vez y el modelo codifica
+# y decodifica el lote en una sola llamada.
+import os
+import json
+import threading
+
+try:
+    import speech_recognition as sr
+except ImportError:
+    sr = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+try:
+    import faster_whisper
+except ImportError:
+    faster_whisper = None
+
+DEFAULT_ENGINE = os.environ.get("ASR_ENGINE", "google")
+
+# Modelos locales: carpeta del modelo Vosk y tamaño o ruta del modelo Whisper
+VOSK_MODEL_PATH = os.environ.get("VOSK_MODEL_PATH")
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "small")
+WHISPER_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", "0"))  # 0: según CTranslate2
+WHISPER_BEAM_SIZE = int(os.environ.get("WHISPER_BEAM_SIZE", "5"))
+WHISPER_BATCH_SIZE = int(os.environ.get("WHISPER_BATCH_SIZE", "0"))  # 0: según los núcleos
+WHISPER_NO_SPEECH_THRESHOLD = 0.6
+WHISPER_LOGPROB_THRESHOLD = -1.0
+
+# El reconocimiento por lotes usa piezas internas de faster-whisper
+# (get_prompt, model.generate/align, mel_filters, split_to_word_tokens) que
+# solo se han comprobado con estas versiones (la fijada en nixpacks.toml); con
+# otras se reconoce fragmento a fragmento con la API pública
+WHISPER_BATCH_VERSIONS = ("1.0.",)
+
+# Límites del tamaño de lote automático
+MIN_BATCH_SIZE = 2
+MAX_BATCH_SIZE = 16
+
+# Formato que esperan los modelos locales
+ENGINE_SAMPLE_RATE = 16000
+
+# Muestras que se entregan a Vosk en cada llamada
+VOSK_BLOCK_FRAMES = 8000
+
+class NoSpeechError(Exception):
+    """
+    El motor no reconoció ninguna palabra en el fragmento
+    """
+
+class EngineRequestError(Exception):
+    """
+    Error transitorio del servicio de reconocimiento (red, cuota, servidor)
+    """
+
+_models = {}
+_models_lock = threading.Lock()
+
+def load_model(key, loader):
+    """
+    Devuelve el modelo identificado por key, cargándolo con loader() la
+    primera vez. La carga ocurre una sola vez aunque la pidan varios hilos.
+    """
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                print(f"Cargando modelo de reconocimiento {key[0]}: {key[1]}")
+                model = _models[key] = loader()
+    return model
+
+def segment_to_audio_data(segment):
+    """
+    Convierte un AudioSegment en sr.AudioData directamente desde memoria,
+    sin exportar un WAV temporal. El reconocedor espera audio mono.
+    """
+    if segment.channels > 1:
+        segment = segment.set_channels(1)
+    return sr.AudioData(segment.raw_data, segment.frame_rate, segment.sample_width)
+
+def pcm16_mono(segment, sample_rate=ENGINE_SAMPLE_RATE):
+    """
+    AudioSegment en mono, 16 bits y sample_rate, sin convertir si ya lo está
+    """
+    if segment.channels != 1:
+        segment = segment.set_channels(1)
+    if segment.frame_rate != sample_rate:
+        segment = segment.set_frame_rate(sample_rate)
+    if segment.sample_width != 2:
+        segment = segment.set_sample_width(2)
+    return segment
+
+def cpu_threads_per_worker(workers):
+    """
+    Núcleos de CPU para cada hilo de trabajo, sin sobresuscribir la máquina
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+def auto_batch_size(workers):
+    """
+    Tamaño de lote según los núcleos que le tocan a cada hilo: con más
+    núcleos por lote, lotes mayores mantienen ocupadas las unidades
+    vectoriales en las multiplicaciones de matrices del modelo
+    """
+    return max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, 2 * cpu_threads_per_worker(workers)))
+
+def log_mel_batch(waveforms, mel_filters, n_fft=400, hop_length=160, n_samples=480000):
+    """
+    Espectrogramas log-mel de Whisper para un lote de audios PCM de 16 bits
+    a 16 kHz. Cada audio se rellena con ceros hasta n_samples y todo el lote
+    se procesa a la vez: (lote, n_samples) -> (lote, n_mels, n_samples // hop_length)
+    """
+    batch = np.zeros((len(waveforms), n_samples), dtype=np.float32)
+    for row, waveform in zip(batch, waveforms):
+        samples = waveform[:n_samples]
+        row[:len(samples)] = samples / np.float32(32768.0)
+
+    # STFT centrada (relleno por reflexión) con ventana de Hann, por marcos
+    padded = np.pad(batch, ((0, 0), (n_fft // 2, n_fft // 2)), mode="reflect")
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft, axis=-1)[:, ::hop_length]
+    window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+    spectrum = np.fft.rfft(frames * window, axis=-1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)[:, :-1]
+
+    mel = np.matmul(mel_filters.astype(np.float32), power.transpose(0, 2, 1))
+    log_spec = np.log10(np.maximum(mel, 1e-10))
+    log_spec = np.maximum(log_spec, log_spec.max(axis=(1, 2), keepdims=True) - 8.0)
+    return (log_spec + 4.0) / 4.0
+
+def _word(text, start, end, confidence=None):
+    word = {"word": text.strip(), "start_ms": int(round(start * 1000)), "end_ms": int(round(end * 1000))}
+    if confidence is not None:
+        word["confidence"] = round(float(confidence), 3)
+    return word
+
+class SpeechEngine:
+    """
+    Base de los motores. Las subclases implementan recognize(). network
+    indica si cada fragmento es una llamada remota (y se aplica el límite de
+    solicitudes por segundo).
+    """
+    name = "base"
+    network = False
+    default_model = None
+
+    def __init__(self, language, model=None, workers=1, batch_size=None):
+        self.language = language
+        self.model_name = model or self.default_model
+        self.workers = max(1, int(workers or 1))
+        # Fragmentos que recibe cada llamada a recognize_batch()
+        self.batch_size = 1
+
+    def settings(self):
+        """
+        Identifica el motor y el modelo en la configuración del punto de
+        control y en la clave de la caché de fragmentos
+        """
+        return {"name": self.name, "model": self.model_name}
+
+    def recognize(self, segment):
+        """
+        Devuelve (texto, marcas de palabra o None). Lanza NoSpeechError si
+        no se reconoce nada y EngineRequestError ante errores transitorios.
+        """
+        raise NotImplementedError
+
+    def recognize_batch(self, segments):
+        """
+        Reconoce varios fragmentos y devuelve, en el mismo orden, el
+        resultado de recognize() o la excepción que lanzó cada uno
+        """
+        results = []
+        for segment in segments:
+            try:
+                results.append(self.recognize(segment))
+            except Exception as e:
+                results.append(e)
+        return results
+
+class GoogleEngine(SpeechEngine):
+    """
+    API web de Google a través de speech_recognition, un reconocedor por hilo.
+    No devuelve marcas por palabra.
+    """
+    name = "google"
+    network = True
+
+    def __init__(self, language, model=None, workers=1, batch_size=None):
+        if sr is None:
+            raise ImportError("speech_recognition no está instalado. Instálalo con: pip install SpeechRecognition")
+        super().__init__(language, model, workers)
+        self.local_state = threading.local()
+
+    def recognize(self, segment):
+        recognizer = getattr(self.local_state, "recognizer", None)
+        if recognizer is None:
+            recognizer = self.local_state.recognizer = sr.Recognizer()
+        try:
+            return recognizer.recognize_google(segment_to_audio_data(segment), language=self.language), None
+        except sr.UnknownValueError:
+            raise NoSpeechError()
+        except sr.RequestError as e:
+            raise EngineRequestError(str(e))
+
+class VoskEngine(SpeechEngine):
+    """
+    Modelo Kaldi local de Vosk. El modelo (de un idioma, indicado por su
+    carpeta) se comparte y cada fragmento usa su propio KaldiRecognizer.
+    El reconocedor de Vosk en CPU es de flujo y no admite lotes: el
+    paralelismo viene de los hilos de trabajo.
+    """
+    name = "vosk"
+
+    def __init__(self, language, model=None, workers=1, batch_size=None):
+        if vosk is None:
+            raise ImportError("vosk no está instalado. Instálalo con: pip install vosk==0.3.45 (en el despliegue, INSTALL_LOCAL_ASR=1)")
+        super().__init__(language, model or VOSK_MODEL_PATH, workers)
+        if not self.model_name:
+            raise ValueError("Indique la carpeta del modelo Vosk con --model o VOSK_MODEL_PATH")
+        vosk.SetLogLevel(-1)
+        self.model = load_model((self.name, self.model_name), lambda: vosk.Model(self.model_name))
+
+    def recognize(self, segment):
+        segment = pcm16_mono(segment)
+        recognizer = vosk.KaldiRecognizer(self.model, segment.frame_rate)
+        recognizer.SetWords(True)
+
+        # Vosk devuelve un resultado por enunciado: se recogen todos
+        results = []
+        data = segment.raw_data
+        block = VOSK_BLOCK_FRAMES * 2
+        for start in range(0, len(data), block):
+            if recognizer.AcceptWaveform(data[start:start + block]):
+                results.append(json.loads(recognizer.Result()))
+        results.append(json.loads(recognizer.FinalResult()))
+
+        text = " ".join(result["text"] for result in results if result.get("text"))
+        if not text:
+            raise NoSpeechError()
+        words = [_word(word["word"], word["start"], word["end"], word.get("conf"))
+                 for result in results for word in result.get("result", [])]
+        return text, words or None
+
+class WhisperEngine(SpeechEngine):
+    """
+    Modelo Whisper local con faster-whisper (CTranslate2) en CPU, cuantizado
+    a int8 por defecto. Un solo modelo atiende a todos los hilos y cada hilo
+    le envía lotes de batch_size fragmentos (0 o None: según los núcleos).
+    """
+    name = "whisper"
+    default_model = WHISPER_MODEL
+
+    def __init__(self, language, model=None, workers=1, batch_size=None):
+        if faster_whisper is None:
+            raise ImportError("faster-whisper no está instalado. Instálalo con: pip install faster-whisper==1.0.3 (en el despliegue, INSTALL_LOCAL_ASR=1)")
+        super().__init__(language, model, workers)
+        self.batch_size = max(1, batch_size or WHISPER_BATCH_SIZE or auto_batch_size(self.workers))
+        # "es-ES" -> "es"
+        self.whisper_language = language.split("-")[0].lower() if language else None
+        self.model = load_model((self.name, self.model_name), lambda: faster_whisper.WhisperModel(
+            self.model_name, device="cpu", compute_type=WHISPER_COMPUTE_TYPE,
+            cpu_threads=WHISPER_CPU_THREADS or cpu_threads_per_worker(self.workers), num_workers=self.workers))
+        self._tokenizer = None
+        version = getattr(faster_whisper, "__version__", "")
+        self.batched = version.startswith(WHISPER_BATCH_VERSIONS)
+        if not self.batched:
+            print(f"Aviso: faster-whisper {version or '(versión desconocida)'} no está comprobado para el "
+                  f"reconocimiento por lotes; se reconocerá fragmento a fragmento")
+
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from faster_whisper.tokenizer import Tokenizer
+            multilingual = self.model.model.is_multilingual
+            self._tokenizer = Tokenizer(self.model.hf_tokenizer, multilingual, task="transcribe",
+                                        language=self.whisper_language if multilingual else None)
+        return self._tokenizer
+
+    def settings(self):
+        return dict(super().settings(), compute_type=WHISPER_COMPUTE_TYPE, beam_size=WHISPER_BEAM_SIZE)
+
+    def recognize(self, segment):
+        segment = pcm16_mono(segment)
+        samples = np.frombuffer(segment.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self.model.transcribe(samples, language=self.whisper_language,
+                                            beam_size=WHISPER_BEAM_SIZE, word_timestamps=True,
+                                            condition_on_previous_text=False)
+        texts = []
+        words = []
+        for piece in segments:
+            texts.append(piece.text.strip())
+            words.extend(_word(word.word, word.start, word.end, word.probability) for word in piece.words or ())
+        text = " ".join(text for text in texts if text)
+        if not text:
+            raise NoSpeechError()
+        return text, words or None
+
+    def recognize_batch(self, segments):
+        """
+        Los fragmentos de hasta 30 segundos se reconocen juntos en una sola
+        pasada del modelo; los más largos, uno a uno con recognize()
+        """
+        if not self.batched:
+            return super().recognize_batch(segments)
+        n_samples = self.model.feature_extractor.n_samples
+        segments = [pcm16_mono(segment) for segment in segments]
+        results = [None] * len(segments)
+        short = [index for index, segment in enumerate(segments) if segment.frame_count() <= n_samples]
+        long = [index for index, segment in enumerate(segments) if segment.frame_count() > n_samples]
+        if short:
+            for index, result in zip(short, self._decode_batch([segments[index] for index in short])):
+                results[index] = result
+        if long:
+            for index, result in zip(long, super().recognize_batch([segments[index] for index in long])):
+                results[index] = result
+        return results
+
+    def _decode_batch(self, segments):
+        try:
+            extractor = self.model.feature_extractor
+            waveforms = [np.frombuffer(segment.raw_data, dtype=np.int16) for segment in segments]
+            features = log_mel_batch(waveforms, extractor.mel_filters, extractor.n_fft,
+                                     extractor.hop_length, extractor.n_samples)
+            encoder_output = self.model.encode(features)
+
+            tokenizer = self.tokenizer()
+            prompt = self.model.get_prompt(tokenizer, [], without_timestamps=True)
+            generated = self.model.model.generate(
+                encoder_output, [prompt] * len(segments), beam_size=WHISPER_BEAM_SIZE,
+                max_length=getattr(self.model, "max_length", 448), return_scores=True,
+                return_no_speech_prob=True, suppress_blank=True, suppress_tokens=[-1])
+        except Exception as e:
+            return [e] * len(segments)
+
+        results = []
+        tokens_by_item = []
+        for result in generated:
+            tokens = [token for token in result.sequences_ids[0] if token < tokenizer.eot]
+            # Mismo criterio de silencio que faster-whisper
+            avg_logprob = result.scores[0] * len(tokens) / (len(tokens) + 1)
+            if result.no_speech_prob > WHISPER_NO_SPEECH_THRESHOLD and avg_logprob < WHISPER_LOGPROB_THRESHOLD:
+                tokens = []
+            text = tokenizer.decode(tokens).strip() if tokens else ""
+            results.append((text, None) if text else NoSpeechError())
+            tokens_by_item.append(tokens if text else None)
+
+        # Marcas de palabra de todo el lote con una sola alineación
+        aligned = [index for index, tokens in enumerate(tokens_by_item) if tokens]
+        if aligned:
+            try:
+                num_frames = [min(extractor.nb_max_frames, -(-len(waveforms[index]) // extractor.hop_length))
+                              for index in aligned]
+                alignments = self.model.model.align(encoder_output, tokenizer.sot_sequence,
+                                                    [tokens_by_item[index] for index in aligned], num_frames)
+                seconds_per_token = 2.0 * extractor.hop_length / extractor.sampling_rate
+                for index, alignment in zip(aligned, alignments):
+                    words = self._alignment_words(tokenizer, tokens_by_item[index], alignment, seconds_per_token)
+                    results[index] = (results[index][0], words or None)
+            except Exception as e:
+                # Sin marcas de palabra, el texto sigue siendo válido
+                print(f"Aviso: no se pudieron alinear las palabras del lote: {e}")
+        return results
+
+    @staticmethod
+    def _alignment_words(tokenizer, tokens, alignment, seconds_per_token):
+        """
+        Agrupa la alineación por token en palabras con su inicio, fin y
+        probabilidad media, como faster-whisper
+        """
+        words, word_tokens = tokenizer.split_to_word_tokens(tokens + [tokenizer.eot])
+        if len(word_tokens) <= 1:
+            return []
+        text_indices = np.array([pair[0] for pair in alignment.alignments])
+        time_indices = np.array([pair[1] for pair in alignment.alignments])
+        boundaries = np.pad(np.cumsum([len(item) for item in word_tokens[:-1]]), (1, 0))
+        jumps = np.pad(np.diff(text_indices), (1, 0), constant_values=1).astype(bool)
+        jump_times = time_indices[jumps] * seconds_per_token
+        probabilities = alignment.text_token_probs
+        return [_word(word, jump_times[start], jump_times[end], np.mean(probabilities[start:end]))
+                for word, start, end in zip(words[:-1], boundaries[:-1], boundaries[1:]) if word.strip()]
+
+ENGINES = {
+    "google": GoogleEngine,
+    "vosk": VoskEngine,
+    "whisper": WhisperEngine,
+}
+
+ENGINE_ALIASES = {"faster-whisper": "whisper", "faster_whisper": "whisper"}
+
+def create_engine(name, language, model=None, workers=1, batch_size=None):
+    """
+    Crea el motor indicado por nombre (google, vosk o whisper)
+    """
+    name = (name or DEFAULT_ENGINE).lower()
+    try:
+        engine_class = ENGINES[ENGINE_ALIASES.get(name, name)]
+    except KeyError:
+        raise ValueError(f"Motor de reconocimiento desconocido: {name}")
+    return engine_class(language, model=model, workers=workers, batch_size=batch_size)
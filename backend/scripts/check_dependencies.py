@@ -13,6 +13,42 @@ except ImportError:
     print("✗ pydub NO está instalado")
     print("  Instálalo con: pip install pydub")
 
+try:
+    import numpy
+    print("✓ numpy está instalado correctamente")
+except ImportError:
+    print("✗ numpy NO está instalado (opcional, necesario para --vad)")
+    print("  Instálalo con: pip install numpy")
+
+try:
+    import tiktoken
+    print("✓ tiktoken está instalado correctamente")
+except ImportError:
+    print("✗ tiktoken NO está instalado (opcional, cuenta exacta de tokens para las actas)")
+    print("  Instálalo con: pip install tiktoken")
+
+try:
+    import httpx
+    import h2
+    print("✓ httpx con HTTP/2 está instalado correctamente")
+except ImportError:
+    print("✗ httpx con HTTP/2 NO está instalado (opcional, se usará requests)")
+    print("  Instálalo con: pip install 'httpx[http2]'")
+
+try:
+    import vosk
+    print("✓ vosk está instalado correctamente")
+except ImportError:
+    print("✗ vosk NO está instalado (opcional, reconocimiento local con --engine vosk)")
+    print("  Instálalo con: pip install vosk==0.3.45 (en el despliegue, INSTALL_LOCAL_ASR=1)")
+
+try:
+    import faster_whisper
+    print("✓ faster-whisper está instalado correctamente")
+except ImportError:
+    print("✗ faster-whisper NO está instalado (opcional, reconocimiento local con --engine whisper)")
+    print("  Instálalo con: pip install faster-whisper==1.0.3 (en el despliegue, INSTALL_LOCAL_ASR=1)")
+
 # Verificar dependencias adicionales para pydub
 if 'pydub' in locals():
     print("\nVerificando dependencias para conversión de archivos MP3:")
@@ -0,0 +1,140 @@
+# Caché en disco direccionada por contenido con expulsión LRU por tamaño y
+# caducidad opcional
+import os
+import time
+import json
+import hashlib
+import tempfile
+import threading
+
+DEFAULT_CACHE_ROOT = os.path.join(tempfile.gettempdir(), "docubox-cache")
+
+def make_key(*parts):
+    """
+    Genera una clave estable a partir de varias partes (texto o datos JSON)
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, (str, bytes)):
+            part = json.dumps(part, sort_keys=True, ensure_ascii=False)
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class DiskCache:
+    """
+    Guarda valores JSON en archivos con nombre igual a su clave. La fecha de
+    modificación marca el último uso; cuando el tamaño total supera max_bytes
+    se eliminan las entradas usadas hace más tiempo. Con ttl (segundos) las
+    entradas creadas hace más tiempo se consideran caducadas.
+    """
+    def __init__(self, directory, max_bytes, ttl=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # El tamaño total se calcula en la primera escritura, no al abrir la
+        # caché: los procesos que solo leen no recorren el directorio
+        self._total_bytes = None
+
+    @property
+    def total_bytes(self):
+        with self.lock:
+            if self._total_bytes is None:
+                self._scan()
+            return self._total_bytes
+
+    def _scan(self):
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _entries(self):
+        """
+        Lista (ruta, tamaño, último uso) de todas las entradas
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or "value" not in entry:
+            # Entrada con un formato anterior
+            return None
+        if self.ttl and time.time() - entry.get("created", 0) > self.ttl:
+            self.delete(key)
+            return None
+        try:
+            # Marcar como usada recientemente
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def delete(self, key):
+        path = self._path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self.lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def set(self, key, value):
+        path = self._path(key)
+        data = json.dumps({"created": time.time(), "value": value}, ensure_ascii=False).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            temp_path = path + f".{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Aviso: no se pudo escribir en la caché: {e}")
+            return
+        with self.lock:
+            if self._total_bytes is None:
+                # El recorrido ya incluye la entrada recién escrita
+                self._scan()
+            else:
+                self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Elimina las entradas menos usadas hasta quedar en el 90% del límite
+        """
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._total_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
@@ -0,0 +1,346 @@
+# Generación del acta en Word (DOCX) a partir del texto formateado.
+# La plantilla con los estilos (título, encabezados, texto normal y listas) se
+# prepara una sola vez por proceso; cada acta se analiza en una pasada en una
+# lista de secciones y se genera el XML de todos sus párrafos de una vez, en
+# lugar de llamar a add_paragraph() por cada línea.
+#
+# Acepta tanto el texto plano de Perplexity como el Markdown de ChatGPT y
+# Claude (encabezados con #, negritas y cursivas, viñetas y líneas ---).
+# DOCX_TEMPLATE puede apuntar a un .docx propio (membrete, estilos de la
+# organización); su contenido se conserva y el acta se añade a continuación.
+#
+# Uso:
+#   save_acta_docx(texto, "reunion_acta_formatada.docx")
+import os
+import io
+import re
+import threading
+from xml.sax.saxutils import escape
+
+try:
+    from docx import Document
+    from docx.shared import Pt, RGBColor
+    from docx.oxml import parse_xml
+except ImportError:
+    Document = None
+
+DOCX_TEMPLATE = os.environ.get("DOCX_TEMPLATE")
+
+W_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+# Palabras que identifican un encabezado de sección en las actas de texto plano
+SECTION_KEYWORDS = ["FECHA", "DETALLES DE LA REUNIÓN", "ASISTENTES", "PARTICIPANTES",
+                    "QUÓRUM", "ORDEN DEL DÍA", "DESARROLLO", "ACUERDOS",
+                    "TAREAS PENDIENTES", "CIERRE", "INTRODUCCIÓN"]
+SECTION_MAX_LENGTH = 60
+TITLE_MAX_LENGTH = 50
+LABEL_MAX_LENGTH = 25
+
+# Sangría de las listas en twips (1440 = 1 pulgada)
+LIST_INDENT = 360
+CONTINUATION_INDENT = 720
+
+_SECTION_RE = re.compile("|".join(re.escape(keyword) for keyword in SECTION_KEYWORDS))
+_MARKDOWN_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$", re.MULTILINE)
+_BULLET_RE = re.compile(r"^[-•*]\s+(.*)$")
+_NUMBERED_RE = re.compile(r"^\d+[.):]\s*(.*)$")
+_LABEL_RE = re.compile(r"^([^:]+):\s*(.*)$")
+_RULE_RE = re.compile(r"^(?:-{3,}|\*{3,}|_{3,}|═{3,}|─{3,})$")
+_INLINE_RE = re.compile(r"\*\*([^\n]+?)\*\*|\*([^\s*](?:[^*\n]*[^\s*])?)\*")
+# Caracteres de control que no admite XML
+_INVALID_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+class Section:
+    """
+    Sección del acta: un título ("title"), un encabezado ("heading", con su
+    nivel) o el texto previo al primer encabezado ("preamble"), con sus
+    bloques en orden. Cada bloque es una tupla (tipo, texto) con tipo
+    "paragraph", "label", "bullet", "numbered", "continuation", "rule" o
+    "blank".
+    """
+    def __init__(self, kind, heading="", level=1):
+        self.kind = kind
+        self.heading = heading
+        self.level = level
+        self.blocks = []
+
+    def __repr__(self):
+        return f"Section({self.kind!r}, {self.heading!r}, {len(self.blocks)} bloques)"
+
+def parse_acta(text):
+    """
+    Recorre el acta una vez y devuelve la lista de secciones
+    """
+    sections = [Section("preamble")]
+    blocks = sections[0].blocks
+    seen_title = False
+    in_list = False
+    # Si el acta usa encabezados Markdown no se buscan encabezados por palabras clave
+    markdown = _MARKDOWN_HEADING_RE.search(text) is not None
+
+    for raw_line in text.split("\n"):
+        line = raw_line.strip()
+        if not line:
+            blocks.append(("blank", ""))
+            in_list = False
+            continue
+
+        heading = _MARKDOWN_HEADING_RE.match(line)
+        if heading:
+            level = len(heading.group(1))
+            title = _strip_inline(heading.group(2))
+            if not seen_title:
+                sections.append(Section("title", title))
+                seen_title = True
+            else:
+                sections.append(Section("heading", title, min(level - 1, 2) or 1))
+            blocks = sections[-1].blocks
+            in_list = False
+            continue
+
+        upper = _strip_inline(line).upper()
+        if not seen_title or (not markdown and (upper.startswith("ACTA DE") or
+                                                ("ACTA " in upper and len(line) < TITLE_MAX_LENGTH))):
+            sections.append(Section("title", _strip_inline(line)))
+            blocks = sections[-1].blocks
+            seen_title = True
+            in_list = False
+            continue
+
+        if not markdown and len(line) < SECTION_MAX_LENGTH and _SECTION_RE.search(upper) \
+                and not _BULLET_RE.match(line):
+            sections.append(Section("heading", _strip_inline(line)))
+            blocks = sections[-1].blocks
+            in_list = False
+            continue
+
+        if _RULE_RE.match(line):
+            blocks.append(("rule", ""))
+            in_list = False
+            continue
+
+        bullet = _BULLET_RE.match(line)
+        if bullet:
+            blocks.append(("bullet", bullet.group(1)))
+            in_list = True
+            continue
+
+        numbered = _NUMBERED_RE.match(line)
+        if numbered and len(line) > 3:
+            blocks.append(("numbered", numbered.group(1)))
+            in_list = True
+            continue
+
+        if in_list and raw_line[:1] in (" ", "\t"):
+            blocks.append(("continuation", line))
+            continue
+
+        if _is_label(line):
+            blocks.append(("label", line))
+        else:
+            blocks.append(("paragraph", line))
+        in_list = False
+
+    if not sections[0].blocks:
+        sections.pop(0)
+    return sections
+
+def _is_label(text):
+    """
+    Líneas "Etiqueta: valor" con una etiqueta corta. Si la etiqueta ya lleva
+    negrita Markdown se deja como párrafo normal.
+    """
+    label = _LABEL_RE.match(text)
+    return label is not None and len(label.group(1)) < LABEL_MAX_LENGTH and "*" not in label.group(1)
+
+def _strip_inline(text):
+    return _INLINE_RE.sub(lambda match: match.group(1) or match.group(2), text)
+
+class _Template:
+    """
+    Plantilla en memoria con los identificadores de estilo que se usan
+    """
+    def __init__(self, data, style_ids):
+        self.data = data
+        self.style_ids = style_ids
+
+_template = None
+_template_lock = threading.Lock()
+
+def _build_template():
+    if DOCX_TEMPLATE and os.path.exists(DOCX_TEMPLATE):
+        with open(DOCX_TEMPLATE, "rb") as f:
+            data = f.read()
+        doc = Document(io.BytesIO(data))
+    else:
+        doc = Document()
+        styles = doc.styles
+
+        # Estilo para título principal
+        style_title = styles['Title']
+        style_title.font.name = 'Calibri'
+        style_title.font.size = Pt(16)
+        style_title.font.bold = True
+        style_title.font.color.rgb = RGBColor(0, 0, 102)  # Azul oscuro
+
+        # Estilo para encabezados de sección
+        for name, size in (('Heading 1', 14), ('Heading 2', 12)):
+            style_heading = styles[name]
+            style_heading.font.name = 'Calibri'
+            style_heading.font.size = Pt(size)
+            style_heading.font.bold = True
+            style_heading.font.color.rgb = RGBColor(0, 51, 102)  # Azul oscuro
+
+        # Estilo para texto normal
+        style_normal = styles['Normal']
+        style_normal.font.name = 'Calibri'
+        style_normal.font.size = Pt(11)
+
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        data = buffer.getvalue()
+
+    style_ids = {}
+    for name in ("Title", "Heading 1", "Heading 2", "Normal", "List Bullet", "List Bullet 2", "List Number"):
+        try:
+            style_ids[name] = doc.styles[name].style_id
+        except KeyError:
+            # Plantillas propias sin alguno de los estilos: se usa Normal
+            style_ids[name] = None
+    return _Template(data, style_ids)
+
+def get_template():
+    """
+    Devuelve la plantilla del proceso, preparándola la primera vez
+    """
+    global _template
+    if Document is None:
+        raise ImportError("python-docx no está instalado")
+    with _template_lock:
+        if _template is None:
+            _template = _build_template()
+    return _template
+
+def _runs(text, bold=False):
+    """
+    XML de los fragmentos de texto, con negrita y cursiva Markdown
+    """
+    parts = []
+    position = 0
+    for match in _INLINE_RE.finditer(text):
+        if match.start() > position:
+            parts.append(_run(text[position:match.start()], bold))
+        if match.group(1) is not None:
+            parts.append(_run(match.group(1), True))
+        else:
+            parts.append(_run(match.group(2), bold, italic=True))
+        position = match.end()
+    if position < len(text):
+        parts.append(_run(text[position:], bold))
+    return "".join(parts)
+
+def _run(text, bold=False, italic=False):
+    properties = ("<w:b/>" if bold else "") + ("<w:i/>" if italic else "")
+    if properties:
+        properties = f"<w:rPr>{properties}</w:rPr>"
+    text = escape(_INVALID_XML_RE.sub("", text))
+    return f'<w:r>{properties}<w:t xml:space="preserve">{text}</w:t></w:r>'
+
+def _paragraph(runs="", style_id=None, center=False, indent=None, rule=False):
+    properties = ""
+    if style_id:
+        properties += f'<w:pStyle w:val="{style_id}"/>'
+    if rule:
+        properties += ('<w:pBdr><w:bottom w:val="single" w:sz="6" w:space="1" w:color="000000"/></w:pBdr>')
+    if indent is not None:
+        properties += f'<w:ind w:left="{indent}"/>'
+    if center:
+        properties += '<w:jc w:val="center"/>'
+    if properties:
+        properties = f"<w:pPr>{properties}</w:pPr>"
+    return f"<w:p>{properties}{runs}</w:p>"
+
+def render_paragraphs(sections, style_ids):
+    """
+    Genera el XML (w:p) de todas las secciones
+    """
+    parts = []
+    rule = _paragraph(rule=True)
+    first_title = True
+    for section in sections:
+        if section.kind == "title":
+            # Los títulos van centrados y entre líneas horizontales
+            if not first_title:
+                parts.append(rule)
+            parts.append(_paragraph(_runs(section.heading), style_ids["Title"], center=True))
+            parts.append(rule)
+            first_title = False
+        elif section.kind == "heading":
+            style = style_ids["Heading 2"] if section.level > 1 else style_ids["Heading 1"]
+            parts.append(_paragraph(_runs(section.heading), style))
+
+        for kind, text in section.blocks:
+            if kind == "blank":
+                parts.append("<w:p/>")
+            elif kind == "rule":
+                parts.append(rule)
+            elif kind == "paragraph":
+                parts.append(_paragraph(_runs(text), style_ids["Normal"]))
+            elif kind == "label":
+                # Etiqueta en negrita seguida del valor en texto normal
+                parts.append(_paragraph(_list_runs(text), style_ids["Normal"]))
+            elif kind == "bullet":
+                parts.append(_paragraph(_list_runs(text), style_ids["List Bullet"], indent=LIST_INDENT))
+            elif kind == "numbered":
+                parts.append(_paragraph(_list_runs(text), style_ids["List Number"], indent=LIST_INDENT))
+            elif kind == "continuation":
+                parts.append(_paragraph(_runs(text), style_ids["List Bullet 2"], indent=CONTINUATION_INDENT))
+    return parts
+
+def _list_runs(text):
+    """
+    Texto de un párrafo o elemento de lista; en los del tipo "Responsable:
+    Juan" la etiqueta va en negrita
+    """
+    if _is_label(text):
+        label, value = _LABEL_RE.match(text).groups()
+        return _run(label.strip() + ":", True) + _runs(" " + value.strip())
+    return _runs(text)
+
+def render_docx(text, sections=None):
+    """
+    Devuelve el documento Word (objeto de python-docx) con el acta. Si se
+    pasan las secciones (p. ej. de un acta estructurada) no se analiza el texto.
+    """
+    template = get_template()
+    doc = Document(io.BytesIO(template.data))
+    if sections is None:
+        sections = parse_acta(text)
+    parts = render_paragraphs(sections, template.style_ids)
+    fragment = parse_xml(f'<w:body xmlns:w="{W_NAMESPACE}">{"".join(parts)}</w:body>')
+    body = doc.element.body
+    section_properties = body.sectPr
+    body.extend(list(fragment))
+    if section_properties is not None:
+        # Las propiedades de sección deben ser el último elemento del cuerpo
+        body.append(section_properties)
+    return doc
+
+def save_acta_docx(text, docx_path, sections=None):
+    """
+    Guarda el acta en docx_path. Devuelve la ruta, o None si no se pudo
+    (sin python-docx o por un error), en cuyo caso queda solo el TXT.
+    """
+    print(f"Generando documento Word en: {docx_path}")
+    try:
+        render_docx(text, sections).save(docx_path)
+    except ImportError as ie:
+        print(f"AVISO: No se pudo crear el documento Word porque falta la biblioteca python-docx: {str(ie)}")
+        print("Por favor, instale python-docx con: pip install python-docx")
+        return None
+    except Exception as e:
+        print(f"Error al crear documento Word: {str(e)}")
+        print("Continuando con solo la versión de texto plano...")
+        return None
+    print(f"Documento Word guardado en: {docx_path}")
+    return docx_path
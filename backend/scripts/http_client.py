@@ -0,0 +1,123 @@
+# Cliente HTTP compartido para las llamadas a los proveedores de IA.
+# Mantiene un grupo de conexiones abiertas (keep-alive) entre llamadas, fija
+# tiempos de espera de conexión y lectura y usa HTTP/2 si httpx y h2 están
+# instalados. Si no, usa una requests.Session con el mismo comportamiento.
+import os
+import atexit
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    import h2  # noqa: F401 (necesario para http2=True)
+except ImportError:
+    httpx = None
+
+# Segundos para establecer la conexión y para esperar cada lectura de la
+# respuesta (las actas largas pueden tardar varios minutos en generarse)
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "300"))
+
+# Conexiones abiertas por host (debe cubrir los tramos que se resumen en paralelo)
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "16"))
+
+# Errores de red de cualquiera de las dos implementaciones
+HTTP_ERRORS = (requests.RequestException,) + ((httpx.HTTPError,) if httpx is not None else ())
+
+class ProviderClient:
+    """
+    Cliente reutilizable con la interfaz mínima que usan los scripts:
+    get() y post() devuelven una respuesta con status_code, text, json() y
+    raise_for_status() tanto con httpx como con requests.
+    """
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, pool_size=POOL_SIZE):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        if httpx is not None:
+            self.backend = "httpx"
+            self.session = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size))
+        else:
+            self.backend = "requests"
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+    def _timeout(self, timeout):
+        """
+        timeout puede ser None (valores por defecto), un número (lectura) o
+        una tupla (conexión, lectura)
+        """
+        if timeout is None:
+            timeout = (self.connect_timeout, self.read_timeout)
+        elif not isinstance(timeout, tuple):
+            timeout = (self.connect_timeout, timeout)
+        if self.backend == "httpx":
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        return timeout
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """
+        Envía la petición por la conexión compartida
+        """
+        return self.session.request(method, url, timeout=self._timeout(timeout), **kwargs)
+
+    @contextmanager
+    def stream(self, method, url, timeout=None, **kwargs):
+        """
+        Envía la petición sin leer la respuesta completa. Devuelve un
+        StreamedResponse cuyas líneas se leen a medida que llegan.
+        """
+        timeout = self._timeout(timeout)
+        if self.backend == "httpx":
+            with self.session.stream(method, url, timeout=timeout, **kwargs) as response:
+                yield StreamedResponse(response.status_code, response.headers, response.iter_lines,
+                                       lambda: response.read().decode("utf-8", "replace"))
+        else:
+            with self.session.request(method, url, timeout=timeout, stream=True, **kwargs) as response:
+                # iter_lines de requests devuelve bytes; se decodifica como UTF-8
+                # porque text/event-stream no suele declarar el charset
+                yield StreamedResponse(response.status_code, response.headers,
+                                       lambda: (line.decode("utf-8", "replace") for line in response.iter_lines()),
+                                       lambda: response.content.decode("utf-8", "replace"))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+class StreamedResponse:
+    """
+    Respuesta en curso: status_code, headers, iter_lines() y read_text() para
+    el cuerpo completo de las respuestas de error
+    """
+    def __init__(self, status_code, headers, iter_lines, read_text):
+        self.status_code = status_code
+        self.headers = headers
+        self.iter_lines = iter_lines
+        self.read_text = read_text
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Devuelve el cliente HTTP del proceso, creándolo la primera vez
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ProviderClient()
+                atexit.register(_client.close)
+    return _client
@@ -0,0 +1,328 @@
+# Cola persistente de trabajos de transcripción y procesamiento con IA.
+# Limita cuántos trabajos corren a la vez en cada etapa para que varias
+# subidas simultáneas no saturen la máquina.
+#
+# Uso:
+#   python job_queue.py submit transcribe audio.mp3 --summarize --priority 5
+#   python job_queue.py submit summarize audio_transcripcion.txt
+#   python job_queue.py run
+#   python job_queue.py status
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+
+DEFAULT_DB_PATH = os.environ.get("JOB_QUEUE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_queue.sqlite3"))
+
+# Etapas y trabajadores por defecto:
+#   decode     -> trabajos de transcripción simultáneos (cada uno decodifica su audio)
+#   recognize  -> hilos de reconocimiento repartidos entre esos trabajos
+#   summarize  -> llamadas simultáneas a la IA para generar actas
+DEFAULT_STAGE_WORKERS = {"decode": 1, "recognize": 4, "summarize": 2}
+DEFAULT_MAX_PENDING = 50
+POLL_INTERVAL = 1.0
+
+# Cada ejecutor renueva cada HEARTBEAT_INTERVAL segundos la marca de sus
+# trabajos en curso; los que llevan más de STALE_AFTER sin renovarse son de un
+# ejecutor caído y vuelven a pendientes
+HEARTBEAT_INTERVAL = 15.0
+STALE_AFTER = 120.0
+
+# Etapa de la cola que atiende cada tipo de trabajo
+JOB_STAGES = {"transcribe": "decode", "summarize": "summarize"}
+
+class QueueFull(Exception):
+    """
+    La cola alcanzó el máximo de trabajos pendientes
+    """
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    runner TEXT,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, kind, priority DESC, id);
+"""
+
+class JobQueue:
+    """
+    Cola de trabajos guardada en SQLite. Cada hilo abre su propia conexión.
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_pending=DEFAULT_MAX_PENDING):
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.local = threading.local()
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        # Bases de datos creadas antes de las columnas runner y heartbeat
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("runner", "TEXT"), ("heartbeat", "REAL")):
+            if column not in columns:
+                connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            self.local.connection = connection
+        return connection
+
+    def pending_count(self):
+        row = self.connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()
+        return row[0]
+
+    def submit(self, kind, params, priority=0, wait=False, timeout=None, enforce_limit=True):
+        """
+        Añade un trabajo a la cola y devuelve su id. Si la cola está llena se
+        rechaza con QueueFull, o con wait=True se espera hasta que haya sitio
+        (como mucho timeout segundos). Los trabajos encadenados a uno ya
+        aceptado usan enforce_limit=False para no bloquearse entre sí.
+        """
+        if kind not in JOB_STAGES:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        deadline = time.time() + timeout if timeout else None
+        while enforce_limit and self.max_pending and self.pending_count() >= self.max_pending:
+            if not wait or (deadline and time.time() >= deadline):
+                raise QueueFull(f"La cola tiene {self.max_pending} trabajos pendientes")
+            time.sleep(POLL_INTERVAL)
+
+        cursor = self.connection().execute(
+            "INSERT INTO jobs (kind, priority, params, created) VALUES (?, ?, ?, ?)",
+            (kind, priority, json.dumps(params, ensure_ascii=False), time.time()))
+        return cursor.lastrowid
+
+    def claim(self, kind, runner):
+        """
+        Toma el siguiente trabajo pendiente de mayor prioridad para el
+        ejecutor runner, o None
+        """
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' AND kind = ? "
+                "ORDER BY priority DESC, id LIMIT 1", (kind,)).fetchone()
+            if row is not None:
+                now = time.time()
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', started = ?, attempts = attempts + 1, "
+                    "runner = ?, heartbeat = ? WHERE id = ?",
+                    (now, runner, now, row["id"]))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return row
+
+    def finish(self, job_id, runner, result=None, error=None):
+        """
+        Marca el trabajo como terminado si sigue asignado a runner (si se dio
+        por caído y lo tomó otro ejecutor, el resultado de este se descarta)
+        """
+        cursor = self.connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? "
+            "WHERE id = ? AND runner = ? AND status = 'running'",
+            ("failed" if error else "done", json.dumps(result, ensure_ascii=False), error, time.time(),
+             job_id, runner))
+        return cursor.rowcount > 0
+
+    def heartbeat(self, runner):
+        """
+        Renueva la marca de los trabajos en curso de runner
+        """
+        self.connection().execute(
+            "UPDATE jobs SET heartbeat = ? WHERE runner = ? AND status = 'running'", (time.time(), runner))
+
+    def recover(self, stale_after=STALE_AFTER):
+        """
+        Devuelve a pendientes los trabajos en curso cuyo ejecutor dejó de
+        renovar su marca hace más de stale_after segundos (se cayó). Los de
+        ejecutores vivos, aunque usen la misma base de datos, no se tocan.
+        """
+        cursor = self.connection().execute(
+            "UPDATE jobs SET status = 'pending', runner = NULL WHERE status = 'running' "
+            "AND (heartbeat IS NULL OR heartbeat < ?)", (time.time() - stale_after,))
+        return cursor.rowcount
+
+    def summary(self):
+        rows = self.connection().execute(
+            "SELECT kind, status, COUNT(*) AS total FROM jobs GROUP BY kind, status ORDER BY kind, status")
+        return [dict(row) for row in rows]
+
+def run_transcribe(params, queue, stage_workers):
+    """
+    Trabajo de transcripción: llama a transcribe_audio_file y, si se pidió,
+    encola el procesamiento del resultado con la IA
+    """
+    from transcribe_audio import transcribe_audio_file, transcript_path_for
+
+    params = dict(params)
+    audio_path = params.pop("audio_path")
+    summarize = params.pop("summarize", None)
+    priority = params.pop("priority", 0)
+    # Repartir los hilos de reconocimiento entre los trabajos simultáneos
+    params.setdefault("workers", max(1, stage_workers["recognize"] // max(1, stage_workers["decode"])))
+    # Cada trabajo reanuda su punto de control si se reintenta tras una caída
+    params.setdefault("resume", True)
+
+    # Los fallos de carga o decodificación se propagan y marcan el trabajo
+    # como fallido, aunque exista una transcripción anterior del mismo audio
+    params["raise_errors"] = True
+    transcribe_audio_file(audio_path, **params)
+    transcript_file = transcript_path_for(audio_path)
+
+    result = {"transcript_file": transcript_file}
+    if summarize is not None:
+        summarize_params = dict(summarize) if isinstance(summarize, dict) else {}
+        summarize_params["transcript_path"] = transcript_file
+        result["summarize_job"] = queue.submit("summarize", summarize_params, priority, enforce_limit=False)
+    return result
+
+def run_summarize(params, queue, stage_workers):
+    """
+    Trabajo de IA: llama a process_transcript_with_perplexity
+    """
+    from process_transcript_perplexity import process_transcript_with_perplexity
+
+    api_key = params.get("api_key") or os.environ.get("PERPLEXITY_API_KEY")
+    if not api_key:
+        raise ValueError("Se requiere API Key de Perplexity")
+    output_file = process_transcript_with_perplexity(
+        params["transcript_path"], api_key, params.get("prompt"), params.get("output"))
+    if not output_file:
+        raise RuntimeError("No se pudo generar el acta formateada")
+    return {"output_file": output_file}
+
+JOB_HANDLERS = {"transcribe": run_transcribe, "summarize": run_summarize}
+
+class JobScheduler:
+    """
+    Arranca un grupo de hilos por etapa que toman trabajos de la cola, más
+    un hilo que renueva la marca de sus trabajos en curso y recupera los de
+    ejecutores caídos
+    """
+    def __init__(self, queue, stage_workers=None):
+        self.queue = queue
+        self.stage_workers = dict(DEFAULT_STAGE_WORKERS, **(stage_workers or {}))
+        self.runner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def heartbeat_loop(self):
+        while not self.stop_event.wait(HEARTBEAT_INTERVAL):
+            self.queue.heartbeat(self.runner)
+            recovered = self.queue.recover()
+            if recovered:
+                print(f"[COLA] {recovered} trabajos de un ejecutor caído vuelven a estar pendientes")
+
+    def worker_loop(self, kind):
+        while not self.stop_event.is_set():
+            job = self.queue.claim(kind, self.runner)
+            if job is None:
+                self.stop_event.wait(POLL_INTERVAL)
+                continue
+
+            print(f"[COLA] Iniciando trabajo {job['id']} ({kind})")
+            start_time = time.time()
+            try:
+                result = JOB_HANDLERS[kind](json.loads(job["params"]), self.queue, self.stage_workers)
+                self.queue.finish(job["id"], self.runner, result=result)
+                print(f"[COLA] Trabajo {job['id']} completado en {time.time() - start_time:.2f} segundos")
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                self.queue.finish(job["id"], self.runner, error=error)
+                print(f"[COLA] Trabajo {job['id']} falló: {error}")
+
+    def start(self):
+        recovered = self.queue.recover()
+        if recovered:
+            print(f"[COLA] {recovered} trabajos interrumpidos vuelven a estar pendientes")
+        heartbeat = threading.Thread(target=self.heartbeat_loop, name="heartbeat", daemon=True)
+        heartbeat.start()
+        self.threads.append(heartbeat)
+        for kind, stage in JOB_STAGES.items():
+            for n in range(max(1, self.stage_workers[stage])):
+                thread = threading.Thread(target=self.worker_loop, args=(kind,),
+                                          name=f"{kind}-{n}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        print(f"[COLA] Trabajadores por etapa: {self.stage_workers}")
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+
+def main():
+    parser = argparse.ArgumentParser(description='Cola de trabajos de transcripción y actas')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Ruta de la base de datos SQLite de la cola')
+    parser.add_argument('--max_pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help='Máximo de trabajos pendientes antes de rechazar o esperar (0 sin límite)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    submit_parser = subparsers.add_parser('submit', help='Encolar un trabajo')
+    submit_parser.add_argument('kind', choices=sorted(JOB_HANDLERS))
+    submit_parser.add_argument('path', help='Audio (transcribe) o transcripción (summarize)')
+    submit_parser.add_argument('--priority', type=int, default=0)
+    submit_parser.add_argument('--summarize', action='store_true',
+                               help='Tras transcribir, encolar el procesamiento con IA')
+    submit_parser.add_argument('--wait', action='store_true',
+                               help='Esperar a que haya sitio en lugar de rechazar el trabajo')
+    submit_parser.add_argument('--timeout', type=float, help='Segundos máximos de espera con --wait')
+
+    run_parser = subparsers.add_parser('run', help='Procesar los trabajos de la cola')
+    for stage, workers in DEFAULT_STAGE_WORKERS.items():
+        run_parser.add_argument(f'--{stage}_workers', type=int, default=workers)
+
+    subparsers.add_parser('status', help='Mostrar el estado de la cola')
+
+    args = parser.parse_args()
+    queue = JobQueue(args.db, args.max_pending)
+
+    if args.command == 'submit':
+        if args.kind == 'transcribe':
+            params = {"audio_path": os.path.abspath(args.path), "priority": args.priority}
+            if args.summarize:
+                params["summarize"] = {}
+        else:
+            params = {"transcript_path": os.path.abspath(args.path)}
+        try:
+            job_id = queue.submit(args.kind, params, args.priority, wait=args.wait, timeout=args.timeout)
+        except QueueFull as e:
+            print(f"Error: {e}")
+            sys.exit(2)
+        print(f"Trabajo {job_id} encolado")
+    elif args.command == 'run':
+        scheduler = JobScheduler(queue, {stage: getattr(args, f"{stage}_workers") for stage in DEFAULT_STAGE_WORKERS})
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(POLL_INTERVAL)
+        except KeyboardInterrupt:
+            print("[COLA] Deteniendo trabajadores...")
+            scheduler.stop()
+    else:
+        for row in queue.summary():
+            print(f"{row['kind']:<12} {row['status']:<10} {row['total']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Modo trabajador persistente: recibe trabajos como líneas JSON por stdin
+# y responde con una línea JSON por trabajo en stdout.
+#
+# Solicitud:  {"id": "1", "params": {...}}   o   {"id": "2", "cmd": "ping"}
+# Respuesta:  {"id": "1", "ok": true, "result": ..., "elapsed": 1.23}
+#             {"id": "1", "ok": false, "error": "mensaje"}
+# Al arrancar se emite {"event": "ready", "pid": ...}. Al cerrar stdin se
+# terminan los trabajos en curso y el proceso sale. Los trabajos pueden emitir
+# eventos de progreso con emit_event(): {"id": "1", "event": "delta", ...}
+import os
+import sys
+import json
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_JOBS = 2
+
+# Trabajo en curso en cada hilo del trabajador, para asociarle sus eventos
+_current_job = threading.local()
+
+# stdout original cuando events_to_stdout() desvía los print() a stderr
+_event_output = None
+
+def events_to_stdout():
+    """
+    Reserva stdout para los eventos JSON-lines de emit_event() y desvía los
+    print() de los scripts a stderr
+    """
+    global _event_output
+    if _event_output is None:
+        _event_output = sys.stdout
+        sys.stdout = sys.stderr
+
+def emit_event(message):
+    """
+    Emite un evento de progreso como una línea JSON. Dentro de un trabajo del
+    modo --worker se envía por el protocolo con el id del trabajo.
+    """
+    worker = getattr(_current_job, "worker", None)
+    if worker is not None:
+        worker.send(dict(message, id=_current_job.job_id))
+        return
+    output = _event_output or sys.stdout
+    output.write(json.dumps(message, ensure_ascii=False) + "\n")
+    output.flush()
+
+class JsonLinesWorker:
+    """
+    Ejecuta un manejador por cada solicitud con un máximo de max_jobs
+    trabajos simultáneos. Los print() de los scripts se desvían a stderr para
+    que stdout contenga solo el protocolo.
+    """
+    def __init__(self, handler, max_jobs=DEFAULT_MAX_JOBS, name="worker"):
+        self.handler = handler
+        self.max_jobs = max(1, int(max_jobs or 1))
+        self.name = name
+        self.output = sys.stdout
+        self.output_lock = threading.Lock()
+
+    def send(self, message):
+        line = json.dumps(message, ensure_ascii=False)
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def run_job(self, job_id, params):
+        start_time = time.time()
+        _current_job.worker = self
+        _current_job.job_id = job_id
+        try:
+            result = self.handler(params)
+            self.send({"id": job_id, "ok": True, "result": result,
+                       "elapsed": round(time.time() - start_time, 3)})
+        except SystemExit as e:
+            # Algunos scripts terminan con sys.exit() ante un error
+            self.send({"id": job_id, "ok": False, "error": f"El trabajo terminó con código {e.code}",
+                       "elapsed": round(time.time() - start_time, 3)})
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            self.send({"id": job_id, "ok": False, "error": f"{type(e).__name__}: {e}",
+                       "elapsed": round(time.time() - start_time, 3)})
+        finally:
+            _current_job.worker = None
+
+    def serve(self, input_stream=None):
+        input_stream = input_stream or sys.stdin
+        # A partir de aquí cualquier print() va a stderr
+        sys.stdout = sys.stderr
+        self.send({"event": "ready", "worker": self.name, "pid": os.getpid(), "max_jobs": self.max_jobs})
+
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            for line in input_stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    self.send({"id": None, "ok": False, "error": f"JSON inválido: {e}"})
+                    continue
+                if not isinstance(request, dict):
+                    self.send({"id": None, "ok": False, "error": "La solicitud debe ser un objeto JSON"})
+                    continue
+
+                job_id = request.get("id")
+                command = request.get("cmd")
+                if command == "ping":
+                    self.send({"id": job_id, "ok": True, "result": "pong"})
+                elif command == "shutdown":
+                    break
+                else:
+                    executor.submit(self.run_job, job_id, request.get("params") or {})
+
+        sys.stdout = self.output
+
+def serve(handler, max_jobs=DEFAULT_MAX_JOBS, name="worker"):
+    """
+    Atajo para arrancar un trabajador JSON-lines con un manejador
+    """
+    JsonLinesWorker(handler, max_jobs, name).serve()
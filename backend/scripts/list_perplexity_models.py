@@ -1,4 +1,4 @@
-import requests
+from http_client import get_client
 import sys
 
 # La clave API se pasa como primer argumento
@@ -21,7 +21,7 @@ headers = {
 # Hacer la solicitud
 try:
     print("Consultando modelos disponibles en Perplexity API...")
-    response = requests.get(api_url, headers=headers)
+    response = get_client().get(api_url, headers=headers)
     print(f"Código de estado: {response.status_code}")
     
     # Imprimir la respuesta
@@ -0,0 +1,471 @@
+# Capa común y asíncrona para los proveedores de IA (OpenAI, Anthropic y
+# Perplexity). Todos reciben un LLMRequest y devuelven un LLMResponse, limitan
+# sus llamadas simultáneas con un semáforo y pueden devolver la respuesta en
+# streaming, de modo que un trabajo puede lanzar muchas llamadas a la vez.
+#
+# Uso:
+#   provider = create_provider("openai", api_key, concurrency=4)
+#   response = await provider.complete(LLMRequest(system, user, max_tokens=2000))
+#   async for text in provider.stream(request): ...
+#   await provider.aclose()
+#
+# Con cache=response_cache() las respuestas se guardan en disco por modelo,
+# prompt, contenido, temperatura y max_tokens y se devuelven sin llamar a la
+# API si se repite la misma petición.
+import os
+import json
+import time
+import asyncio
+import threading
+
+from disk_cache import DiskCache, DEFAULT_CACHE_ROOT, make_key
+from http_client import get_client, HTTP_ERRORS, CONNECT_TIMEOUT, READ_TIMEOUT
+from rate_limits import RetryPolicy, get_limiter, is_retryable_status, retry_after
+from token_budget import count_tokens
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
+DEFAULT_CONCURRENCY = 4
+
+# Caché de respuestas, compartida entre ejecuciones
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", os.path.join(DEFAULT_CACHE_ROOT, "respuestas_ia"))
+LLM_CACHE_MAX_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "100"))
+LLM_CACHE_TTL_HOURS = float(os.environ.get("LLM_CACHE_TTL_HOURS", "168"))
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def response_cache():
+    """
+    Devuelve la caché de respuestas del proceso, o None si no se puede abrir
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            try:
+                _response_cache = DiskCache(LLM_CACHE_DIR, LLM_CACHE_MAX_MB * 1024 * 1024,
+                                            ttl=LLM_CACHE_TTL_HOURS * 3600)
+            except OSError as e:
+                print(f"Aviso: no se pudo abrir la caché de respuestas: {e}")
+                return None
+    return _response_cache
+
+class LLMRequest:
+    """
+    Petición a un modelo: prompt de sistema, contenido del usuario y límites
+    """
+    def __init__(self, system, user, max_tokens=2000, temperature=None):
+        self.system = system
+        self.user = user
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+class LLMResponse:
+    """
+    Respuesta de un modelo con el texto y los datos de la llamada
+    """
+    def __init__(self, text, provider, model, elapsed, usage=None, finish_reason=None, cached=False):
+        self.text = text
+        self.provider = provider
+        self.model = model
+        self.elapsed = elapsed
+        self.usage = usage or {}
+        self.finish_reason = finish_reason
+        self.cached = cached
+
+class ProviderError(Exception):
+    """
+    Error de una llamada a un proveedor. retryable indica si tiene sentido
+    repetirla (límite de tasa, error del servidor o de red) y retry_after los
+    segundos que pidió esperar el servidor.
+    """
+    def __init__(self, message, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+_DONE = object()
+
+async def iterate_in_thread(factory):
+    """
+    Recorre en un hilo el iterador bloqueante que devuelve factory() y
+    entrega sus elementos al bucle de eventos a medida que llegan
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in factory():
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+class Provider:
+    """
+    Base de los proveedores. Las subclases implementan _complete() y
+    _stream(); aquí se aplican el límite de concurrencia, el limitador de
+    tasa compartido por API key (rate_limits) y los reintentos.
+    """
+    name = "base"
+    default_model = None
+    default_temperature = 0.7
+    default_retries = 3
+    default_retry_delay = 1.0
+
+    def __init__(self, api_key, model=None, concurrency=DEFAULT_CONCURRENCY, temperature=None,
+                 max_retries=None, retry_delay=None, cache=None):
+        self.api_key = api_key
+        self.model = model or self.default_model
+        self.concurrency = max(1, concurrency)
+        self.temperature = self.default_temperature if temperature is None else temperature
+        self.retry_policy = RetryPolicy(self.default_retries if max_retries is None else max_retries,
+                                        self.default_retry_delay if retry_delay is None else retry_delay)
+        self.limiter = get_limiter(self.name, api_key)
+        self.cache = cache
+        self._semaphore = None
+
+    def semaphore(self):
+        # Se crea dentro del bucle de eventos que lo va a usar
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def fixed_prompt(self, system):
+        """
+        Texto fijo que el modelo recibe en cada llamada junto al prompt de
+        sistema, para medir el presupuesto de tokens
+        """
+        return system
+
+    def temperature_for(self, request):
+        return self.temperature if request.temperature is None else request.temperature
+
+    def cache_key(self, request):
+        return make_key(self.name, self.model, self.fixed_prompt(request.system), request.user,
+                        self.temperature_for(request), request.max_tokens)
+
+    def cached(self, request):
+        """
+        Devuelve la respuesta guardada para la petición, o None
+        """
+        if self.cache is None:
+            return None
+        entry = self.cache.get(self.cache_key(request))
+        if not entry or not entry.get("text"):
+            return None
+        return LLMResponse(entry["text"], self.name, self.model, 0.0, entry.get("usage"),
+                           entry.get("finish_reason"), cached=True)
+
+    def store(self, request, response):
+        if self.cache is not None and response.text:
+            self.cache.set(self.cache_key(request), {"text": response.text, "usage": response.usage,
+                                                     "finish_reason": response.finish_reason})
+
+    async def wait_turn(self, request):
+        """
+        Espera a que el limitador de tasa deje pasar la petición. Se cuentan
+        los tokens de entrada más max_tokens, como hacen los proveedores.
+        """
+        tokens = count_tokens(self.fixed_prompt(request.system) + request.user, self.model) + request.max_tokens
+        delay = self.limiter.reserve(tokens)
+        if delay > 0.05:
+            print(f"Esperando {delay:.1f} segundos por el límite de tasa de {self.name}...")
+            await asyncio.sleep(delay)
+
+    async def backoff(self, error, attempt):
+        """
+        Decide si se reintenta tras un error y espera lo necesario. Devuelve
+        False si no hay que reintentar.
+        """
+        if error.retry_after is not None:
+            self.limiter.pause(min(error.retry_after, self.retry_policy.max_delay))
+        if not error.retryable:
+            return False
+        if attempt >= self.retry_policy.max_attempts - 1:
+            print("Excedido el número máximo de reintentos.")
+            return False
+        delay = self.retry_policy.delay(attempt, error.retry_after)
+        print(f"Reintentando en {delay:.1f} segundos...")
+        await asyncio.sleep(delay)
+        return True
+
+    async def complete(self, request):
+        """
+        Envía la petición con reintentos y devuelve un LLMResponse, o None si
+        falla. Si la misma petición está en la caché se devuelve sin llamar a
+        la API.
+        """
+        response = self.cached(request)
+        if response is not None:
+            print(f"Respuesta de {self.name} obtenida de la caché")
+            return response
+
+        async with self.semaphore():
+            for attempt in range(self.retry_policy.max_attempts):
+                await self.wait_turn(request)
+                start_time = time.time()
+                try:
+                    text, usage, finish_reason = await self._complete(request)
+                    response = LLMResponse(text, self.name, self.model, time.time() - start_time,
+                                           usage, finish_reason)
+                    self.store(request, response)
+                    return response
+                except ProviderError as e:
+                    print(f"Error en la llamada a {self.name}: {e}")
+                    if not await self.backoff(e, attempt):
+                        return None
+        return None
+
+    async def stream(self, request):
+        """
+        Envía la petición y entrega el texto de la respuesta por partes.
+        Lanza ProviderError si la llamada falla; solo se reintenta si aún no
+        había llegado texto. Si la petición está en la caché se entrega la
+        respuesta guardada de una vez.
+        """
+        response = self.cached(request)
+        if response is not None:
+            print(f"Respuesta de {self.name} obtenida de la caché")
+            yield response.text
+            return
+
+        start_time = time.time()
+        parts = []
+        async with self.semaphore():
+            for attempt in range(self.retry_policy.max_attempts):
+                await self.wait_turn(request)
+                try:
+                    async for text in self._stream(request):
+                        parts.append(text)
+                        yield text
+                    break
+                except ProviderError as e:
+                    print(f"Error en la llamada a {self.name}: {e}")
+                    if parts or not await self.backoff(e, attempt):
+                        raise
+        self.store(request, LLMResponse("".join(parts), self.name, self.model, time.time() - start_time))
+
+    async def _complete(self, request):
+        raise NotImplementedError
+
+    async def _stream(self, request):
+        raise NotImplementedError
+        yield
+
+    async def aclose(self):
+        pass
+
+class OpenAICompatibleProvider(Provider):
+    """
+    Proveedores con la API de chat/completions de OpenAI. Las llamadas usan
+    el cliente HTTP compartido (http_client) desde hilos del bucle.
+    """
+    name = "openai"
+    default_model = "gpt-3.5-turbo"
+    api_url = "https://api.openai.com/v1/chat/completions"
+    default_retries = 5
+
+    def messages(self, request):
+        return [
+            {"role": "system", "content": request.system},
+            {"role": "user", "content": request.user},
+        ]
+
+    def payload(self, request, stream=False):
+        payload = {
+            "model": self.model,
+            "messages": self.messages(request),
+            "temperature": self.temperature_for(request),
+            "max_tokens": request.max_tokens,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def headers(self):
+        return {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "authorization": f"Bearer {self.api_key}",
+        }
+
+    def status_error(self, status_code, headers, text):
+        # 429 (límite de tasa), conflictos y errores del servidor se pueden reintentar
+        return ProviderError(f"HTTP {status_code}: {text[:500]}", retryable=is_retryable_status(status_code),
+                             retry_after=retry_after(headers))
+
+    def _post(self, payload):
+        try:
+            response = get_client().post(self.api_url, headers=self.headers(), json=payload)
+        except HTTP_ERRORS as e:
+            raise ProviderError(f"{type(e).__name__} - {e}", retryable=True)
+        self.limiter.observe(response.headers)
+        if response.status_code != 200:
+            raise self.status_error(response.status_code, response.headers, response.text)
+        try:
+            result = response.json()
+            choice = result["choices"][0]
+            return choice["message"]["content"], result.get("usage"), choice.get("finish_reason")
+        except (ValueError, KeyError, IndexError) as e:
+            raise ProviderError(f"Respuesta inesperada de la API: {e}")
+
+    async def _complete(self, request):
+        return await asyncio.to_thread(self._post, self.payload(request))
+
+    def _iter_stream(self, payload):
+        """
+        Lee la respuesta en Server-Sent Events y devuelve los fragmentos de texto
+        """
+        try:
+            with get_client().stream("POST", self.api_url, headers=self.headers(), json=payload) as response:
+                self.limiter.observe(response.headers)
+                if response.status_code != 200:
+                    raise self.status_error(response.status_code, response.headers, response.read_text())
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        choices = json.loads(data).get("choices") or [{}]
+                    except ValueError:
+                        continue
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if text:
+                        yield text
+        except HTTP_ERRORS as e:
+            raise ProviderError(f"{type(e).__name__} - {e}", retryable=True)
+
+    async def _stream(self, request):
+        payload = self.payload(request, stream=True)
+        async for text in iterate_in_thread(lambda: self._iter_stream(payload)):
+            yield text
+
+class PerplexityProvider(OpenAICompatibleProvider):
+    """
+    Perplexity usa la API de OpenAI, pero sus scripts envían un mensaje de
+    sistema fijo y el prompt de instrucciones junto al contenido
+    """
+    name = "perplexity"
+    default_model = "sonar"
+    api_url = "https://api.perplexity.ai/chat/completions"
+    default_temperature = 0.5
+
+    def __init__(self, api_key, system_message=None, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.system_message = system_message
+
+    def fixed_prompt(self, system):
+        if not self.system_message:
+            return system
+        return self.system_message + "\n\n" + system
+
+    def messages(self, request):
+        if not self.system_message:
+            return super().messages(request)
+        return [
+            {"role": "system", "content": self.system_message},
+            {"role": "user", "content": request.system + "\n\n" + request.user},
+        ]
+
+class AnthropicProvider(Provider):
+    """
+    Claude mediante el cliente asíncrono del SDK de Anthropic
+    """
+    name = "anthropic"
+    default_model = "claude-3-sonnet-20240229"
+    default_temperature = 0.5
+
+    def __init__(self, api_key, **kwargs):
+        if anthropic is None:
+            raise ImportError("El paquete anthropic no está instalado. Instálalo con: pip install anthropic")
+        super().__init__(api_key, **kwargs)
+        self._client = None
+
+    def client(self):
+        # El cliente asíncrono queda ligado al bucle de eventos en que se crea.
+        # Los reintentos los gestiona Provider, no el SDK.
+        if self._client is None:
+            self._client = anthropic.AsyncAnthropic(
+                api_key=self.api_key, timeout=anthropic.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                max_retries=0)
+        return self._client
+
+    def arguments(self, request):
+        return {
+            "model": self.model,
+            "max_tokens": request.max_tokens,
+            "temperature": self.temperature_for(request),
+            "system": request.system,
+            "messages": [{"role": "user", "content": request.user}],
+        }
+
+    def error(self, e):
+        if isinstance(e, anthropic.APIStatusError):
+            self.limiter.observe(e.response.headers)
+            return ProviderError(f"{type(e).__name__} - {e}", retryable=is_retryable_status(e.status_code),
+                                 retry_after=retry_after(e.response.headers))
+        return ProviderError(f"{type(e).__name__} - {e}", retryable=isinstance(e, anthropic.APIConnectionError))
+
+    async def _complete(self, request):
+        try:
+            raw = await self.client().messages.with_raw_response.create(**self.arguments(request))
+            self.limiter.observe(raw.headers)
+            message = raw.parse()
+        except anthropic.APIError as e:
+            raise self.error(e)
+        usage = {"input_tokens": message.usage.input_tokens, "output_tokens": message.usage.output_tokens}
+        text = "".join(block.text for block in message.content if getattr(block, "text", None))
+        return text, usage, message.stop_reason
+
+    async def _stream(self, request):
+        try:
+            async with self.client().messages.stream(**self.arguments(request)) as stream:
+                self.limiter.observe(stream.response.headers)
+                async for text in stream.text_stream:
+                    yield text
+        except anthropic.APIError as e:
+            raise self.error(e)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+PROVIDERS = {
+    "openai": OpenAICompatibleProvider,
+    "anthropic": AnthropicProvider,
+    "perplexity": PerplexityProvider,
+}
+
+def create_provider(name, api_key, **kwargs):
+    """
+    Crea el proveedor indicado por nombre (openai, anthropic o perplexity)
+    """
+    try:
+        provider_class = PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Proveedor desconocido: {name}")
+    return provider_class(api_key, **kwargs)
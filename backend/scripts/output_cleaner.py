@@ -0,0 +1,114 @@
+# Limpieza del texto que devuelven los modelos antes de guardar el acta.
+# Quita etiquetas y comentarios HTML, decodifica entidades, normaliza viñetas
+# y líneas en blanco y, en texto plano, elimina negritas, cursivas y
+# encabezados Markdown.
+#
+# Uso:
+#   texto = clean_model_output(respuesta)                 # texto plano (Perplexity)
+#   texto = clean_model_output(respuesta, markdown=True)  # conserva el Markdown pedido en el prompt
+#
+# python output_cleaner.py compara el rendimiento con la limpieza anterior.
+import re
+import html
+import time
+
+# Etiquetas cuyo cierre (o <br>) equivale a un salto de línea
+BLOCK_TAGS = ("p", "div", "h[1-6]", "li", "tr", "blockquote")
+
+# Símbolos de viñeta que se normalizan a "- "
+BULLET_CHARS = "*•●▪‣·◦"
+
+# Cada regla es una expresión precompilada con una plantilla de sustitución,
+# de modo que sub() trabaja por completo en C. Las reglas de HTML y de
+# Markdown solo se aplican si el texto contiene el carácter que las inicia.
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_BREAK_RE = re.compile(r"<br\b[^<>]*>|</(?:" + "|".join(BLOCK_TAGS) + r")\s*>")
+_ITEM_RE = re.compile(r"<li\b[^<>]*>")
+# Solo etiquetas con nombre: "a < b > c" no es una etiqueta
+_TAG_RE = re.compile(r"</?[A-Za-z][A-Za-z0-9]*\b[^<>]*>")
+# Las marcas de inicio de línea se buscan tras un "\n" literal (el texto se
+# limpia con un "\n" delante), mucho más rápido que "^" con re.MULTILINE
+_BULLET_RE = re.compile(r"\n([ \t]*)[" + re.escape(BULLET_CHARS) + r"][ \t]+")
+_HEADING_RE = re.compile(r"\n[ \t]*#{1,6}[ \t]+")
+_BOLD_RE = re.compile(r"\*\*([^\n]+?)\*\*")
+_UNDERLINE_RE = re.compile(r"__([^\n]+?)__")
+# La cursiva no empieza ni acaba en espacio: "3 * 4 = 12" se conserva
+_ITALIC_RE = re.compile(r"\*([^\s*](?:[^*\n]*[^\s*])?)\*")
+_BLANK_RE = re.compile(r"\n(?:[^\S\n]*\n)+")
+
+def clean_model_output(text, markdown=False):
+    """
+    Quita las etiquetas HTML (los cierres de párrafo y <br> pasan a saltos de
+    línea), decodifica las entidades, normaliza las viñetas a "- " y reduce
+    las líneas en blanco consecutivas a una. Si markdown es False también
+    elimina negritas, cursivas y encabezados Markdown.
+    """
+    if not text:
+        return text
+    text = "\n" + text.replace("\r\n", "\n")
+    if "<" in text:
+        text = _COMMENT_RE.sub("", text)
+        text = _BREAK_RE.sub("\n", text)
+        text = _ITEM_RE.sub("- ", text)
+        text = _TAG_RE.sub("", text)
+    text = _BULLET_RE.sub(r"\n\1- ", text)
+    if not markdown:
+        if "#" in text:
+            text = _HEADING_RE.sub("\n", text)
+        if "*" in text:
+            text = _BOLD_RE.sub(r"\1", text)
+            text = _ITALIC_RE.sub(r"\1", text)
+        if "__" in text:
+            text = _UNDERLINE_RE.sub(r"\1", text)
+    text = _BLANK_RE.sub("\n\n", text)
+    # Las entidades se decodifican al final para que "&lt;b&gt;" quede como texto
+    if "&" in text:
+        text = html.unescape(text.replace("&nbsp;", " "))
+    return text[1:]
+
+def _legacy_clean(text):
+    """
+    Limpieza anterior (varias pasadas de expresiones regulares), solo como
+    referencia para la comparación de rendimiento
+    """
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    text = re.sub(r'\*(.*?)\*', r'\1', text)
+    text = re.sub(r'^\*\s+', '- ', text, flags=re.MULTILINE)
+    text = html.unescape(text)
+    text = re.sub(r'<br\s*/?>', '\n', text)
+    text = re.sub(r'<center>(.*?)</center>', r'\1', text)
+    text = re.sub(r'<p>(.*?)</p>', r'\1\n', text)
+    text = re.sub(r'<[^>]*>', '', text)
+    return re.sub(r'\n\s*\n', '\n\n', text)
+
+# Acta típica: sobre todo prosa, con algunas marcas de formato
+SAMPLE_ACTA = """## ACTA DE ASAMBLEA
+
+**Fecha:** 29 de abril | **Hora:** 18:00
+
+* Juan Pérez - Presidente
+* Ana Gómez - Secretaria
+
+La asamblea revisó el presupuesto del año siguiente y, tras un largo debate sobre las cuotas, \
+aprobó por *unanimidad* mantenerlas sin cambios. Se acordó además revisar el contrato de \
+mantenimiento del ascensor &amp; pedir tres presupuestos nuevos antes de la próxima reunión.<br>
+
+"""
+
+def benchmark(repetitions=20, rounds=5):
+    document = SAMPLE_ACTA * 300
+    print(f"Documento: {len(document) / 1024:.0f} KB (mejor de {rounds} rondas)")
+    for name, function in (("clean_model_output", clean_model_output),
+                           ("clean_model_output (markdown)", lambda text: clean_model_output(text, True)),
+                           ("limpieza anterior", _legacy_clean)):
+        elapsed = min(_timed(function, document, repetitions) for _ in range(rounds))
+        print(f"  {name:<30} {elapsed * 1000:8.2f} ms  {len(document) / elapsed / 1e6:6.1f} MB/s")
+
+def _timed(function, document, repetitions):
+    start_time = time.perf_counter()
+    for _ in range(repetitions):
+        function(document)
+    return (time.perf_counter() - start_time) / repetitions
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,4 +1,4 @@
-import requests
+from http_client import get_client
 import sys
 import json
 
@@ -38,7 +38,7 @@ data = {
 # Hacer la solicitud
 try:
     print("Enviando solicitud a Perplexity API con modelo incorrecto para ver el error completo...")
-    response = requests.post(api_url, headers=headers, json=data)
+    response = get_client().post(api_url, headers=headers, json=data)
     print(f"Código de estado: {response.status_code}")
     
     # Formatear y mostrar la respuesta completa
@@ -0,0 +1,206 @@
+# Procesamiento por lotes de transcripciones: genera las actas de todos los
+# archivos de una carpeta (o de un patrón glob) en un solo proceso, con varios
+# archivos en paralelo. Los archivos cuya acta es más reciente que la
+# transcripción se omiten, y al terminar se escribe un informe JSON con el
+# tiempo y el resultado de cada archivo.
+#
+# Uso:
+#   python process_batch.py uploads/ --provider perplexity --jobs 4
+#   python process_batch.py "uploads/**/*_transcripcion.txt" --provider openai --fallback anthropic
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import importlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from acta_mapreduce import DEFAULT_MAP_WORKERS
+from acta_pipeline import ACTA_SUFFIX, acta_output_path
+from provider_router import PROVIDER_ALIASES, PROVIDER_KEY_VARS, parse_fallback
+
+# Script y función que generan el acta con cada proveedor. Todas reciben
+# (transcripción, api_key, prompt) y devuelven la ruta del acta o un valor falso
+PROCESSORS = {
+    "openai": ("process_transcript", "process_with_chatgpt"),
+    "anthropic": ("process_transcript_claude", "process_with_claude"),
+    "perplexity": ("process_transcript_perplexity", "process_transcript_with_perplexity"),
+}
+
+# Patrón de las transcripciones cuando se indica una carpeta
+DEFAULT_PATTERN = "*_transcripcion.txt"
+
+# Archivos procesados a la vez (cada uno resume además sus tramos en paralelo)
+DEFAULT_JOBS = 4
+
+def find_transcripts(inputs, pattern=DEFAULT_PATTERN, recursive=False):
+    """
+    Expande carpetas y patrones glob a la lista ordenada de transcripciones,
+    sin duplicados y sin las actas ya generadas
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            search = os.path.join(item, "**", pattern) if recursive else os.path.join(item, pattern)
+            found.extend(glob.glob(search, recursive=recursive))
+        elif glob.has_magic(item):
+            found.extend(glob.glob(item, recursive=True))
+        elif os.path.isfile(item):
+            found.append(item)
+        else:
+            print(f"Aviso: no se encontró {item}")
+    paths = {os.path.abspath(path) for path in found
+             if os.path.isfile(path) and not path.endswith(ACTA_SUFFIX)}
+    return sorted(paths)
+
+def is_up_to_date(transcript_path):
+    """
+    True si el acta existe y es posterior a la transcripción
+    """
+    acta_path = acta_output_path(transcript_path)
+    try:
+        return os.path.getmtime(acta_path) >= os.path.getmtime(transcript_path)
+    except OSError:
+        return False
+
+def load_processor(provider):
+    module_name, function_name = PROCESSORS[provider]
+    return getattr(importlib.import_module(module_name), function_name)
+
+def process_one(processor, transcript_path, api_key, prompt, options):
+    """
+    Genera el acta de un archivo y devuelve su entrada del informe
+    """
+    start_time = time.time()
+    entry = {"input": transcript_path, "output": None, "status": "failed", "error": None}
+    try:
+        result = processor(transcript_path, api_key, prompt, **options)
+        if result:
+            entry["status"] = "ok"
+            entry["output"] = result
+        else:
+            entry["error"] = "No se pudo generar el acta"
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+    entry["elapsed"] = round(time.time() - start_time, 3)
+    return entry
+
+def run_batch(transcripts, provider, api_key, prompt=None, jobs=DEFAULT_JOBS, force=False, options=None):
+    """
+    Procesa las transcripciones con jobs archivos en paralelo y devuelve las
+    entradas del informe en el mismo orden que transcripts
+    """
+    processor = load_processor(provider)
+    options = dict(options or {})
+    entries = {}
+    pending = []
+    for path in transcripts:
+        if not force and is_up_to_date(path):
+            entries[path] = {"input": path, "output": acta_output_path(path), "status": "skipped",
+                             "error": None, "elapsed": 0.0}
+        else:
+            pending.append(path)
+
+    skipped = len(transcripts) - len(pending)
+    print(f"[LOTE] {len(transcripts)} transcripciones: {len(pending)} por procesar, {skipped} al día")
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = {executor.submit(process_one, processor, path, api_key, prompt, options): path
+                   for path in pending}
+        for future in as_completed(futures):
+            entry = future.result()
+            entries[entry["input"]] = entry
+            done += 1
+            state = "OK" if entry["status"] == "ok" else f"ERROR ({entry['error']})"
+            print(f"[LOTE] {done}/{len(pending)} {os.path.basename(entry['input'])}: "
+                  f"{state} en {entry['elapsed']:.2f} segundos")
+    return [entries[path] for path in transcripts]
+
+def write_report(entries, report_path, provider, elapsed):
+    """
+    Guarda el informe JSON del lote y devuelve sus totales
+    """
+    totals = {status: sum(1 for entry in entries if entry["status"] == status)
+              for status in ("ok", "skipped", "failed")}
+    report = {
+        "provider": provider,
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "elapsed": round(elapsed, 3),
+        "totals": dict(totals, total=len(entries)),
+        "files": entries,
+    }
+    directory = os.path.dirname(report_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera las actas de una carpeta de transcripciones')
+    parser.add_argument('inputs', nargs='+', help='Carpetas, patrones glob o archivos de transcripción')
+    parser.add_argument('--provider', default='perplexity',
+                        help='Proveedor de IA (openai, anthropic, perplexity)')
+    parser.add_argument('--api_key', help='API Key del proveedor (por defecto la variable de entorno)')
+    parser.add_argument('--prompt', help='Prompt personalizado para la IA')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN, help='Patrón de archivos dentro de las carpetas')
+    parser.add_argument('--recursive', action='store_true', help='Buscar también en las subcarpetas')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='Archivos procesados en paralelo')
+    parser.add_argument('--map_workers', type=int, default=DEFAULT_MAP_WORKERS,
+                        help='Tramos resumidos en paralelo dentro de cada archivo')
+    parser.add_argument('--force', action='store_true', help='Regenerar también las actas que están al día')
+    parser.add_argument('--report', help='Ruta del informe JSON (por defecto informe_lote_<fecha>.json)')
+    parser.add_argument('--chunked', action='store_true', default=None,
+                        help='Resumir por tramos aunque la transcripción quepa en una sola llamada')
+    parser.add_argument('--window_tokens', type=int,
+                        help='Tokens de transcripción por tramo (por defecto según el contexto del modelo)')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='No usar la caché de respuestas: llamar siempre a la API')
+    parser.add_argument('--fallback',
+                        help='Proveedores de respaldo separados por comas (openai, anthropic, perplexity)')
+    parser.add_argument('--hedge_after', type=float,
+                        help='Segundos antes de enviar la petición de respaldo (por defecto según la latencia medida)')
+    parser.add_argument('--structured', action='store_true',
+                        help='Pedir las actas en JSON validado y generar el TXT y el DOCX a partir de ellas')
+
+    args = parser.parse_args()
+
+    provider = PROVIDER_ALIASES.get(args.provider.lower(), args.provider.lower())
+    if provider not in PROCESSORS:
+        parser.error(f"proveedor desconocido: {args.provider}")
+    try:
+        parse_fallback(args.fallback)
+    except ValueError as e:
+        parser.error(str(e))
+    api_key = args.api_key or os.environ.get(PROVIDER_KEY_VARS[provider])
+    if not api_key:
+        print(f"Error: Se requiere API Key ({PROVIDER_KEY_VARS[provider]} o --api_key)")
+        sys.exit(1)
+
+    transcripts = find_transcripts(args.inputs, args.pattern, args.recursive)
+    if not transcripts:
+        print("No se encontraron transcripciones")
+        sys.exit(1)
+
+    options = {"chunked": args.chunked, "window_tokens": args.window_tokens, "map_workers": args.map_workers,
+               "use_cache": not args.no_cache, "fallback": args.fallback, "hedge_after": args.hedge_after,
+               "structured": args.structured}
+    start_time = time.time()
+    entries = run_batch(transcripts, provider, api_key, args.prompt, args.jobs, args.force, options)
+    elapsed = time.time() - start_time
+
+    report_path = args.report or f"informe_lote_{datetime.now():%Y%m%d_%H%M%S}.json"
+    totals = write_report(entries, report_path, provider, elapsed)
+    print(f"[LOTE] Completado en {elapsed:.2f} segundos: {totals['ok']} generadas, "
+          f"{totals['skipped']} omitidas, {totals['failed']} con error")
+    for entry in entries:
+        if entry["status"] == "failed":
+            print(f"[LOTE]   {entry['input']}: {entry['error']}")
+    print(f"[LOTE] Informe guardado en: {report_path}")
+    sys.exit(1 if totals["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,9 @@
-import os
-import sys
-import argparse
-import json
-import time
-import anthropic
-
-def process_with_claude(transcript_file, anthropic_key, custom_prompt=None):
-    """
-    Procesa un archivo de transcripción con Claude usando un prompt personalizado
-    """
-    # Leer el archivo de transcripción
-    try:
-        with open(transcript_file, 'r', encoding='utf-8') as f:
-            transcript_text = f.read()
-    except Exception as e:
-        print(f"Error al leer el archivo de transcripción: {e}")
-        return False
-    
-    # Extraer la sección de transcripción completa
-    try:
-        if "--- TRANSCRIPCION COMPLETA ---" in transcript_text:
-            transcript_content = transcript_text.split("--- TRANSCRIPCION COMPLETA ---")[1].strip()
-        else:
-            transcript_content = transcript_text
-    except Exception as e:
-        print(f"Error al extraer la transcripción completa: {e}")
-        transcript_content = transcript_text
-    
-    # Crear el prompt para Claude
-    if not custom_prompt:
-        custom_prompt = """# 🧭 PROMPT MAESTRO MEJORADO PARA RESUMIR Y FORMATEAR ACTAS DE ASAMBLEAS
+from acta_pipeline import ActaScript
+
+MODEL = "claude-3-sonnet-20240229"
+
+# Prompt para asambleas si no se proporciona uno personalizado
+DEFAULT_PROMPT = """# 🧭 PROMPT MAESTRO MEJORADO PARA RESUMIR Y FORMATEAR ACTAS DE ASAMBLEAS
 
 🔹 **OBJETIVO DEL PROMPT:**
 
@@ -132,76 +106,12 @@ Nota importante: el acta debe terminar con las firmas. Es lo último.
 
 A continuación te presento una transcripción que debes transformar según estas instrucciones.
 """
-    
-    # Configurar el cliente de Claude
-    client = anthropic.Anthropic(api_key=anthropic_key)
-    
-    # Mensaje completo para enviar a Claude
-    system_prompt = custom_prompt
-    user_prompt = transcript_content
-    
-    # Llamar a la API de Claude con reintentos
-    max_retries = 3
-    retry_delay = 5  # segundos
-    
-    for attempt in range(max_retries):
-        try:
-            print(f"Llamando a la API de Claude (intento {attempt+1}/{max_retries})...")
-            
-            # Crear la solicitud a Claude
-            response = client.messages.create(
-                model="claude-3-sonnet-20240229",  # Puedes ajustar al modelo adecuado
-                max_tokens=4000,
-                temperature=0.5,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
-            
-            # Extraer el contenido de la respuesta
-            improved_text = response.content[0].text
-            
-            # Crear nombre para el archivo mejorado
-            base_name = os.path.basename(transcript_file)
-            dir_name = os.path.dirname(transcript_file)
-            output_file_name = os.path.splitext(base_name)[0] + "_acta_formatada.txt"
-            output_file = os.path.join(dir_name, output_file_name)
-            
-            # Guardar el texto mejorado
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(improved_text)
-            
-            print(f"Acta formateada guardada en: {output_file}")
-            return output_file
-        
-        except Exception as e:
-            print(f"Error en la llamada a Claude: {e}")
-            if attempt < max_retries - 1:
-                print(f"Reintentando en {retry_delay} segundos...")
-                time.sleep(retry_delay)
-                retry_delay *= 2  # Backoff exponencial
-            else:
-                print("Excedido el número máximo de reintentos.")
-                return False
+
+ACTA_SCRIPT = ActaScript("process_transcript_claude", "Claude", "anthropic", MODEL, DEFAULT_PROMPT, markdown=True)
+
+# Nombres usados por process_batch y por quienes importan el script
+process_with_claude = ACTA_SCRIPT.process
+handle_worker_job = ACTA_SCRIPT.handle_worker_job
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Procesa transcripciones con Claude para formatear actas de asambleas')
-    parser.add_argument('transcript_file', help='Ruta al archivo de transcripción')
-    parser.add_argument('--api_key', help='API Key de Anthropic', required=True)
-    parser.add_argument('--prompt', help='Prompt personalizado para Claude')
-    parser.add_argument('--output', help='Ruta de salida para el archivo formateado')
-    
-    args = parser.parse_args()
-    
-    result_file = process_with_claude(args.transcript_file, args.api_key, args.prompt)
-    if result_file and args.output:
-        # Si se especificó una ruta de salida, actualizar el nombre del archivo
-        try:
-            import shutil
-            shutil.copy(result_file, args.output)
-            print(f"Archivo copiado a: {args.output}")
-        except Exception as e:
-            print(f"Error al copiar el archivo a la ruta especificada: {e}")
-    
-    sys.exit(0 if result_file else 1)
\ No newline at end of file
+    ACTA_SCRIPT.main()
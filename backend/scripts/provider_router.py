@@ -0,0 +1,325 @@
+# Conmutación por error y peticiones de respaldo (hedging) entre proveedores.
+# RouterProvider se comporta como un proveedor más: envía cada llamada al
+# proveedor preferido y, si no ha respondido tras hedge_after segundos o
+# falla, la envía también al siguiente y se queda con la primera respuesta
+# válida. La latencia y la tasa de errores de cada proveedor se guardan en
+# disco y deciden el orden en las siguientes ejecuciones.
+#
+# Uso:
+#   provider = with_fallback(OpenAICompatibleProvider(key), ["anthropic", "perplexity"])
+import os
+import json
+import time
+import asyncio
+import threading
+
+from disk_cache import DEFAULT_CACHE_ROOT
+from llm_providers import PROVIDERS, ProviderError, create_provider
+from token_budget import model_limits
+
+PROVIDER_STATS_FILE = os.environ.get("PROVIDER_STATS_FILE", os.path.join(DEFAULT_CACHE_ROOT, "provider_stats.json"))
+
+# Variables de entorno con la API key de cada proveedor de respaldo
+PROVIDER_KEY_VARS = {"openai": "OPENAI_API_KEY", "anthropic": "ANTHROPIC_API_KEY", "perplexity": "PERPLEXITY_API_KEY"}
+
+# Nombres alternativos aceptados en --fallback
+PROVIDER_ALIASES = {"chatgpt": "openai", "gpt": "openai", "claude": "anthropic"}
+
+# Espera antes de la petición de respaldo cuando no se indica: HEDGE_FACTOR
+# veces la latencia media del proveedor, entre HEDGE_MIN_S y HEDGE_MAX_S, o
+# HEDGE_DEFAULT_S si aún no hay datos
+HEDGE_FACTOR = 2.0
+HEDGE_MIN_S = 5.0
+HEDGE_MAX_S = 120.0
+HEDGE_DEFAULT_S = 30.0
+
+# Peso de la última observación en las medias móviles
+STATS_ALPHA = 0.2
+
+class ProviderStats:
+    """
+    Latencia media y tasa de errores por proveedor y modelo (medias móviles
+    exponenciales), compartidas entre procesos mediante un archivo JSON
+    """
+    def __init__(self, path=PROVIDER_STATS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    @staticmethod
+    def key(provider):
+        return f"{provider.name}:{provider.model}"
+
+    def get(self, provider):
+        return self.data.get(self.key(provider))
+
+    def record(self, provider, latency, ok, cancelled=False):
+        """
+        Registra una llamada. Las canceladas por haber ganado otro proveedor
+        cuentan su duración como latencia (al menos tardaba eso) pero no como
+        error ni como llamada completada.
+        """
+        with self.lock:
+            entry = self.data.setdefault(self.key(provider), {"latency": None, "error_rate": 0.0, "calls": 0})
+            if ok or cancelled:
+                if entry["latency"] is None:
+                    entry["latency"] = latency
+                else:
+                    entry["latency"] += STATS_ALPHA * (latency - entry["latency"])
+            if not cancelled:
+                entry["error_rate"] += STATS_ALPHA * ((0.0 if ok else 1.0) - entry["error_rate"])
+                entry["calls"] += 1
+            self.save()
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = self.path + f".{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Aviso: no se pudieron guardar las estadísticas de proveedores: {e}")
+
+    def score(self, provider):
+        """
+        Menor es mejor: latencia media penalizada por la tasa de errores. Los
+        proveedores que nunca han respondido quedan los últimos.
+        """
+        entry = self.get(provider)
+        if entry["latency"] is None:
+            return float("inf")
+        return entry["latency"] / max(0.05, 1.0 - entry["error_rate"])
+
+    def order(self, providers):
+        """
+        Ordena los proveedores por puntuación. Mientras alguno no tenga datos
+        se respeta el orden configurado para poder medirlo.
+        """
+        if any(self.get(provider) is None for provider in providers):
+            return list(providers)
+        return sorted(providers, key=self.score)
+
+    def hedge_delay(self, provider):
+        entry = self.get(provider)
+        if not entry or entry["latency"] is None:
+            return HEDGE_DEFAULT_S
+        return max(HEDGE_MIN_S, min(HEDGE_MAX_S, HEDGE_FACTOR * entry["latency"]))
+
+_stats = None
+_stats_lock = threading.Lock()
+
+def provider_stats():
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = ProviderStats()
+    return _stats
+
+class RouterProvider:
+    """
+    Proveedor compuesto con la misma interfaz que llm_providers.Provider
+    """
+    def __init__(self, providers, hedge_after=None, stats=None):
+        self.providers = list(providers)
+        self.hedge_after = hedge_after
+        self.stats = stats or provider_stats()
+        self.name = "+".join(provider.name for provider in self.providers)
+        self.concurrency = self.providers[0].concurrency
+        # El presupuesto de tokens se calcula para el modelo con menos contexto
+        self.model = min((provider.model for provider in self.providers),
+                         key=lambda model: model_limits(model)["context"])
+
+    def fixed_prompt(self, system):
+        return max((provider.fixed_prompt(system) for provider in self.providers), key=len)
+
+    def delay_for(self, provider):
+        if self.hedge_after is not None:
+            return self.hedge_after
+        return self.stats.hedge_delay(provider)
+
+    def remaining(self, current, launched_at):
+        """
+        Segundos que quedan antes de lanzar la petición de respaldo, o None
+        si ya no quedan proveedores por lanzar
+        """
+        if current is None:
+            return None
+        return max(0.0, self.delay_for(current) - (time.time() - launched_at))
+
+    async def _timed(self, provider, request):
+        start_time = time.time()
+        try:
+            response = await provider.complete(request)
+        except asyncio.CancelledError:
+            self.stats.record(provider, time.time() - start_time, False, cancelled=True)
+            raise
+        ok = bool(response and response.text)
+        if not (response and response.cached):
+            self.stats.record(provider, time.time() - start_time, ok)
+        return response if ok else None
+
+    async def complete(self, request):
+        """
+        Devuelve la primera respuesta válida de los proveedores, lanzando el
+        siguiente cuando el actual tarda más de lo previsto o falla
+        """
+        candidates = iter(self.stats.order(self.providers))
+        pending = {}
+
+        def launch():
+            provider = next(candidates, None)
+            if provider is not None:
+                pending[asyncio.ensure_future(self._timed(provider, request))] = provider
+            return provider
+
+        current = launch()
+        launched_at = time.time()
+        try:
+            while pending:
+                timeout = self.remaining(current, launched_at)
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    slow = current
+                    current = launch()
+                    launched_at = time.time()
+                    if current is not None:
+                        print(f"{slow.name} tarda más de {self.delay_for(slow):.1f} s; "
+                              f"enviando petición de respaldo a {current.name}")
+                    continue
+                current_failed = False
+                for task in done:
+                    provider = pending.pop(task)
+                    response = task.result()
+                    if response is not None:
+                        if provider is not self.providers[0]:
+                            print(f"Respuesta obtenida de {provider.name}")
+                        return response
+                    print(f"{provider.name} no devolvió una respuesta válida")
+                    current_failed = current_failed or provider is current
+                if current_failed:
+                    # El último lanzado falló: pasar al siguiente sin esperar
+                    # aunque los anteriores sigan en curso
+                    current = launch()
+                    launched_at = time.time()
+        finally:
+            # Las llamadas que siguen en curso en sus hilos se descartan
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return None
+
+    async def stream(self, request):
+        """
+        Entrega en streaming la respuesta del primer proveedor que empiece a
+        responder. Si el preferido no envía nada tras hedge_after segundos se
+        lanza el siguiente; una vez elegido no se cambia de proveedor.
+        """
+        candidates = iter(self.stats.order(self.providers))
+        pending = {}
+
+        def launch():
+            provider = next(candidates, None)
+            if provider is not None:
+                stream = provider.stream(request)
+                pending[asyncio.ensure_future(stream.__anext__())] = (provider, stream, time.time())
+            return provider
+
+        current = launch()
+        launched_at = time.time()
+        winner = None
+        try:
+            while pending and winner is None:
+                timeout = self.remaining(current, launched_at)
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    slow = current
+                    current = launch()
+                    launched_at = time.time()
+                    if current is not None:
+                        print(f"{slow.name} tarda más de {self.delay_for(slow):.1f} s; "
+                              f"enviando petición de respaldo a {current.name}")
+                    continue
+                current_failed = False
+                for task in done:
+                    provider, stream, start_time = pending.pop(task)
+                    try:
+                        first = task.result()
+                    except (ProviderError, StopAsyncIteration) as e:
+                        print(f"{provider.name} no devolvió una respuesta válida: {e}")
+                        self.stats.record(provider, time.time() - start_time, False)
+                        current_failed = current_failed or provider is current
+                        continue
+                    winner = (provider, stream, start_time, first)
+                    break
+                if winner is None and current_failed:
+                    current = launch()
+                    launched_at = time.time()
+        finally:
+            for task, (provider, stream, start_time) in list(pending.items()):
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await stream.aclose()
+                self.stats.record(provider, time.time() - start_time, False, cancelled=True)
+
+        if winner is None:
+            raise ProviderError("Ningún proveedor devolvió una respuesta")
+        provider, stream, start_time, first = winner
+        if provider is not self.providers[0]:
+            print(f"Respuesta obtenida de {provider.name}")
+        yield first
+        try:
+            async for text in stream:
+                yield text
+        except ProviderError:
+            self.stats.record(provider, time.time() - start_time, False)
+            raise
+        self.stats.record(provider, time.time() - start_time, True)
+
+    async def aclose(self):
+        for provider in self.providers:
+            await provider.aclose()
+
+def parse_fallback(fallback):
+    """
+    Acepta una lista o una cadena separada por comas y devuelve los nombres
+    normalizados de los proveedores
+    """
+    if not fallback:
+        return []
+    if isinstance(fallback, str):
+        fallback = fallback.split(",")
+    names = []
+    for name in fallback:
+        name = PROVIDER_ALIASES.get(name.strip().lower(), name.strip().lower())
+        if name not in PROVIDERS:
+            raise ValueError(f"Proveedor de respaldo desconocido: {name}")
+        names.append(name)
+    return names
+
+def with_fallback(provider, fallback=None, hedge_after=None, keys=None):
+    """
+    Devuelve provider tal cual si no hay respaldo, o un RouterProvider con
+    provider como preferido y los proveedores de respaldo indicados. Las API
+    keys se toman de keys ({nombre: clave}) o de las variables de entorno.
+    """
+    providers = [provider]
+    for name in parse_fallback(fallback):
+        if name == provider.name:
+            continue
+        api_key = (keys or {}).get(name) or os.environ.get(PROVIDER_KEY_VARS[name])
+        if not api_key:
+            print(f"Aviso: no hay API key para el proveedor de respaldo {name} ({PROVIDER_KEY_VARS[name]})")
+            continue
+        try:
+            providers.append(create_provider(name, api_key, concurrency=provider.concurrency, cache=provider.cache))
+        except ImportError as e:
+            print(f"Aviso: {e}")
+    if len(providers) == 1:
+        return provider
+    return RouterProvider(providers, hedge_after)
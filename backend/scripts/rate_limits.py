@@ -0,0 +1,253 @@
+# Reintentos y límites de tasa compartidos por los proveedores de IA.
+# Cada proveedor y API key tiene un limitador con dos cubetas de tokens
+# (solicitudes y tokens por minuto) que se ajustan con las cabeceras de
+# límite de tasa de las respuestas. Los reintentos respetan Retry-After y, si
+# no lo hay, esperan un tiempo exponencial con jitter.
+import os
+import time
+import random
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime
+
+# Límites por minuto configurados de antemano (0 = sin límite hasta conocer
+# los de las cabeceras), p. ej. OPENAI_RPM=500 u OPENAI_TPM=60000
+DEFAULT_LIMITS = {
+    "openai": ("OPENAI_RPM", "OPENAI_TPM"),
+    "anthropic": ("ANTHROPIC_RPM", "ANTHROPIC_TPM"),
+    "perplexity": ("PERPLEXITY_RPM", "PERPLEXITY_TPM"),
+}
+
+# Cabeceras de límite de tasa: (límite, restantes, reinicio) para solicitudes y tokens
+RATE_LIMIT_HEADERS = {
+    "requests": [
+        ("x-ratelimit-limit-requests", "x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+        ("anthropic-ratelimit-requests-limit", "anthropic-ratelimit-requests-remaining",
+         "anthropic-ratelimit-requests-reset"),
+    ],
+    "tokens": [
+        ("x-ratelimit-limit-tokens", "x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+        ("anthropic-ratelimit-tokens-limit", "anthropic-ratelimit-tokens-remaining",
+         "anthropic-ratelimit-tokens-reset"),
+    ],
+}
+
+# Códigos HTTP que tiene sentido reintentar
+RETRYABLE_STATUS = (408, 409, 429)
+
+def is_retryable_status(status_code):
+    return status_code in RETRYABLE_STATUS or status_code >= 500
+
+def parse_duration(value):
+    """
+    Convierte una duración de las cabeceras a segundos. Admite segundos
+    ("2.5"), el formato de OpenAI ("1m30s", "250ms"), una fecha HTTP o una
+    fecha ISO 8601 (Anthropic). Devuelve None si no se reconoce.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    # Formato 1h2m3.5s / 250ms
+    total = 0.0
+    number = ""
+    i = 0
+    matched = False
+    while i < len(value):
+        char = value[i]
+        if char.isdigit() or char == ".":
+            number += char
+            i += 1
+            continue
+        unit = "ms" if value.startswith("ms", i) else char
+        factor = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}.get(unit)
+        if factor is None or not number:
+            matched = False
+            break
+        total += float(number) * factor
+        number = ""
+        matched = True
+        i += len(unit)
+    if matched and not number:
+        return total
+
+    # Fechas absolutas
+    for parse in (parsedate_to_datetime, lambda text: datetime.fromisoformat(text.replace("Z", "+00:00"))):
+        try:
+            moment = parse(value)
+        except (TypeError, ValueError, IndexError):
+            continue
+        if moment.tzinfo is None:
+            return None
+        return max(0.0, moment.timestamp() - time.time())
+    return None
+
+def retry_after(headers):
+    """
+    Segundos que el servidor pide esperar antes de reintentar, o None
+    """
+    if not headers:
+        return None
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds is not None:
+        try:
+            return max(0.0, float(milliseconds) / 1000.0)
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+class RetryPolicy:
+    """
+    Espera entre reintentos: la que indique el servidor, o un tiempo
+    aleatorio entre 0 y base_delay * 2^intento (full jitter) con tope
+    max_delay, para que los trabajos simultáneos no reintenten a la vez
+    """
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, server_delay=None):
+        if server_delay is not None:
+            # Un pequeño margen aleatorio evita que todos vuelvan en el mismo instante
+            return min(self.max_delay, server_delay) + random.uniform(0, min(1.0, self.base_delay))
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+class TokenBucket:
+    """
+    Cubeta de tokens segura entre hilos. reserve() descuenta la cantidad
+    (aunque quede en negativo) y devuelve cuántos segundos hay que esperar,
+    de modo que las peticiones se reparten en orden de llegada.
+    """
+    def __init__(self, per_minute=0):
+        self.lock = threading.Lock()
+        self.capacity = 0.0
+        self.rate = 0.0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.configure(per_minute)
+
+    def configure(self, per_minute):
+        """
+        Fija el límite por minuto (0 o None sin límite)
+        """
+        with self.lock:
+            per_minute = float(per_minute or 0)
+            if per_minute == self.capacity:
+                return
+            if per_minute > 0 and self.capacity == 0:
+                self.tokens = per_minute
+            self.capacity = per_minute
+            self.rate = per_minute / 60.0
+            self.tokens = min(self.tokens, per_minute)
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount=1):
+        with self.lock:
+            now = time.monotonic()
+            wait = max(0.0, self.blocked_until - now)
+            if not self.rate:
+                return wait
+            self._refill(now)
+            # Una petición mayor que la cubeta entera solo espera a tenerla llena
+            amount = min(amount, self.capacity)
+            self.tokens -= amount
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def observe(self, remaining, reset_seconds):
+        """
+        Corrige la cubeta con lo que el servidor dice que queda y el tiempo
+        que tarda en reponer la cuota completa
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining is None:
+                return
+            if self.capacity:
+                self.tokens = min(self.tokens, remaining)
+                if reset_seconds:
+                    # Ritmo al que el servidor repone la cuota
+                    self.rate = max(self.capacity / 60.0, (self.capacity - remaining) / reset_seconds)
+            elif remaining <= 0 and reset_seconds:
+                self.blocked_until = max(self.blocked_until, now + reset_seconds)
+
+    def block(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class RateLimiter:
+    """
+    Limitador de un proveedor y una API key: solicitudes y tokens por minuto
+    """
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.buckets = {"requests": TokenBucket(requests_per_minute), "tokens": TokenBucket(tokens_per_minute)}
+
+    def reserve(self, tokens):
+        """
+        Reserva una solicitud que usará tokens tokens y devuelve los segundos
+        que hay que esperar antes de enviarla
+        """
+        return max(self.buckets["requests"].reserve(1), self.buckets["tokens"].reserve(tokens))
+
+    def pause(self, seconds):
+        """
+        Detiene todas las peticiones de esta clave (tras un 429)
+        """
+        for bucket in self.buckets.values():
+            bucket.block(seconds)
+
+    def observe(self, headers):
+        """
+        Ajusta las cubetas con las cabeceras de límite de tasa de una respuesta
+        """
+        if not headers:
+            return
+        for kind, names in RATE_LIMIT_HEADERS.items():
+            for limit_name, remaining_name, reset_name in names:
+                limit = _number(headers.get(limit_name))
+                remaining = _number(headers.get(remaining_name))
+                if limit is None and remaining is None:
+                    continue
+                bucket = self.buckets[kind]
+                if limit:
+                    # OpenAI y Anthropic informan de límites por minuto
+                    bucket.configure(limit)
+                bucket.observe(remaining, parse_duration(headers.get(reset_name)))
+
+def _number(value):
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider, api_key):
+    """
+    Devuelve el limitador compartido del proveedor y la API key (las claves
+    se guardan como hash)
+    """
+    key = (provider, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest())
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            rpm_name, tpm_name = DEFAULT_LIMITS.get(provider, ("", ""))
+            limiter = _limiters[key] = RateLimiter(float(os.environ.get(rpm_name) or 0),
+                                                   float(os.environ.get(tpm_name) or 0))
+    return limiter
@@ -1,4 +1,4 @@
-import requests
+from http_client import get_client
 import os
 import sys
 
@@ -40,7 +40,7 @@ data = {
 # Hacer la solicitud
 try:
     print("Enviando solicitud a Perplexity API...")
-    response = requests.post(api_url, headers=headers, json=data)
+    response = get_client().post(api_url, headers=headers, json=data)
     print(f"Código de estado: {response.status_code}")
     
     # Imprimir la respuesta
@@ -0,0 +1,6 @@
+# Los scripts se importan entre sí como módulos hermanos (sin paquete), así
+# que las pruebas añaden la carpeta scripts a sys.path
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+import acta_mapreduce
+from acta_mapreduce import MAP_SYSTEM_PROMPT, MERGE_SYSTEM_PROMPT, map_reduce_acta, split_windows
+from llm_providers import LLMResponse
+
+WORDS = " ".join(f"w{n}" for n in range(10))
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # Un token por palabra, para no depender de tiktoken
+    monkeypatch.setattr(acta_mapreduce, "count_tokens", lambda text, model=None: len(text.split()))
+
+class Plan:
+    model = "gpt-4o-mini"
+    window_tokens = 4
+    map_max_tokens = 50
+    max_tokens = 100
+    reduce_tokens = 1000
+
+class FakeProvider:
+    """
+    Resume cada tramo con su primera palabra. Los primeros tramos tardan
+    más, así que terminan en orden inverso.
+    """
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.requests = []
+
+    async def complete(self, request):
+        self.requests.append(request)
+        if request.system.startswith(MAP_SYSTEM_PROMPT.split("(")[0]):
+            first = request.user.split()[0]
+            await asyncio.sleep(0.05 - int(first[1:]) * 0.005)
+            if first == self.fail:
+                return None
+            return LLMResponse(f"resumen {first}", "fake", "modelo", 0.0)
+        if request.system == MERGE_SYSTEM_PROMPT:
+            partials = [line for line in request.user.split("\n") if line.startswith("resumen")]
+            return LLMResponse("combinado " + "+".join(partials), "fake", "modelo", 0.0)
+        return LLMResponse(request.user, "fake", "modelo", 0.0)
+
+def test_split_windows_with_overlap():
+    assert split_windows(WORDS, 4, overlap_tokens=2) == ["w0 w1 w2 w3", "w2 w3 w4 w5", "w4 w5 w6 w7", "w6 w7 w8 w9"]
+    # El solapamiento nunca supera la mitad del tramo
+    assert split_windows(WORDS, 4, overlap_tokens=10)[:2] == ["w0 w1 w2 w3", "w2 w3 w4 w5"]
+    assert split_windows("  " + WORDS + "\n", 20) == [WORDS]
+    assert split_windows("   ", 4) == []
+
+def test_partials_keep_window_order():
+    provider = FakeProvider()
+    finished = []
+    acta = asyncio.run(map_reduce_acta(provider, "formato", WORDS, Plan(), overlap_tokens=2,
+                                       on_window=lambda index, total: finished.append(index)))
+
+    # Los tramos terminan en otro orden, pero el acta los combina en el original
+    assert finished == [4, 3, 2, 1]
+    parts = [line for line in acta.split("\n") if line.startswith(("### Parte", "resumen"))]
+    assert parts == ["### Parte 1", "resumen w0", "### Parte 2", "resumen w2",
+                     "### Parte 3", "resumen w4", "### Parte 4", "resumen w6"]
+    assert provider.requests[-1].system == "formato"
+    assert provider.requests[-1].max_tokens == Plan.max_tokens
+
+def test_partials_are_merged_in_order_to_fit():
+    plan = Plan()
+    # Caben juntos dos resúmenes parciales de 2 palabras, pero no tres
+    plan.reduce_tokens = 5
+    provider = FakeProvider()
+    acta = asyncio.run(map_reduce_acta(provider, "formato", WORDS, plan, overlap_tokens=2))
+
+    merges = [request for request in provider.requests if request.system == MERGE_SYSTEM_PROMPT]
+    assert len(merges) == 2
+    assert "combinado resumen w0+resumen w2" in acta
+    assert acta.index("resumen w0+resumen w2") < acta.index("resumen w4+resumen w6")
+
+def test_failed_window_fails_the_acta():
+    acta = asyncio.run(map_reduce_acta(FakeProvider(fail="w4"), "formato", WORDS, Plan(), overlap_tokens=2))
+    assert acta is None
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from acta_schema import ACTA_SCHEMA, ActaValidationError, parse_acta_json, validate
+
+def minimal_acta(**fields):
+    acta = {"titulo": "ACTA DE ASAMBLEA", "asistentes": [], "orden_del_dia": [], "desarrollo": [],
+            "acuerdos": [], "pendientes": []}
+    acta.update(fields)
+    return acta
+
+def test_optional_fields_are_filled():
+    acta, errors = validate(minimal_acta(), ACTA_SCHEMA)
+    assert errors == []
+    assert acta["fecha"] is None and acta["cierre"] is None
+    assert acta["firmas"] == []
+
+def test_strings_are_normalized():
+    acta, errors = validate(minimal_acta(
+        titulo="**ACTA** <b>DE</b> ASAMBLEA ",
+        fecha=20240429,
+        asistentes=["Juan Pérez", {"nombre": "Ana Gómez", "cargo": "Secretaria"}],
+        acuerdos=[{"descripcion": "Pintar &amp; limpiar", "plazo": None}],
+    ), ACTA_SCHEMA)
+    assert errors == []
+    assert acta["titulo"] == "ACTA DE ASAMBLEA"
+    assert acta["fecha"] == "20240429"
+    # Una persona dada como cadena se convierte en su nombre
+    assert acta["asistentes"] == [{"nombre": "Juan Pérez", "cargo": None},
+                                  {"nombre": "Ana Gómez", "cargo": "Secretaria"}]
+    assert acta["acuerdos"] == [{"descripcion": "Pintar & limpiar", "responsable": None, "plazo": None}]
+
+def test_errors_name_the_path():
+    _, errors = validate(minimal_acta(
+        asistentes="Juan",
+        desarrollo=[{"tema": "Presupuesto"}],
+        orden_del_dia=["Cuotas", 3, None],
+        firmas=[{"cargo": "Presidente"}],
+    ), ACTA_SCHEMA)
+    assert errors == [
+        "acta.asistentes: se esperaba array",
+        "acta.orden_del_dia[2]: se esperaba string",
+        "acta.desarrollo[0].resumen: falta el campo obligatorio",
+        "acta.firmas[0].nombre: falta el campo obligatorio",
+    ]
+
+def test_missing_required_fields():
+    _, errors = validate({"titulo": "Acta"}, ACTA_SCHEMA)
+    assert "acta.asistentes: falta el campo obligatorio" in errors
+    assert len(errors) == 5
+
+def test_booleans_are_not_strings():
+    _, errors = validate(minimal_acta(fecha=True), ACTA_SCHEMA)
+    assert errors == ["acta.fecha: se esperaba string o null"]
+
+def test_parse_acta_json_accepts_fenced_reply():
+    reply = "Aquí está el acta:\n```json\n" + json.dumps(minimal_acta(lugar="Sede")) + "\n```"
+    assert parse_acta_json(reply)["lugar"] == "Sede"
+
+@pytest.mark.parametrize("reply", ["sin json", '{"titulo": "Acta",}', json.dumps({"titulo": "Acta"})])
+def test_parse_acta_json_rejects_invalid(reply):
+    with pytest.raises(ActaValidationError) as info:
+        parse_acta_json(reply)
+    assert info.value.errors
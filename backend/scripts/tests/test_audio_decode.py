@@ -0,0 +1,66 @@
+import sys
+
+import pytest
+
+pytest.importorskip("pydub")
+
+import transcribe_audio
+from transcribe_audio import AudioDecodeError, iter_audio_chunks
+
+# Un segundo de PCM de 16 bits mono a 8 kHz
+SECOND = 16000
+
+def fake_ffmpeg(monkeypatch, script):
+    command = [sys.executable, "-c", "import os, signal, sys\n" + script]
+    monkeypatch.setattr(transcribe_audio, "ffmpeg_pcm_command", lambda *args: command)
+
+def chunks(**kwargs):
+    return iter_audio_chunks("audio.mp3", 1000, sample_rate=8000, channels=1, **kwargs)
+
+def test_complete_stream(monkeypatch):
+    fake_ffmpeg(monkeypatch, f"sys.stdout.buffer.write(b'\\0' * {SECOND * 3 + 1})")
+    assert [len(chunk) for chunk in chunks()] == [1000, 1000, 1000]
+
+def test_external_kill_is_an_error(monkeypatch):
+    # ffmpeg muere por SIGKILL sin que nadie de este proceso lo matara
+    fake_ffmpeg(monkeypatch, f"sys.stdout.buffer.write(b'\\0' * {SECOND}); sys.stdout.flush()\n"
+                             "os.kill(os.getpid(), signal.SIGKILL)")
+    with pytest.raises(AudioDecodeError):
+        list(chunks())
+
+def test_failed_decode_is_an_error(monkeypatch):
+    fake_ffmpeg(monkeypatch, "sys.stderr.write('archivo dañado'); sys.exit(1)")
+    with pytest.raises(AudioDecodeError, match="archivo dañado"):
+        list(chunks())
+
+def test_stopping_early_kills_ffmpeg_quietly(monkeypatch):
+    fake_ffmpeg(monkeypatch, f"sys.stdout.buffer.write(b'\\0' * {SECOND * 2}); sys.stdout.flush()\n"
+                             "import time; time.sleep(30)")
+    stream = chunks()
+    assert len(next(stream)) == 1000
+    stream.close()
+
+def tone_wav(path, sample_rate, channels):
+    from pydub.generators import Sine
+    tone = Sine(440, sample_rate=sample_rate).to_audio_segment(duration=1000).set_channels(channels)
+    tone.export(path, format="wav")
+    return path
+
+def test_target_wav_is_read_without_ffmpeg(tmp_path, monkeypatch):
+    path = tone_wav(str(tmp_path / "a.wav"), 16000, 1)
+
+    def no_ffmpeg(*args, **kwargs):
+        raise AssertionError("no debe llamarse a ffmpeg")
+
+    monkeypatch.setattr(transcribe_audio.subprocess, "run", no_ffmpeg)
+    sound = transcribe_audio.decode_audio(path)
+    assert (sound.frame_rate, sound.channels, sound.sample_width) == (16000, 1, 2)
+    assert len(sound) == 1000
+
+def test_wav_is_converted_in_memory_without_ffmpeg(tmp_path, monkeypatch):
+    path = tone_wav(str(tmp_path / "a.wav"), 44100, 2)
+    monkeypatch.setattr(transcribe_audio.AudioSegment, "converter", "ffmpeg-no-instalado")
+
+    sound = transcribe_audio.decode_audio(path)
+    assert (sound.frame_rate, sound.channels, sound.sample_width) == (16000, 1, 2)
+    assert len(sound) == 1000
@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+
+from transcription_checkpoint import TranscriptionCheckpoint, checkpoint_path_for
+
+SETTINGS = {"chunk_length_ms": 1000, "language": "es-ES"}
+
+def make_checkpoint(tmp_path, settings=SETTINGS):
+    return TranscriptionCheckpoint(str(tmp_path / "a.checkpoint.json"), "a.wav", settings)
+
+def test_journal_survives_a_crash(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.record(0, "ok", "uno", "h0", 0, 1000, [{"word": "uno", "start_ms": 0, "end_ms": 400}])
+    checkpoint.record(1, "unknown", "", "h1", 1000, 2000)
+    # Sin compact(): el JSON completo solo tiene el estado inicial
+
+    resumed = make_checkpoint(tmp_path)
+    assert resumed.load() == 2
+    assert resumed.completed(0, "h0")["text"] == "uno"
+    assert resumed.completed(1, "h1")["status"] == "unknown"
+    assert resumed.timings_before(2) == {0: (0, 1000, [{"word": "uno", "start_ms": 0, "end_ms": 400}]),
+                                         1: (1000, 2000, None)}
+
+def test_incomplete_journal_line_is_dropped(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.record(0, "ok", "uno", "h0")
+    checkpoint.journal.write('{"status": "ok", "text": "do')
+    checkpoint.journal.flush()
+
+    resumed = make_checkpoint(tmp_path)
+    assert resumed.load() == 1
+    assert resumed.completed(1, "h1") is None
+
+def test_only_matching_completed_fragments_are_reused(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.record(0, "ok", "uno", "h0")
+    checkpoint.record(1, "error", "timeout", "h1")
+    checkpoint.compact()
+
+    resumed = make_checkpoint(tmp_path)
+    resumed.load()
+    assert resumed.completed(0, "h0") is not None
+    # Audio distinto o error transitorio: se vuelve a reconocer
+    assert resumed.completed(0, "otro") is None
+    assert resumed.completed(1, "h1") is None
+
+def test_compact_writes_json_and_removes_journal(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.record(0, "ok", "uno", "h0")
+    checkpoint.record(1, "ok", "dos", "h1")
+    checkpoint.compact()
+
+    assert not os.path.exists(checkpoint.journal_path)
+    with open(checkpoint.path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert [entry["text"] for entry in data["fragments"].values()] == ["uno", "dos"]
+
+def test_other_settings_are_ignored(tmp_path):
+    checkpoint = make_checkpoint(tmp_path)
+    checkpoint.record(0, "ok", "uno", "h0")
+    checkpoint.compact()
+
+    assert make_checkpoint(tmp_path, dict(SETTINGS, chunk_length_ms=2000)).load() == 0
+
+def test_transcription_resumes_from_checkpoint(tmp_path, monkeypatch):
+    pytest.importorskip("pydub")
+    from pydub.generators import Sine
+    import transcribe_audio
+    from asr_engines import EngineRequestError, SpeechEngine
+
+    class FakeEngine(SpeechEngine):
+        name = "fake"
+        calls = []
+        fail_after = None
+        label = "primera"
+
+        def recognize(self, segment):
+            FakeEngine.calls.append(segment)
+            if self.fail_after is not None and len(FakeEngine.calls) > self.fail_after:
+                raise EngineRequestError("sin conexión")
+            return f"{FakeEngine.label} {len(FakeEngine.calls)}", None
+
+    monkeypatch.setattr(transcribe_audio, "create_engine",
+                        lambda name, language, **kwargs: FakeEngine(language, **kwargs))
+    audio_path = str(tmp_path / "a.wav")
+    Sine(440, sample_rate=8000).to_audio_segment(duration=5000).export(audio_path, format="wav")
+    options = dict(chunk_length_ms=1000, normalize=False, use_cache=False, resume=True, workers=1)
+
+    # Primera ejecución: los dos últimos fragmentos fallan
+    FakeEngine.fail_after = 3
+    transcribe_audio.transcribe_audio_file(audio_path, **options)
+    assert len(FakeEngine.calls) == 5
+
+    # Al reanudar solo se vuelven a reconocer los fragmentos fallidos
+    FakeEngine.calls.clear()
+    FakeEngine.fail_after = None
+    FakeEngine.label = "segunda"
+    text = transcribe_audio.transcribe_audio_file(audio_path, **options)
+    assert len(FakeEngine.calls) == 2
+    assert "primera 3" in text and "segunda 2" in text
+
+    output_file = transcribe_audio.transcript_path_for(audio_path)
+    assert not os.path.exists(checkpoint_path_for(output_file) + ".log")
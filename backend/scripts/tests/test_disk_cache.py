@@ -0,0 +1,99 @@
+import os
+import time
+
+import disk_cache
+from disk_cache import DiskCache, make_key
+
+VALUE = "x" * 200
+
+def entry_size(cache, key):
+    return os.path.getsize(cache._path(key))
+
+def age(cache, key, seconds):
+    # Último uso hace seconds segundos (la fecha de modificación marca el uso)
+    moment = time.time() - seconds
+    os.utime(cache._path(key), (moment, moment))
+
+def test_make_key_is_stable():
+    assert make_key("a", {"x": 1, "y": 2}) == make_key("a", {"y": 2, "x": 1})
+    assert make_key("ab", "c") != make_key("a", "bc")
+
+def test_round_trip_and_size_survive_reopening(tmp_path):
+    cache = DiskCache(str(tmp_path), 10 ** 6)
+    cache.set("aa1", {"text": "hola"})
+    assert cache.get("aa1") == {"text": "hola"}
+    assert cache.get("aa2") is None
+    assert DiskCache(str(tmp_path), 10 ** 6).total_bytes == cache.total_bytes == entry_size(cache, "aa1")
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), 10 ** 6)
+    for key in ("k1", "k2", "k3"):
+        cache.set(key, VALUE)
+    # Los tamaños varían en un byte según la fecha de creación guardada
+    size = max(entry_size(cache, key) for key in ("k1", "k2", "k3")) + 1
+    age(cache, "k1", 300)
+    age(cache, "k2", 200)
+    age(cache, "k3", 100)
+    # Leer k1 lo marca como usado recientemente
+    assert cache.get("k1") == VALUE
+
+    # Con el límite en cuatro entradas, la quinta obliga a bajar al 90%, es
+    # decir, a tres entradas: salen las dos usadas hace más tiempo
+    cache.max_bytes = size * 4
+    cache.set("k4", VALUE)
+    assert all(os.path.exists(cache._path(key)) for key in ("k1", "k2", "k3", "k4"))
+    cache.set("k5", VALUE)
+
+    assert cache.get("k2") is None and cache.get("k3") is None
+    assert all(cache.get(key) == VALUE for key in ("k1", "k4", "k5"))
+    assert cache.total_bytes == sum(entry_size(cache, key) for key in ("k1", "k4", "k5"))
+    assert cache.total_bytes <= cache.max_bytes * 0.9
+
+def test_overwrite_does_not_double_count(tmp_path):
+    cache = DiskCache(str(tmp_path), 10 ** 6)
+    cache.set("k1", VALUE)
+    cache.set("k1", VALUE)
+    assert cache.total_bytes == entry_size(cache, "k1")
+
+def test_ttl_expires_entries(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), 10 ** 6, ttl=60)
+    cache.set("k1", VALUE)
+    assert cache.get("k1") == VALUE
+
+    now = time.time()
+    monkeypatch.setattr(disk_cache.time, "time", lambda: now + 61)
+    assert cache.get("k1") is None
+    assert not os.path.exists(cache._path("k1"))
+    assert cache.total_bytes == 0
+
+def test_without_ttl_entries_do_not_expire(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), 10 ** 6)
+    cache.set("k1", VALUE)
+    now = time.time()
+    monkeypatch.setattr(disk_cache.time, "time", lambda: now + 10 ** 7)
+    assert cache.get("k1") == VALUE
+
+def test_entries_in_an_older_format_are_misses(tmp_path):
+    cache = DiskCache(str(tmp_path), 10 ** 6)
+    path = cache._path("k1")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"text": "formato anterior"}')
+    assert cache.get("k1") is None
+
+def test_size_is_counted_on_first_write(tmp_path, monkeypatch):
+    DiskCache(str(tmp_path), 10 ** 6).set("k1", VALUE)
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(disk_cache.os, "walk", lambda *args: walks.append(args) or real_walk(*args))
+
+    # Abrir la caché y leer de ella no recorre el directorio
+    cache = DiskCache(str(tmp_path), 10 ** 6)
+    assert cache.get("k1") == VALUE
+    assert walks == []
+
+    # La primera escritura lo recorre una vez; las siguientes no
+    cache.set("k2", VALUE)
+    cache.set("k3", VALUE)
+    assert len(walks) == 1
+    assert cache.total_bytes == sum(entry_size(cache, key) for key in ("k1", "k2", "k3"))
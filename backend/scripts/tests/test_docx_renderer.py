@@ -0,0 +1,81 @@
+import pytest
+
+from docx_renderer import Section, parse_acta, render_paragraphs, save_acta_docx
+
+STYLE_IDS = {"Title": "T", "Heading 1": "H1", "Heading 2": "H2", "Normal": "N",
+             "List Bullet": "LB", "List Bullet 2": "LB2", "List Number": "LN"}
+
+PLAIN_ACTA = """ACTA DE ASAMBLEA ORDINARIA
+Lugar: salón comunal
+ASISTENTES
+- Ana López
+- Juan Pérez
+ACUERDOS
+1. Aprobar el presupuesto
+   con dos abstenciones
+---
+
+Se levanta la sesión."""
+
+def kinds(section):
+    return [kind for kind, _ in section.blocks]
+
+def test_parse_plain_text_acta():
+    title, attendees, agreements = parse_acta(PLAIN_ACTA)
+
+    assert (title.kind, title.heading) == ("title", "ACTA DE ASAMBLEA ORDINARIA")
+    assert title.blocks == [("label", "Lugar: salón comunal")]
+    assert (attendees.kind, attendees.heading) == ("heading", "ASISTENTES")
+    assert attendees.blocks == [("bullet", "Ana López"), ("bullet", "Juan Pérez")]
+    assert agreements.heading == "ACUERDOS"
+    assert kinds(agreements) == ["numbered", "continuation", "rule", "blank", "paragraph"]
+    assert agreements.blocks[1] == ("continuation", "con dos abstenciones")
+
+def test_parse_markdown_acta():
+    sections = parse_acta("\n# **Acta** de la junta\n## Acuerdos\n### Detalle\n"
+                          "Los acuerdos se aprueban")
+    assert [(section.kind, section.heading, section.level) for section in sections] == [
+        ("preamble", "", 1),
+        ("title", "Acta de la junta", 1),
+        ("heading", "Acuerdos", 1),
+        ("heading", "Detalle", 2),
+    ]
+    # Con encabezados Markdown las palabras clave no abren secciones
+    assert sections[-1].blocks == [("paragraph", "Los acuerdos se aprueban")]
+
+def test_render_paragraphs_in_bulk():
+    title = Section("title", "Acta")
+    heading = Section("heading", "Acuerdos", level=2)
+    heading.blocks = [("paragraph", "Uno **importante** & *urgente* <b>\x07"),
+                      ("bullet", "Responsable: Ana"),
+                      ("rule", "")]
+    title_xml, title_rule, heading_xml, paragraph, bullet, rule = render_paragraphs([title, heading], STYLE_IDS)
+
+    assert '<w:pStyle w:val="T"/>' in title_xml and '<w:jc w:val="center"/>' in title_xml
+    assert "w:pBdr" in title_rule and title_rule == rule
+    assert '<w:pStyle w:val="H2"/>' in heading_xml
+    assert paragraph == ('<w:p><w:pPr><w:pStyle w:val="N"/></w:pPr>'
+                         '<w:r><w:t xml:space="preserve">Uno </w:t></w:r>'
+                         '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">importante</w:t></w:r>'
+                         '<w:r><w:t xml:space="preserve"> &amp; </w:t></w:r>'
+                         '<w:r><w:rPr><w:i/></w:rPr><w:t xml:space="preserve">urgente</w:t></w:r>'
+                         '<w:r><w:t xml:space="preserve"> &lt;b&gt;</w:t></w:r></w:p>')
+    assert '<w:pStyle w:val="LB"/><w:ind w:left="360"/>' in bullet
+    assert '<w:b/></w:rPr><w:t xml:space="preserve">Responsable:</w:t>' in bullet
+
+def test_saved_docx_keeps_order_and_styles(tmp_path):
+    docx = pytest.importorskip("docx")
+    path = save_acta_docx(PLAIN_ACTA, str(tmp_path / "acta.docx"))
+    assert path
+
+    document = docx.Document(path)
+    texts = [paragraph.text for paragraph in document.paragraphs if paragraph.text]
+    assert texts == ["ACTA DE ASAMBLEA ORDINARIA", "Lugar: salón comunal", "ASISTENTES", "Ana López",
+                     "Juan Pérez", "ACUERDOS", "Aprobar el presupuesto", "con dos abstenciones",
+                     "Se levanta la sesión."]
+    styles = {paragraph.text: paragraph.style.name for paragraph in document.paragraphs if paragraph.text}
+    assert styles["ACTA DE ASAMBLEA ORDINARIA"] == "Title"
+    assert styles["ASISTENTES"] == "Heading 1"
+    assert styles["Ana López"] == "List Bullet"
+    # Las propiedades de sección siguen siendo el último elemento del cuerpo
+    assert document.element.body[-1].tag.endswith("sectPr")
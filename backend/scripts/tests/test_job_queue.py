@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+
+import pytest
+
+import job_queue
+from job_queue import JobQueue, JobScheduler, QueueFull
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "POLL_INTERVAL", 0.01)
+    return JobQueue(str(tmp_path / "cola.sqlite3"), max_pending=0)
+
+def job_status(queue, job_id):
+    return queue.connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+def wait_finished(queue, job_ids, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        rows = [job_status(queue, job_id) for job_id in job_ids]
+        if all(row["status"] in ("done", "failed") for row in rows):
+            return rows
+        time.sleep(0.01)
+    raise AssertionError("los trabajos no terminaron a tiempo")
+
+def test_claim_by_priority_then_fifo(queue):
+    low = queue.submit("transcribe", {"n": 1})
+    high = queue.submit("transcribe", {"n": 2}, priority=5)
+    low_again = queue.submit("transcribe", {"n": 3})
+    other_kind = queue.submit("summarize", {"n": 4}, priority=9)
+
+    claimed = [queue.claim("transcribe", "r1")["id"] for _ in range(3)]
+    assert claimed == [high, low, low_again]
+    assert queue.claim("transcribe", "r1") is None
+    assert queue.claim("summarize", "r1")["id"] == other_kind
+
+def test_queue_full(queue):
+    queue.max_pending = 2
+    queue.submit("transcribe", {})
+    queue.submit("transcribe", {})
+    with pytest.raises(QueueFull):
+        queue.submit("transcribe", {})
+    with pytest.raises(QueueFull):
+        queue.submit("transcribe", {}, wait=True, timeout=0.05)
+    # Los trabajos encadenados no cuentan contra el límite
+    assert queue.submit("summarize", {}, enforce_limit=False)
+
+    # Al terminar dos vuelve a haber sitio
+    for kind in ("transcribe", "summarize"):
+        job = queue.claim(kind, "r1")
+        queue.finish(job["id"], "r1", result={})
+    assert queue.submit("transcribe", {})
+
+def test_recover_only_stale_jobs(queue):
+    stale = queue.submit("transcribe", {})
+    live = queue.submit("transcribe", {})
+    queue.claim("transcribe", "caido")
+    queue.claim("transcribe", "vivo")
+    queue.connection().execute("UPDATE jobs SET heartbeat = ? WHERE runner = 'caido'", (time.time() - 600,))
+
+    assert queue.recover(stale_after=60) == 1
+    assert job_status(queue, stale)["status"] == "pending"
+    assert job_status(queue, live)["status"] == "running"
+
+    # Otro ejecutor retoma el trabajo; el resultado tardío del caído se descarta
+    assert queue.claim("transcribe", "nuevo")["id"] == stale
+    assert not queue.finish(stale, "caido", result={"tarde": True})
+    assert queue.finish(stale, "nuevo", result={"ok": True})
+    row = job_status(queue, stale)
+    assert row["status"] == "done" and row["attempts"] == 2
+    assert json.loads(row["result"]) == {"ok": True}
+
+def test_stage_concurrency_limits(queue, monkeypatch):
+    running = {"transcribe": 0, "summarize": 0}
+    peak = dict(running)
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def handler(kind):
+        def run(params, queue, stage_workers):
+            with lock:
+                running[kind] += 1
+                peak[kind] = max(peak[kind], running[kind])
+            release.wait(5)
+            with lock:
+                running[kind] -= 1
+            return {}
+        return run
+
+    monkeypatch.setattr(job_queue, "JOB_HANDLERS", {kind: handler(kind) for kind in running})
+    job_ids = [queue.submit("transcribe", {}) for _ in range(5)] + [queue.submit("summarize", {}) for _ in range(4)]
+
+    scheduler = JobScheduler(queue, {"decode": 2, "summarize": 1})
+    scheduler.start()
+    try:
+        time.sleep(0.2)
+        release.set()
+        wait_finished(queue, job_ids)
+    finally:
+        scheduler.stop()
+    assert peak == {"transcribe": 2, "summarize": 1}
+
+def test_failed_transcription_fails_its_summary(queue, tmp_path):
+    missing_audio = str(tmp_path / "no_existe.mp3")
+    transcribe = queue.submit("transcribe", {"audio_path": missing_audio, "summarize": {"api_key": "clave"},
+                                             "use_cache": False})
+    # Resumen de una transcripción que nunca se generó
+    summarize = queue.submit("summarize", {"transcript_path": str(tmp_path / "no_existe_transcripcion.txt"),
+                                           "api_key": "clave"})
+
+    scheduler = JobScheduler(queue, {"decode": 1, "summarize": 1})
+    scheduler.start()
+    try:
+        transcribe_row, summarize_row = wait_finished(queue, [transcribe, summarize])
+    finally:
+        scheduler.stop()
+
+    assert transcribe_row["status"] == "failed"
+    # No se encadena el resumen de una transcripción fallida
+    assert queue.connection().execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 2
+    assert summarize_row["status"] == "failed"
+    assert "RuntimeError" in summarize_row["error"]
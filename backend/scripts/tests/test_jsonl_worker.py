@@ -0,0 +1,63 @@
+import io
+import json
+import sys
+
+from jsonl_worker import JsonLinesWorker, emit_event
+
+def run_worker(monkeypatch, handler, lines, max_jobs=1):
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    worker = JsonLinesWorker(handler, max_jobs, name="prueba")
+    worker.serve(io.StringIO("".join(line + "\n" for line in lines)))
+    assert sys.stdout is stdout
+    # Cada línea de stdout es un mensaje JSON completo
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+def handler(params):
+    if params.get("fail"):
+        raise RuntimeError("fallo en el trabajo")
+    print("mensaje del script")
+    emit_event({"event": "progress", "value": params["value"]})
+    return {"double": params["value"] * 2}
+
+def by_id(messages, job_id):
+    return [message for message in messages if message.get("id") == job_id]
+
+def test_good_job(monkeypatch):
+    messages = run_worker(monkeypatch, handler, ['{"id": "1", "params": {"value": 21}}'])
+
+    assert messages[0]["event"] == "ready" and messages[0]["worker"] == "prueba"
+    progress, response = by_id(messages, "1")
+    assert progress == {"id": "1", "event": "progress", "value": 21}
+    assert response["ok"] is True and response["result"] == {"double": 42}
+    assert "elapsed" in response
+
+def test_malformed_lines_are_reported(monkeypatch):
+    messages = run_worker(monkeypatch, handler, [
+        '{"id": "1", "params": ',
+        '[1, 2]',
+        '',
+        '{"id": "2", "params": {"value": 1}}',
+    ])
+
+    errors = [message for message in by_id(messages, None) if "ok" in message]
+    assert len(errors) == 2
+    assert all(message["ok"] is False for message in errors)
+    assert errors[0]["error"].startswith("JSON inválido")
+    assert by_id(messages, "2")[-1]["result"] == {"double": 2}
+
+def test_failing_job_does_not_stop_the_loop(monkeypatch):
+    messages = run_worker(monkeypatch, handler, [
+        '{"id": "1", "params": {"fail": true}}',
+        '{"id": "2", "cmd": "ping"}',
+        '{"id": "3", "params": {"value": 5}}',
+        '{"cmd": "shutdown"}',
+        '{"id": "4", "params": {"value": 6}}',
+    ])
+
+    failed, = by_id(messages, "1")
+    assert failed["ok"] is False and failed["error"] == "RuntimeError: fallo en el trabajo"
+    assert by_id(messages, "2") == [{"id": "2", "ok": True, "result": "pong"}]
+    assert by_id(messages, "3")[-1]["result"] == {"double": 10}
+    # Tras shutdown no se leen más solicitudes
+    assert by_id(messages, "4") == []
@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+
+import pytest
+
+from disk_cache import DiskCache
+from llm_providers import LLMRequest, Provider, ProviderError
+
+REQUEST = LLMRequest("sistema", "transcripción", max_tokens=100)
+
+class FakeProvider(Provider):
+    """
+    Proveedor que falla con los errores de failures antes de responder
+    """
+    name = "fake"
+    default_model = "gpt-4o-mini"
+
+    def __init__(self, failures=(), chunks=("acta ", "final"), **kwargs):
+        # Cada prueba con su propia API key para no compartir el limitador
+        super().__init__(uuid.uuid4().hex, retry_delay=0.01, **kwargs)
+        self.failures = list(failures)
+        self.chunks = list(chunks)
+        self.calls = 0
+
+    async def _complete(self, request):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return "".join(self.chunks), {"total_tokens": 10}, "stop"
+
+    async def _stream(self, request):
+        self.calls += 1
+        for n, chunk in enumerate(self.chunks):
+            if self.failures and n == len(self.chunks) // 2:
+                raise self.failures.pop(0)
+            yield chunk
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Las esperas se anotan en lugar de dormir
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return delays
+
+def test_retryable_errors_are_retried(sleeps):
+    provider = FakeProvider([ProviderError("503", retryable=True), ProviderError("red", retryable=True)])
+    response = asyncio.run(provider.complete(REQUEST))
+    assert response.text == "acta final" and not response.cached
+    assert provider.calls == 3
+    assert len(sleeps) == 2
+
+def test_other_errors_are_not_retried(sleeps):
+    provider = FakeProvider([ProviderError("400")])
+    assert asyncio.run(provider.complete(REQUEST)) is None
+    assert provider.calls == 1 and sleeps == []
+
+def test_retries_are_limited(sleeps):
+    provider = FakeProvider([ProviderError("503", retryable=True)] * 3, max_retries=2)
+    assert asyncio.run(provider.complete(REQUEST)) is None
+    assert provider.calls == 2
+
+def test_retry_after_pauses_the_shared_limiter(sleeps):
+    provider = FakeProvider([ProviderError("429", retryable=True, retry_after=30)])
+    assert asyncio.run(provider.complete(REQUEST)).text == "acta final"
+    # Se espera lo que pidió el servidor y la pausa afecta a toda la clave
+    assert sleeps[0] >= 30
+    assert provider.limiter.reserve(1) > 25
+
+def test_responses_are_cached(tmp_path, sleeps):
+    cache = DiskCache(str(tmp_path), 10 ** 6)
+    first = FakeProvider(cache=cache)
+    assert asyncio.run(first.complete(REQUEST)).text == "acta final"
+
+    second = FakeProvider(cache=cache)
+    response = asyncio.run(second.complete(REQUEST))
+    assert response.cached and response.text == "acta final" and response.usage == {"total_tokens": 10}
+    assert second.calls == 0
+
+    async def collect(provider, request):
+        return [text async for text in provider.stream(request)]
+
+    assert asyncio.run(collect(second, REQUEST)) == ["acta final"]
+    # Otra petición (otro max_tokens) no usa la respuesta guardada
+    assert asyncio.run(collect(second, LLMRequest("sistema", "transcripción", max_tokens=200))) == ["acta ", "final"]
+    assert second.calls == 1
+
+def test_stream_is_not_retried_after_text_arrived(sleeps):
+    provider = FakeProvider([ProviderError("corte", retryable=True)])
+
+    async def collect():
+        return [text async for text in provider.stream(REQUEST)]
+
+    with pytest.raises(ProviderError):
+        asyncio.run(collect())
+    assert provider.calls == 1 and sleeps == []
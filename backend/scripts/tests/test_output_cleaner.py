@@ -0,0 +1,41 @@
+import pytest
+
+from output_cleaner import clean_model_output
+
+# (entrada, salida en texto plano, salida con markdown=True)
+CORPUS = [
+    ("**Fecha:** 29 de abril", "Fecha: 29 de abril", "**Fecha:** 29 de abril"),
+    ("Se aprobó *por unanimidad* el punto", "Se aprobó por unanimidad el punto",
+     "Se aprobó *por unanimidad* el punto"),
+    ("* Juan Pérez - Presidente\n* Ana Gómez", "- Juan Pérez - Presidente\n- Ana Gómez",
+     "- Juan Pérez - Presidente\n- Ana Gómez"),
+    ("  • Subpunto", "  - Subpunto", "  - Subpunto"),
+    ("<center>ACTA DE ASAMBLEA</center>", "ACTA DE ASAMBLEA", "ACTA DE ASAMBLEA"),
+    ("<p>Primer párrafo\nen dos líneas</p><p>Segundo</p>", "Primer párrafo\nen dos líneas\nSegundo\n",
+     "Primer párrafo\nen dos líneas\nSegundo\n"),
+    ("Línea 1<br>Línea 2<br/>Línea 3", "Línea 1\nLínea 2\nLínea 3", "Línea 1\nLínea 2\nLínea 3"),
+    ("Caf&eacute; &amp; t&#233; &#x41;&nbsp;B", "Café & té A B", "Café & té A B"),
+    ("&lt;b&gt;literal&lt;/b&gt;", "<b>literal</b>", "<b>literal</b>"),
+    ("A\n\n\n\nB\n  \n \nC", "A\n\nB\n\nC", "A\n\nB\n\nC"),
+    ("## DESARROLLO\nTexto", "DESARROLLO\nTexto", "## DESARROLLO\nTexto"),
+    ("**Acuerdo &amp; plazo:** *30 días*", "Acuerdo & plazo: 30 días", "**Acuerdo & plazo:** *30 días*"),
+    ("Total: 3 * 4 = 12", "Total: 3 * 4 = 12", "Total: 3 * 4 = 12"),
+    ("si a < b y b > c", "si a < b y b > c", "si a < b y b > c"),
+    ("Texto<!-- nota\ninterna --> final", "Texto final", "Texto final"),
+    ("<ul><li>Uno</li><li>Dos</li></ul>", "- Uno\n- Dos\n", "- Uno\n- Dos\n"),
+    ("<p>Uno</p>\n\n<p>Dos</p>", "Uno\n\nDos\n", "Uno\n\nDos\n"),
+    ("Asistentes:<br>\n* Juan\n* Ana", "Asistentes:\n\n- Juan\n- Ana", "Asistentes:\n\n- Juan\n- Ana"),
+    ("Fin\r\n\r\n\r\nOtro", "Fin\n\nOtro", "Fin\n\nOtro"),
+]
+
+@pytest.mark.parametrize("text, plain, markdown", CORPUS)
+def test_plain(text, plain, markdown):
+    assert clean_model_output(text) == plain
+
+@pytest.mark.parametrize("text, plain, markdown", CORPUS)
+def test_markdown(text, plain, markdown):
+    assert clean_model_output(text, markdown=True) == markdown
+
+def test_empty():
+    assert clean_model_output("") == ""
+    assert clean_model_output(None) is None
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+
+from acta_pipeline import ActaScript
+from llm_providers import LLMRequest, LLMResponse, ProviderError
+from provider_router import ProviderStats, RouterProvider, parse_fallback
+
+REQUEST = LLMRequest("sistema", "transcripción")
+
+class FakeProvider:
+    """
+    Proveedor que responde text (o falla si es None) tras delay segundos y
+    anota cuándo se le llamó
+    """
+    concurrency = 1
+    cache = None
+
+    def __init__(self, name, delay, text):
+        self.name = name
+        self.model = "modelo-" + name
+        self.delay = delay
+        self.text = text
+        self.started = None
+
+    def fixed_prompt(self, system):
+        return system
+
+    async def complete(self, request):
+        self.started = time.time()
+        await asyncio.sleep(self.delay)
+        if self.text is None:
+            return None
+        return LLMResponse(self.text, self.name, self.model, self.delay)
+
+    async def stream(self, request):
+        self.started = time.time()
+        await asyncio.sleep(self.delay)
+        if self.text is None:
+            raise ProviderError("sin respuesta")
+        for part in self.text:
+            yield part
+
+    async def aclose(self):
+        pass
+
+def route(tmp_path, providers, hedge_after):
+    router = RouterProvider(providers, hedge_after, stats=ProviderStats(str(tmp_path / "stats.json")))
+    start = time.time()
+    response = asyncio.run(router.complete(REQUEST))
+    return response, start
+
+def test_fast_primary_is_not_hedged(tmp_path):
+    primary, backup = FakeProvider("a", 0.01, "uno"), FakeProvider("b", 0.01, "dos")
+    response, _ = route(tmp_path, [primary, backup], hedge_after=0.5)
+    assert response.text == "uno"
+    assert backup.started is None
+
+def test_slow_primary_is_hedged_after_delay(tmp_path):
+    primary, backup = FakeProvider("a", 2.0, "uno"), FakeProvider("b", 0.01, "dos")
+    response, start = route(tmp_path, [primary, backup], hedge_after=0.2)
+    assert response.text == "dos"
+    assert 0.2 <= backup.started - start < 0.5
+
+def test_failed_primary_fails_over_at_once(tmp_path):
+    primary, backup = FakeProvider("a", 0.01, None), FakeProvider("b", 0.01, "dos")
+    response, start = route(tmp_path, [primary, backup], hedge_after=1.0)
+    assert response.text == "dos"
+    assert backup.started - start < 0.5
+
+def test_failed_hedge_launches_next_while_older_is_pending(tmp_path):
+    # El respaldo falla mientras el preferido sigue en curso: el tercero se
+    # lanza en ese momento, sin esperar otro hedge_after
+    first = FakeProvider("a", 3.0, "uno")
+    second = FakeProvider("b", 0.05, None)
+    third = FakeProvider("c", 0.01, "tres")
+    response, start = route(tmp_path, [first, second, third], hedge_after=0.5)
+    assert response.text == "tres"
+    assert third.started - second.started < 0.3
+
+def test_older_failure_keeps_current_deadline(tmp_path):
+    # El preferido falla después de lanzar el respaldo: no se lanza el
+    # tercero porque el respaldo sigue dentro de su plazo
+    first = FakeProvider("a", 0.4, None)
+    second = FakeProvider("b", 0.2, "dos")
+    third = FakeProvider("c", 0.01, "tres")
+    response, _ = route(tmp_path, [first, second, third], hedge_after=0.3)
+    assert response.text == "dos"
+    assert third.started is None
+
+def test_stream_fails_over_to_next_provider(tmp_path):
+    router = RouterProvider([FakeProvider("a", 0.01, None), FakeProvider("b", 0.01, ["do", "s"])],
+                            hedge_after=1.0, stats=ProviderStats(str(tmp_path / "stats.json")))
+
+    async def collect():
+        return [part async for part in router.stream(REQUEST)]
+
+    assert asyncio.run(collect()) == ["do", "s"]
+
+def test_parse_fallback_normalizes_names():
+    assert parse_fallback(None) == []
+    assert parse_fallback(" Claude, gpt ,perplexity") == ["anthropic", "openai", "perplexity"]
+    assert parse_fallback(["chatgpt"]) == ["openai"]
+
+def test_parse_fallback_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        parse_fallback("openai,gemini")
+
+def test_unknown_fallback_is_an_argument_error(tmp_path, capsys):
+    script = ActaScript("prueba", "Prueba", "openai", "gpt-4o-mini", "prompt")
+    transcript = tmp_path / "t.txt"
+    transcript.write_text("texto", encoding="utf-8")
+
+    with pytest.raises(SystemExit) as exc:
+        script.main([str(transcript), "--api_key", "clave", "--fallback", "gemini"])
+    assert exc.value.code == 2
+    assert "gemini" in capsys.readouterr().err
+
+    assert script.process(str(transcript), "clave", use_cache=False, fallback="gemini") is None
+    with pytest.raises(ValueError):
+        script.handle_worker_job({"transcript_file": str(transcript), "api_key": "clave", "fallback": "gemini"})
@@ -0,0 +1,40 @@
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from rate_limits import parse_duration, retry_after
+
+@pytest.mark.parametrize("value, seconds", [
+    ("2.5", 2.5),
+    ("0", 0.0),
+    ("-3", 0.0),
+    ("250ms", 0.25),
+    ("1m30s", 90.0),
+    ("1h2m3.5s", 3723.5),
+    ("6m0s", 360.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+@pytest.mark.parametrize("value", [None, "", "   ", "pronto", "5x", "m", "1m30"])
+def test_parse_duration_unknown(value):
+    assert parse_duration(value) is None
+
+def test_parse_duration_dates():
+    moment = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert parse_duration(format_datetime(moment, usegmt=True)) == pytest.approx(30, abs=2)
+    assert parse_duration(moment.isoformat().replace("+00:00", "Z")) == pytest.approx(30, abs=2)
+    # Una fecha pasada no espera, y sin zona horaria no se puede interpretar
+    assert parse_duration(format_datetime(datetime.now(timezone.utc) - timedelta(minutes=1), usegmt=True)) == 0.0
+    assert parse_duration(datetime.fromtimestamp(time.time() + 30).isoformat()) is None
+
+def test_retry_after_prefers_milliseconds():
+    assert retry_after({"retry-after-ms": "1500", "retry-after": "10"}) == pytest.approx(1.5)
+    assert retry_after({"retry-after-ms": "nada", "retry-after": "10"}) == pytest.approx(10)
+
+def test_retry_after_missing():
+    assert retry_after(None) is None
+    assert retry_after({}) is None
+    assert retry_after({"retry-after": "pronto"}) is None
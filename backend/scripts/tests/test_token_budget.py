@@ -0,0 +1,62 @@
+import pytest
+
+import token_budget
+from token_budget import DEFAULT_LIMITS, MESSAGE_OVERHEAD, SAFETY_MARGIN, plan_request
+
+# Modelo sin entrada en MODEL_LIMITS: usa DEFAULT_LIMITS
+MODEL = "modelo-de-prueba"
+CONTEXT = int(DEFAULT_LIMITS["context"] * (1 - SAFETY_MARGIN))
+SYSTEM = "s" * 400  # 100 tokens
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Sin tiktoken se cuentan 4 caracteres por token, lo que hace exactas las cuentas
+    monkeypatch.setattr(token_budget, "tiktoken", None)
+    monkeypatch.setattr(token_budget, "_encodings", {})
+
+def transcript(tokens):
+    return "t" * (tokens * 4)
+
+def test_fits_in_one_call():
+    plan = plan_request(MODEL, SYSTEM, transcript(2000))
+    assert not plan.chunked
+    assert plan.windows == 1
+    assert plan.prompt_tokens == 100 + MESSAGE_OVERHEAD + 2000
+    assert plan.max_tokens == min(DEFAULT_LIMITS["max_output"], CONTEXT - plan.prompt_tokens)
+
+def test_desired_output_caps_max_tokens():
+    assert plan_request(MODEL, SYSTEM, transcript(2000), desired_output=500).max_tokens == 500
+
+def test_long_transcript_is_chunked():
+    plan = plan_request(MODEL, SYSTEM, transcript(20000))
+    assert plan.chunked
+    largest_window = CONTEXT - (100 + MESSAGE_OVERHEAD) - plan.map_max_tokens
+    assert plan.window_tokens == largest_window
+    assert plan.windows == -(-20000 // largest_window)
+    # La llamada final deja sitio para los resúmenes parciales
+    assert plan.max_tokens + plan.reduce_tokens + 100 + MESSAGE_OVERHEAD == CONTEXT
+
+def test_forced_chunking_uses_at_least_two_windows():
+    plan = plan_request(MODEL, SYSTEM, transcript(2000), chunked=True)
+    assert plan.chunked
+    assert plan.windows == 2
+
+def test_window_tokens_triggers_chunking():
+    plan = plan_request(MODEL, SYSTEM, transcript(2000), window_tokens=500)
+    assert plan.chunked
+    assert plan.window_tokens == 500
+    assert plan.windows == 4
+
+def test_parallel_windows_shorten_the_estimate():
+    serial = plan_request(MODEL, SYSTEM, transcript(20000), map_workers=1)
+    parallel = plan_request(MODEL, SYSTEM, transcript(20000), map_workers=8)
+    assert parallel.estimated_seconds < serial.estimated_seconds
+    assert parallel.estimated_cost == serial.estimated_cost
+
+def test_forced_single_call_that_does_not_fit():
+    with pytest.raises(ValueError):
+        plan_request(MODEL, SYSTEM, transcript(20000), chunked=False)
+
+def test_system_prompt_too_large():
+    with pytest.raises(ValueError):
+        plan_request(MODEL, transcript(CONTEXT), transcript(10))
@@ -0,0 +1,113 @@
+import json
+
+from transcript_writer import (FULL_TRANSCRIPT_MARKER, TranscriptWriter, format_timestamp, timed_path_for,
+                               write_subtitles)
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_format_timestamp_separators():
+    assert format_timestamp(3723004.4) == "01:02:03.004"
+    assert format_timestamp(3723004.6, ",") == "01:02:03,005"
+    assert format_timestamp(-5) == "00:00:00.000"
+
+def test_subtitles_skip_failed_fragments(tmp_path):
+    entries = [
+        {"status": "ok", "start_ms": 0, "end_ms": 1500, "text": "uno"},
+        {"status": "unknown", "start_ms": 1500, "end_ms": 3000, "text": ""},
+        {"status": "ok", "start_ms": 3000, "end_ms": 4000, "text": "tres"},
+    ]
+    vtt, srt = str(tmp_path / "a.vtt"), str(tmp_path / "a.srt")
+    write_subtitles(vtt, entries)
+    write_subtitles(srt, entries, srt=True)
+
+    with open(vtt, encoding="utf-8") as f:
+        assert f.read() == ("WEBVTT\n\n"
+                            "00:00:00.000 --> 00:00:01.500\nuno\n\n"
+                            "00:00:03.000 --> 00:00:04.000\ntres\n")
+    with open(srt, encoding="utf-8") as f:
+        # Numeración consecutiva aunque falte el segundo fragmento
+        assert f.read() == ("1\n00:00:00,000 --> 00:00:01,500\nuno\n\n"
+                            "2\n00:00:03,000 --> 00:00:04,000\ntres\n")
+
+def test_add_writes_jsonl_lines(tmp_path):
+    output_file = str(tmp_path / "a_transcripcion.txt")
+    writer = TranscriptWriter(output_file, "a.wav", timed_formats=("jsonl", "srt"))
+    writer.open_new()
+    writer.add(0, "ok", "hola", 0, 1000, [{"word": "hola", "start_ms": 100, "end_ms": 400}])
+    writer.add(1, "error", "timeout", 1000, 2000)
+    writer.add(2, "ok", "sin tiempos")
+    writer.close()
+
+    assert read_jsonl(timed_path_for(output_file, "jsonl")) == [
+        {"fragment": 1, "status": "ok", "start_ms": 0, "end_ms": 1000, "text": "hola",
+         "words": [{"word": "hola", "start_ms": 100, "end_ms": 400}]},
+        {"fragment": 2, "status": "error", "start_ms": 1000, "end_ms": 2000, "text": ""},
+    ]
+    with open(timed_path_for(output_file, "srt"), encoding="utf-8") as f:
+        assert f.read().startswith("1\n00:00:00,000 --> 00:00:01,000\nhola\n")
+
+def test_resume_rewrites_timed_transcript(tmp_path):
+    output_file = str(tmp_path / "a_transcripcion.txt")
+    writer = TranscriptWriter(output_file, "a.wav", timed_formats=("jsonl",))
+    writer.open_new()
+    writer.add(0, "ok", "uno", 0, 1000)
+    writer.add(1, "ok", "dos", 1000, 2000)
+    writer.close()
+
+    # Al reanudar desde el fragmento 1 el archivo alineado se reescribe solo
+    # con los fragmentos previos, con las palabras en tiempo absoluto
+    resumed = TranscriptWriter(output_file, "a.wav", timed_formats=("jsonl",))
+    assert resumed.open_existing({0: ("ok", "uno")},
+                                 {0: (0, 1000, None), 1: (1000, 2000, None)})
+    resumed.add(1, "ok", "otra", 1000, 2000, [{"word": "otra", "start_ms": 0, "end_ms": 300}])
+    resumed.close()
+
+    entries = read_jsonl(timed_path_for(output_file, "jsonl"))
+    assert [(entry["fragment"], entry["text"]) for entry in entries] == [(1, "uno"), (2, "otra")]
+    assert entries[1]["words"] == [{"word": "otra", "start_ms": 1000, "end_ms": 1300}]
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def test_fragments_are_flushed_every_n(tmp_path):
+    output_file = str(tmp_path / "a_transcripcion.txt")
+    writer = TranscriptWriter(output_file, "a.wav", flush_every=2, timed_formats=())
+    writer.open_new()
+    writer.add(0, "ok", "uno")
+    assert writer.pending == 1
+    writer.add(1, "unknown", "")
+    # Al segundo fragmento se vacía el búfer: ambos están ya en disco
+    assert writer.pending == 0
+    content = read_text(output_file)
+    assert "[Fragmento 1] uno" in content and "[Fragmento 2] [No se pudo transcribir]" in content
+    writer.close()
+
+def test_resume_strips_previous_full_transcript(tmp_path):
+    output_file = str(tmp_path / "a_transcripcion.txt")
+    writer = TranscriptWriter(output_file, "a.wav", timed_formats=())
+    writer.open_new()
+    writer.add(0, "ok", "uno")
+    writer.add(1, "error", "timeout")
+    writer.add(2, "ok", "tres")
+    writer.finish()
+    writer.close()
+
+    # Sin textos previos se leen del archivo, sin los fragmentos fallidos
+    resumed = TranscriptWriter(output_file, "a.wav", timed_formats=())
+    assert resumed.open_existing()
+    assert resumed.fragments == {0: ("ok", "uno"), 2: ("ok", "tres")}
+    resumed.add(1, "ok", "dos")
+    resumed.finish()
+    resumed.close()
+
+    content = read_text(output_file)
+    assert content.startswith("\ufeffTranscripcion de: a.wav") and content.count("\ufeff") == 1
+    assert content.count(FULL_TRANSCRIPT_MARKER) == 1
+    assert content.endswith(FULL_TRANSCRIPT_MARKER + "\n\nuno dos tres")
+
+def test_resume_without_file(tmp_path):
+    writer = TranscriptWriter(str(tmp_path / "no_existe.txt"), "a.wav", timed_formats=())
+    assert not writer.open_existing()
@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pydub")
+
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+from transcribe_audio import find_cut_frame, iter_voice_segments
+
+def silent_frames(pattern):
+    # "v" marco con voz, "s" marco en silencio
+    return np.array([char == "s" for char in pattern])
+
+def test_cut_at_first_long_pause_after_minimum():
+    # Pausas: 2-3 (antes del mínimo), 6-8 (larga) y 11-15 (más larga)
+    silent = silent_frames("vvssvvsssvvsssssvv")
+    assert find_cut_frame(silent, 5, 3) == 7
+
+def test_cut_at_longest_pause_when_none_is_long_enough():
+    silent = silent_frames("vvvvsvvssvvv")
+    assert find_cut_frame(silent, 2, 3) == 8
+
+def test_cut_at_window_end_without_silence():
+    silent = silent_frames("ssvvvvvv")
+    assert find_cut_frame(silent, 2, 1) == len(silent)
+
+def tone(ms):
+    return Sine(440, sample_rate=8000).to_audio_segment(duration=ms, volume=-6.0).set_channels(1)
+
+def silence(ms):
+    return AudioSegment.silent(duration=ms, frame_rate=8000)
+
+def test_segments_cut_in_pause_and_keep_offsets():
+    audio = tone(12000) + silence(1000) + tone(12000)
+    chunks = [audio[start:start + 5000] for start in range(0, len(audio), 5000)]
+    segments = list(iter_voice_segments(chunks, min_ms=10000, max_ms=20000))
+
+    assert len(segments) == 2
+    (first_start, first), (second_start, second) = segments
+    assert first_start == 0
+    # El corte cae dentro de la pausa de 12 a 13 segundos
+    assert 12000 <= len(first) <= 13000
+    assert second_start == pytest.approx(len(first), abs=1)
+    assert len(first) + len(second) == len(audio)
+
+def test_silent_segments_are_dropped_but_counted():
+    audio = silence(25000) + tone(5000)
+    segments = list(iter_voice_segments([audio], min_ms=10000, max_ms=20000))
+
+    # El primer segmento (solo silencio) se omite y el segundo empieza donde
+    # terminó, en mitad de la pausa
+    assert len(segments) == 1
+    start_ms, segment = segments[0]
+    assert 10000 <= start_ms <= 20000
+    assert start_ms + len(segment) == pytest.approx(len(audio), abs=1)
@@ -0,0 +1,47 @@
+# Prueba de humo del reconocimiento por lotes de Whisper: el lote debe dar el
+# mismo texto que reconocer cada fragmento con la API pública de
+# faster-whisper. Necesita faster-whisper, el modelo (se descarga la primera
+# vez) y un clip corto con voz en WHISPER_SMOKE_AUDIO; si falta algo se omite.
+#
+#   WHISPER_SMOKE_AUDIO=clip.wav WHISPER_SMOKE_MODEL=tiny python -m pytest tests/test_whisper_batch.py
+import os
+import re
+import difflib
+
+import pytest
+
+faster_whisper = pytest.importorskip("faster_whisper")
+pytest.importorskip("pydub")
+
+from pydub import AudioSegment
+
+import asr_engines
+
+SMOKE_AUDIO = os.environ.get("WHISPER_SMOKE_AUDIO")
+SMOKE_MODEL = os.environ.get("WHISPER_SMOKE_MODEL", "tiny")
+FRAGMENT_MS = 10000
+
+def normalized(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+@pytest.mark.skipif(not SMOKE_AUDIO, reason="WHISPER_SMOKE_AUDIO no está definido")
+def test_batch_matches_per_fragment():
+    assert faster_whisper.__version__.startswith(asr_engines.WHISPER_BATCH_VERSIONS), (
+        f"faster-whisper {faster_whisper.__version__} no es la versión fijada")
+    sound = AudioSegment.from_file(SMOKE_AUDIO)
+    fragments = [sound[start:start + FRAGMENT_MS] for start in range(0, min(len(sound), 60000), FRAGMENT_MS)]
+
+    engine = asr_engines.create_engine("whisper", "es-ES", model=SMOKE_MODEL, batch_size=len(fragments))
+    batched = engine.recognize_batch(fragments)
+    single = asr_engines.SpeechEngine.recognize_batch(engine, fragments)
+
+    for index, (batch_result, single_result) in enumerate(zip(batched, single)):
+        if isinstance(single_result, asr_engines.NoSpeechError):
+            assert isinstance(batch_result, asr_engines.NoSpeechError), f"fragmento {index}"
+            continue
+        assert not isinstance(batch_result, Exception), f"fragmento {index}: {batch_result!r}"
+        batch_text, words = batch_result
+        similarity = difflib.SequenceMatcher(None, normalized(batch_text), normalized(single_result[0])).ratio()
+        assert similarity >= 0.9, f"fragmento {index}: {batch_text!r} frente a {single_result[0]!r}"
+        if words:
+            assert all(0 <= word["start_ms"] <= word["end_ms"] <= FRAGMENT_MS + 500 for word in words)
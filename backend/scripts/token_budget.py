@@ -0,0 +1,144 @@
+# Conteo de tokens y planificación del presupuesto antes de llamar al modelo.
+# Decide si la transcripción cabe en una sola llamada o hay que resumirla por
+# tramos, fija max_tokens con el espacio que queda y estima coste y duración.
+import math
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Límites y precios aproximados por modelo (precios en USD por millón de tokens)
+#   context: tokens de contexto, max_output: máximo de tokens de respuesta,
+#   tokens_per_second: velocidad de generación, first_token_s: latencia inicial
+MODEL_LIMITS = {
+    "gpt-3.5-turbo": {"context": 16385, "max_output": 4096, "price_in": 0.5, "price_out": 1.5,
+                      "tokens_per_second": 80, "first_token_s": 0.6},
+    "claude-3-sonnet-20240229": {"context": 200000, "max_output": 4096, "price_in": 3.0, "price_out": 15.0,
+                                 "tokens_per_second": 50, "first_token_s": 1.5},
+    "sonar": {"context": 127072, "max_output": 8000, "price_in": 1.0, "price_out": 1.0,
+              "tokens_per_second": 70, "first_token_s": 1.0},
+}
+DEFAULT_LIMITS = {"context": 8192, "max_output": 2048, "price_in": 1.0, "price_out": 1.0,
+                  "tokens_per_second": 50, "first_token_s": 1.0}
+
+# Tokens reservados para el formato de los mensajes y como margen de error
+MESSAGE_OVERHEAD = 20
+SAFETY_MARGIN = 0.05
+
+# Respuesta mínima aceptable para un acta completa y para un resumen parcial
+MIN_OUTPUT_TOKENS = 1500
+MAP_OUTPUT_TOKENS = 1000
+
+_encodings = {}
+
+def get_encoding(model):
+    """
+    Devuelve el tokenizador de tiktoken para el modelo, o None si no está
+    instalado. Para modelos que no son de OpenAI se usa cl100k_base como
+    aproximación.
+    """
+    if tiktoken is None:
+        return None
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model] = encoding
+    return encoding
+
+def count_tokens(text, model=None):
+    """
+    Cuenta los tokens del texto con tiktoken, o los estima (unos 4 caracteres
+    por token) si no está disponible
+    """
+    if not text:
+        return 0
+    encoding = get_encoding(model or "gpt-3.5-turbo")
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(math.ceil(len(text) / 4.0))
+
+def model_limits(model):
+    return MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+
+class BudgetPlan:
+    """
+    Resultado de plan_request: modo de procesamiento, tokens y estimaciones
+    """
+    def __init__(self, model, chunked, prompt_tokens, transcript_tokens, max_tokens,
+                 window_tokens, windows, map_max_tokens, estimated_cost, estimated_seconds, reduce_tokens):
+        self.model = model
+        self.chunked = chunked
+        self.prompt_tokens = prompt_tokens
+        self.transcript_tokens = transcript_tokens
+        self.max_tokens = max_tokens
+        self.window_tokens = window_tokens
+        self.windows = windows
+        self.map_max_tokens = map_max_tokens
+        self.estimated_cost = estimated_cost
+        self.estimated_seconds = estimated_seconds
+        self.reduce_tokens = reduce_tokens
+
+    def describe(self):
+        mode = f"por tramos ({self.windows} tramos de {self.window_tokens} tokens)" if self.chunked else "en una sola llamada"
+        return (f"Presupuesto {self.model}: prompt {self.prompt_tokens} tokens, transcripción "
+                f"{self.transcript_tokens} tokens, procesamiento {mode}, max_tokens {self.max_tokens}, "
+                f"coste estimado ${self.estimated_cost:.4f}, duración estimada {self.estimated_seconds:.0f} s")
+
+def _call_cost(limits, tokens_in, tokens_out):
+    return (tokens_in * limits["price_in"] + tokens_out * limits["price_out"]) / 1000000.0
+
+def _call_seconds(limits, tokens_out):
+    return limits["first_token_s"] + tokens_out / float(limits["tokens_per_second"])
+
+def plan_request(model, system_prompt, transcript, desired_output=None, map_workers=4, window_tokens=None,
+                 chunked=None):
+    """
+    Mide el prompt de sistema y la transcripción y decide cómo procesarla.
+    chunked=None decide automáticamente; True o False fuerzan el modo.
+    Lanza ValueError si la petición no puede caber en el contexto.
+    """
+    limits = model_limits(model)
+    context = int(limits["context"] * (1 - SAFETY_MARGIN))
+    system_tokens = count_tokens(system_prompt, model) + MESSAGE_OVERHEAD
+    transcript_tokens = count_tokens(transcript, model)
+    prompt_tokens = system_tokens + transcript_tokens
+    output_cap = min(limits["max_output"], desired_output or limits["max_output"])
+
+    if system_tokens + MIN_OUTPUT_TOKENS > context:
+        raise ValueError(f"El prompt de sistema ({system_tokens} tokens) no cabe en el contexto de {model}")
+
+    fits = prompt_tokens + MIN_OUTPUT_TOKENS <= context
+    if chunked is None:
+        chunked = not fits or (window_tokens is not None and transcript_tokens > window_tokens)
+    if not chunked:
+        if not fits:
+            raise ValueError(f"La transcripción ({prompt_tokens} tokens con el prompt) no cabe en una sola "
+                             f"llamada a {model}")
+        max_tokens = min(output_cap, context - prompt_tokens)
+        return BudgetPlan(model, False, prompt_tokens, transcript_tokens, max_tokens, None, 1, None,
+                          _call_cost(limits, prompt_tokens, max_tokens), _call_seconds(limits, max_tokens), None)
+
+    # Por tramos: cada tramo lleva el prompt de resumen parcial y su respuesta
+    map_max_tokens = min(MAP_OUTPUT_TOKENS, limits["max_output"])
+    largest_window = context - system_tokens - map_max_tokens
+    if window_tokens is None:
+        # Forzado por tramos aunque quepa: al menos dos tramos
+        window_tokens = largest_window if not fits else max(1, transcript_tokens // 2 + 1)
+    window_tokens = min(window_tokens, largest_window)
+    windows = max(1, int(math.ceil(transcript_tokens / float(window_tokens))))
+
+    # La llamada final recibe los resúmenes parciales con el prompt completo;
+    # reduce_tokens es lo que pueden ocupar juntos esos resúmenes
+    max_tokens = max(MIN_OUTPUT_TOKENS, min(output_cap, context - system_tokens - 2 * map_max_tokens))
+    reduce_tokens = context - system_tokens - max_tokens
+    reduce_input = system_tokens + min(windows * map_max_tokens, reduce_tokens)
+    cost = (_call_cost(limits, transcript_tokens + windows * system_tokens, windows * map_max_tokens)
+            + _call_cost(limits, reduce_input, max_tokens))
+    rounds = int(math.ceil(windows / float(max(1, map_workers))))
+    seconds = rounds * _call_seconds(limits, map_max_tokens) + _call_seconds(limits, max_tokens)
+    return BudgetPlan(model, True, prompt_tokens, transcript_tokens, max_tokens, window_tokens, windows,
+                      map_max_tokens, cost, seconds, reduce_tokens)
@@ -1,171 +1,663 @@
 # Modificación al script original para que reciba parámetros por línea de comandos
-import speech_recognition as sr
 from pydub import AudioSegment
-from pydub.utils import make_chunks
+from pydub.utils import make_chunks, mediainfo
 import os
 import time
 import sys
-import codecs
+import math
+import wave
+import shutil
+import argparse
+import itertools
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-def transcribe_audio_file(audio_path, start_fragment=0, end_fragment=None, chunk_length_ms=30000, language="es-ES"):
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from transcription_checkpoint import TranscriptionCheckpoint, audio_hash, checkpoint_path_for
+from disk_cache import DiskCache, DEFAULT_CACHE_ROOT, make_key
+from transcript_writer import TranscriptWriter, DEFAULT_TIMED_FORMATS, parse_timed_formats
+from asr_engines import ENGINES, DEFAULT_ENGINE, NoSpeechError, EngineRequestError, create_engine
+from jsonl_worker import serve, DEFAULT_MAX_JOBS
+
+# Valores por defecto para el reconocimiento concurrente
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_LIMIT = 1.0  # solicitudes por segundo y por hilo
+
+# Formato al que se normaliza el audio antes del reconocimiento
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+TARGET_SAMPLE_WIDTH = 2
+
+# Parámetros del segmentador por actividad de voz
+VAD_MIN_MS = 10000
+VAD_MAX_MS = 30000
+VAD_FRAME_MS = 30
+VAD_MIN_PAUSE_MS = 300
+VAD_SILENCE_THRESH_DB = -40.0
+
+# Caché de fragmentos transcritos, compartida entre ejecuciones
+TRANSCRIPTION_CACHE_DIR = os.environ.get("TRANSCRIPTION_CACHE_DIR",
+                                         os.path.join(DEFAULT_CACHE_ROOT, "transcripciones"))
+TRANSCRIPTION_CACHE_MAX_MB = float(os.environ.get("TRANSCRIPTION_CACHE_MAX_MB", "200"))
+
+class RateLimiter:
+    """
+    Limita el número de solicitudes por segundo, compartido entre varios hilos
+    """
+    def __init__(self, max_per_second):
+        self.interval = 1.0 / max_per_second if max_per_second and max_per_second > 0 else 0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+def run_in_order(func, items, workers):
+    """
+    Ejecuta func sobre cada elemento con un número limitado de hilos y
+    devuelve los resultados en el mismo orden de entrada. Solo mantiene en
+    vuelo el doble de tareas que hilos para no acumular fragmentos en memoria.
+    """
+    workers = max(1, int(workers or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def batched(items, size):
+    """
+    Agrupa un iterable en listas de hasta size elementos, sin materializarlo
+    """
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+class AudioDecodeError(RuntimeError):
+    """
+    ffmpeg no está disponible o no pudo decodificar el archivo de audio
+    """
+
+def ffmpeg_pcm_command(audio_path, sample_rate, channels):
+    """
+    Orden de ffmpeg que decodifica a PCM de 16 bits por la salida estándar
+    """
+    return [AudioSegment.converter, "-nostdin", "-v", "error", "-i", audio_path,
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ac", str(channels), "-ar", str(sample_rate), "-"]
+
+def load_audio(audio_path):
+    """
+    Carga el archivo de audio completo en memoria según su extensión
+    """
+    file_extension = os.path.splitext(audio_path)[1].lower()
+    
+    if file_extension in ['.mp4', '.m4a']:
+        sound = AudioSegment.from_file(audio_path, format="m4a")
+        print("Archivo M4A/MP4 cargado correctamente")
+    elif file_extension == '.mp3':
+        sound = AudioSegment.from_mp3(audio_path)
+        print("Archivo MP3 cargado correctamente")
+    elif file_extension == '.wav':
+        sound = AudioSegment.from_wav(audio_path)
+        print("Archivo WAV cargado correctamente")
+    else:
+        sound = AudioSegment.from_file(audio_path)
+        print(f"Archivo de formato {file_extension} cargado correctamente")
+    return sound
+
+def is_target_wav(audio_path, sample_rate, channels):
+    """
+    Indica si el archivo es un WAV PCM de 16 bits que ya tiene sample_rate y
+    channels, según su cabecera
+    """
+    try:
+        with wave.open(audio_path, "rb") as wav_file:
+            return (wav_file.getcomptype() == "NONE" and wav_file.getsampwidth() == TARGET_SAMPLE_WIDTH
+                    and wav_file.getframerate() == sample_rate and wav_file.getnchannels() == channels)
+    except (OSError, EOFError, wave.Error):
+        return False
+
+def decode_audio(audio_path, sample_rate=TARGET_SAMPLE_RATE, channels=TARGET_CHANNELS):
+    """
+    Decodifica el archivo completo con ffmpeg directamente a PCM de 16 bits
+    con sample_rate y channels, sin pasar por el audio original a
+    resolución completa. (pydub añade sus parameters después de la salida,
+    donde ffmpeg los ignora, así que aquí se construye la orden completa.)
+    Un WAV que ya tiene ese formato se lee sin ffmpeg; si ffmpeg no está
+    instalado el audio se carga con pydub y se convierte en memoria.
+    """
+    if is_target_wav(audio_path, sample_rate, channels):
+        return AudioSegment.from_wav(audio_path)
+    if shutil.which(AudioSegment.converter) is None:
+        sound = load_audio(audio_path)
+        return sound.set_frame_rate(sample_rate).set_channels(channels).set_sample_width(TARGET_SAMPLE_WIDTH)
+    result = subprocess.run(ffmpeg_pcm_command(audio_path, sample_rate, channels),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise AudioDecodeError(f"ffmpeg terminó con código {result.returncode}: {error}")
+    frame_size = TARGET_SAMPLE_WIDTH * channels
+    data = result.stdout[:len(result.stdout) - len(result.stdout) % frame_size]
+    return AudioSegment(data=data, sample_width=TARGET_SAMPLE_WIDTH, frame_rate=sample_rate, channels=channels)
+
+def probe_duration_ms(audio_path):
+    """
+    Obtiene la duración del audio con ffprobe sin decodificarlo.
+    Devuelve None si no se puede determinar.
+    """
+    try:
+        return float(mediainfo(audio_path)["duration"]) * 1000
+    except Exception:
+        return None
+
+def iter_audio_chunks(audio_path, chunk_length_ms, sample_rate=TARGET_SAMPLE_RATE, channels=TARGET_CHANNELS):
+    """
+    Decodifica el audio con ffmpeg a PCM de 16 bits por una tubería y devuelve
+    fragmentos de chunk_length_ms como AudioSegment, uno a uno. La memoria
+    usada queda limitada a los fragmentos que se estén procesando.
+    Con sample_rate o channels en None se conserva el formato original.
+    """
+    if sample_rate is None or channels is None:
+        info = mediainfo(audio_path)
+        sample_rate = sample_rate or int(info.get("sample_rate") or 44100)
+        channels = channels or int(info.get("channels") or 1)
+    
+    sample_width = 2
+    frame_size = sample_width * channels
+    bytes_per_chunk = int(sample_rate * chunk_length_ms / 1000) * frame_size
+    command = ffmpeg_pcm_command(audio_path, sample_rate, channels)
+    
+    with tempfile.TemporaryFile() as stderr_file:
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+        except OSError as e:
+            raise AudioDecodeError(f"no se pudo ejecutar ffmpeg: {e}")
+        finished = False
+        killed = False
+        try:
+            while True:
+                data = process.stdout.read(bytes_per_chunk)
+                if not data:
+                    break
+                # Descartar un posible marco incompleto al final del flujo
+                data = data[:len(data) - len(data) % frame_size]
+                if data:
+                    yield AudioSegment(data=data, sample_width=sample_width,
+                                       frame_rate=sample_rate, channels=channels)
+            finished = True
+        finally:
+            process.stdout.close()
+            # Si se dejó de leer antes del final, ffmpeg ya no hace falta
+            if not finished and process.poll() is None:
+                killed = True
+                process.kill()
+            return_code = process.wait()
+        
+        # Solo se acepta la terminación forzada si la provocó este código
+        if return_code != 0 and not killed:
+            stderr_file.seek(0)
+            error = stderr_file.read().decode("utf-8", errors="replace").strip()
+            raise AudioDecodeError(f"ffmpeg terminó con código {return_code}: {error}")
+
+def segment_duration_ms(segment):
+    """
+    Duración exacta de un AudioSegment en milisegundos (len() la redondea)
+    """
+    return segment.frame_count() * 1000.0 / segment.frame_rate
+
+def with_offsets(chunks):
+    """
+    Acompaña cada fragmento de su posición en el audio: devuelve pares
+    (inicio en ms, AudioSegment) acumulando la duración real de cada uno
+    """
+    offset = 0.0
+    for chunk in chunks:
+        yield offset, chunk
+        offset += segment_duration_ms(chunk)
+
+def frame_energy_db(samples, frame_len):
+    """
+    Calcula la energía RMS en dBFS de cada marco de frame_len muestras,
+    vectorizado sobre todo el arreglo (muestras normalizadas entre -1 y 1)
+    """
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+def find_cut_frame(silent, min_frames, min_pause_frames):
+    """
+    Elige el marco donde cortar dentro de la ventana [min_frames, len(silent)).
+    Prefiere la primera pausa suficientemente larga, luego la pausa más larga
+    y, si no hay silencio, el final de la ventana.
+    """
+    window = silent[min_frames:]
+    if not window.any():
+        return len(silent)
+    
+    # Inicio y fin de cada racha de marcos silenciosos
+    padded = np.concatenate(([False], window, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+    
+    long_pauses = np.flatnonzero(lengths >= min_pause_frames)
+    run = long_pauses[0] if len(long_pauses) else int(np.argmax(lengths))
+    return min_frames + int((starts[run] + ends[run]) // 2)
+
+def iter_voice_segments(chunks, min_ms=VAD_MIN_MS, max_ms=VAD_MAX_MS, frame_ms=VAD_FRAME_MS,
+                        min_pause_ms=VAD_MIN_PAUSE_MS, silence_thresh_db=VAD_SILENCE_THRESH_DB):
+    """
+    Reagrupa un flujo de AudioSegment en segmentos de voz cortados en las
+    pausas, con duración entre min_ms y max_ms, y devuelve pares (inicio en
+    ms, AudioSegment). Los segmentos que solo contienen silencio se descartan
+    para no gastar llamadas al reconocedor, pero su duración se sigue
+    contando para que los inicios correspondan al audio original.
+    """
+    buffer = None
+    offset = 0.0
+    pending = iter(chunks)
+    exhausted = False
+    
+    while True:
+        # Acumular audio hasta tener una ventana completa o agotar la entrada
+        while not exhausted and (buffer is None or len(buffer) < max_ms):
+            try:
+                chunk = next(pending)
+            except StopIteration:
+                exhausted = True
+                break
+            buffer = chunk if buffer is None else buffer + chunk
+        
+        if buffer is None or len(buffer) == 0:
+            return
+        
+        window = buffer[:max_ms]
+        samples = np.asarray(window.get_array_of_samples(), dtype=np.float64)
+        samples = samples.reshape(-1, window.channels).mean(axis=1) / window.max_possible_amplitude
+        
+        frame_len = max(1, int(window.frame_rate * frame_ms / 1000))
+        silent = frame_energy_db(samples, frame_len) < silence_thresh_db
+        
+        if exhausted and len(buffer) <= max_ms:
+            # Último trozo: se emite completo
+            cut_ms = len(buffer)
+        else:
+            min_frames = min(len(silent), min_ms // frame_ms)
+            min_pause_frames = max(1, min_pause_ms // frame_ms)
+            cut_ms = find_cut_frame(silent, min_frames, min_pause_frames) * frame_ms
+            cut_ms = max(frame_ms, min(cut_ms, max_ms))
+        
+        segment = buffer[:cut_ms]
+        buffer = buffer[cut_ms:]
+        start_ms = offset
+        offset += segment_duration_ms(segment)
+        
+        # Descartar segmentos sin ningún marco con voz
+        voiced = ~silent[:max(1, cut_ms // frame_ms)]
+        if voiced.any():
+            yield start_ms, segment
+
+def transcript_path_for(audio_path):
+    """
+    Ruta del archivo de transcripción, junto al archivo de audio
+    """
+    output_dir = os.path.dirname(audio_path)  # Directorio del archivo de audio
+    output_basename = os.path.splitext(os.path.basename(audio_path))[0] + "_transcripcion.txt"
+    return os.path.join(output_dir, output_basename)  # Ruta completa
+
+def transcribe_audio_file(audio_path, start_fragment=0, end_fragment=None, chunk_length_ms=30000, language="es-ES",
+                          workers=DEFAULT_WORKERS, rate_limit=DEFAULT_RATE_LIMIT,
+                          normalize=True, stream=False,
+                          vad=False, vad_min_ms=VAD_MIN_MS, vad_max_ms=VAD_MAX_MS, resume=False,
+                          use_cache=True, timed_formats=DEFAULT_TIMED_FORMATS,
+                          engine=DEFAULT_ENGINE, engine_model=None, batch_size=None, raise_errors=False):
     """
     Transcribe un archivo de audio dividido en fragmentos pequeños
     Permite transcribir un rango específico de fragmentos
+    Los fragmentos se reconocen en paralelo con `workers` hilos, limitados a
+    `rate_limit` solicitudes por segundo cada uno (0 desactiva el límite)
+    Con normalize=True el audio se convierte a mono de 16 kHz y 16 bits
+    Con stream=True el audio se decodifica por ventanas con ffmpeg en lugar
+    de cargarse completo en memoria
+    Con vad=True los fragmentos se cortan en las pausas (entre vad_min_ms y
+    vad_max_ms) y se omiten los tramos de silencio
+    Con resume=True se omiten los fragmentos ya completados según el punto de
+    control guardado junto a la transcripción
+    Con use_cache=True los fragmentos con el mismo audio ya transcritos en
+    otra ejecución se toman de la caché sin llamar al reconocedor
+    timed_formats indica los archivos alineados en el tiempo que se escriben
+    junto a la transcripción ("jsonl", "vtt", "srt"), con el inicio y el fin
+    de cada fragmento y las marcas de palabra si el reconocedor las da
+    engine elige el motor de reconocimiento (asr_engines): "google" por red o
+    un modelo local en CPU ("vosk", "whisper") indicado por engine_model
+    batch_size fija los fragmentos por lote de los motores que admiten lotes
+    (None: según los núcleos de la máquina)
+    Con raise_errors=True los errores del motor, de carga o de decodificación
+    se propagan en lugar de devolver "" o el texto parcial, para que la cola
+    y el modo trabajador no los confundan con una transcripción terminada
     """
     print(f"Procesando archivo: {audio_path}")
     start_time = time.time()
     
-    # Crear carpeta para fragmentos temporales
-    temp_folder = "temp_audio_chunks"
-    if not os.path.exists(temp_folder):
-        os.makedirs(temp_folder)
-    
-    # Cargar el archivo de audio
-    print("Cargando archivo de audio...")
+    # Los modelos locales se cargan una sola vez por proceso
+    workers = max(1, int(workers or 1))
     try:
-        file_extension = os.path.splitext(audio_path)[1].lower()
-        
-        if file_extension in ['.mp4', '.m4a']:
-            sound = AudioSegment.from_file(audio_path, format="m4a")
-            print("Archivo M4A/MP4 cargado correctamente")
-        elif file_extension == '.mp3':
-            sound = AudioSegment.from_mp3(audio_path)
-            print("Archivo MP3 cargado correctamente")
-        elif file_extension == '.wav':
-            sound = AudioSegment.from_wav(audio_path)
-            print("Archivo WAV cargado correctamente")
-        else:
-            sound = AudioSegment.from_file(audio_path)
-            print(f"Archivo de formato {file_extension} cargado correctamente")
-    except Exception as e:
-        print(f"Error al cargar el archivo de audio: {e}")
+        asr = create_engine(engine, language, model=engine_model, workers=workers, batch_size=batch_size)
+    except (ImportError, ValueError) as e:
+        print(f"Error al preparar el motor de reconocimiento: {e}")
+        if raise_errors:
+            raise
         return ""
     
+    if stream:
+        # Decodificación por ventanas: nunca se carga el audio completo en memoria
+        print("Decodificando audio en streaming...")
+        duration_ms = probe_duration_ms(audio_path)
+        if normalize:
+            chunks = iter_audio_chunks(audio_path, chunk_length_ms)
+        else:
+            chunks = iter_audio_chunks(audio_path, chunk_length_ms, sample_rate=None, channels=None)
+        total_chunks = int(math.ceil(duration_ms / chunk_length_ms)) if duration_ms else None
+    else:
+        # Cargar el archivo de audio
+        print("Cargando archivo de audio...")
+        try:
+            if normalize:
+                # ffmpeg entrega ya mono a 16 kHz: nunca se carga el original completo
+                sound = decode_audio(audio_path)
+                print("Archivo de audio decodificado a mono de 16 kHz")
+            else:
+                sound = load_audio(audio_path)
+        except Exception as e:
+            print(f"Error al cargar el archivo de audio: {e}")
+            if raise_errors:
+                raise
+            return ""
+        duration_ms = len(sound)
+        
+        # Dividir en fragmentos
+        chunks = make_chunks(sound, chunk_length_ms)
+        total_chunks = len(chunks)
+    
     # Obtener duración en segundos
-    duration_s = len(sound) / 1000
-    print(f"Duracion del audio: {duration_s:.2f} segundos ({duration_s/60:.2f} minutos)")
+    if duration_ms:
+        duration_s = duration_ms / 1000
+        print(f"Duracion del audio: {duration_s:.2f} segundos ({duration_s/60:.2f} minutos)")
     
-    # Dividir en fragmentos
-    chunks = make_chunks(sound, chunk_length_ms)
-    total_chunks = len(chunks)
+    vad_active = False
+    if vad:
+        if np is None:
+            print("AVISO: numpy no está instalado; se usarán fragmentos fijos en lugar de cortes por silencio")
+            print("Instale numpy con: pip install numpy")
+        else:
+            # El número de segmentos depende de las pausas y no se conoce de antemano
+            chunks = iter_voice_segments(chunks, vad_min_ms, vad_max_ms)
+            total_chunks = None
+            vad_active = True
+            print(f"Cortando fragmentos en las pausas (entre {vad_min_ms/1000} y {vad_max_ms/1000} segundos)")
+    
+    if not vad_active:
+        chunks = with_offsets(chunks)
     
-    # Ajustar end_fragment si es None o mayor que el total de fragmentos
-    if end_fragment is None or end_fragment > total_chunks:
-        end_fragment = total_chunks
+    # En streaming el total se estima con la duración del contenedor (que
+    # puede quedarse corta, p. ej. en MP3 VBR): solo sirve para el progreso y
+    # sin end_fragment se recorre el audio hasta que se agota
+    exact_total = total_chunks if not stream else None
+    if end_fragment is not None and exact_total is not None and end_fragment >= exact_total:
+        end_fragment = None
+    reaches_end = end_fragment is None
+    if total_chunks is None:
+        total_label = "?"
+    else:
+        total_label = total_chunks if exact_total is not None else f"~{total_chunks}"
     
-    print(f"Archivo dividido en {total_chunks} fragmentos de {chunk_length_ms/1000} segundos")
-    print(f"Procesando desde el fragmento {start_fragment+1} hasta el {end_fragment}")
+    print(f"Archivo dividido en {total_label} fragmentos de {chunk_length_ms/1000} segundos")
+    print(f"Procesando desde el fragmento {start_fragment+1} hasta el {end_fragment or total_label}")
     
-    # Inicializar reconocedor
-    recognizer = sr.Recognizer()
+    # Límite de solicitudes compartido, solo para los motores por red
+    limiter = RateLimiter(rate_limit * workers if rate_limit and asr.network else 0)
+    print(f"Reconociendo con {workers} hilo(s) en paralelo (motor {asr.name})")
+    if asr.batch_size > 1:
+        print(f"Lotes de hasta {asr.batch_size} fragmentos por llamada al modelo")
     
     # Archivo para guardar la transcripción
-    output_dir = os.path.dirname(audio_path)  # Directorio del archivo de audio
-    output_basename = os.path.splitext(os.path.basename(audio_path))[0] + "_transcripcion.txt"
-    output_file = os.path.join(output_dir, output_basename)  # Ruta completa
+    output_file = transcript_path_for(audio_path)
+    
+    # Punto de control para poder reanudar tras una caída
+    settings = {
+        "chunk_length_ms": chunk_length_ms,
+        "language": language,
+        "normalize": normalize,
+        "vad": [vad_min_ms, vad_max_ms] if vad and np is not None else None,
+    }
+    # Sin clave de motor para Google, así siguen valiendo la caché y los puntos
+    # de control anteriores
+    if asr.name != "google":
+        settings["engine"] = asr.settings()
+    checkpoint = TranscriptionCheckpoint(checkpoint_path_for(output_file), audio_path, settings)
+    if resume or start_fragment > 0:
+        loaded = checkpoint.load()
+        if loaded:
+            print(f"Punto de control encontrado con {loaded} fragmentos registrados")
+    
+    # Caché por contenido: la clave incluye el PCM del fragmento y la configuración
+    cache = None
+    if use_cache:
+        try:
+            cache = DiskCache(TRANSCRIPTION_CACHE_DIR, TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024)
+        except OSError as e:
+            print(f"Aviso: no se pudo abrir la caché de transcripciones: {e}")
+    
+    # Un único archivo abierto durante todo el proceso
+    writer = TranscriptWriter(output_file, audio_path, timed_formats=timed_formats)
     
     # Verificar si estamos continuando una transcripción
     if start_fragment == 0:
         # Iniciar nuevo archivo con BOM UTF-8
-        with codecs.open(output_file, "w", "utf-8-sig") as f:
-            f.write("Transcripcion de: " + audio_path + "\n")
-            f.write("Fecha: " + time.strftime('%Y-%m-%d %H:%M:%S') + "\n\n")
-        all_text = ""
+        writer.open_new()
+    elif writer.open_existing(checkpoint.entries_before(start_fragment),
+                              checkpoint.timings_before(start_fragment)):
+        print("Archivo de transcripcion existente encontrado. Continuando...")
     else:
-        # Leer el archivo existente para continuar
-        try:
-            with codecs.open(output_file, "r", "utf-8-sig") as f:
-                content = f.read()
-            print(f"Archivo de transcripcion existente encontrado. Continuando...")
-            all_text = ""  # Reconstruiremos después
-        except:
-            print("No se encontro archivo previo o hubo un error al leerlo. Creando nuevo archivo.")
-            with codecs.open(output_file, "w", "utf-8-sig") as f:
-                f.write("Transcripcion de: " + audio_path + "\n")
-                f.write("Fecha: " + time.strftime('%Y-%m-%d %H:%M:%S') + "\n\n")
-            all_text = ""
-    
-    # Procesar fragmentos desde el punto de inicio hasta el punto final
-    for i in range(start_fragment, end_fragment):
-        # Guardar fragmento como WAV temporal
-        chunk_name = os.path.join(temp_folder, f"chunk_{i}.wav")
-        print(f"Procesando fragmento {i+1}/{total_chunks}...")
-        chunks[i].export(chunk_name, format="wav")
+        print("No se encontro archivo previo o hubo un error al leerlo. Creando nuevo archivo.")
+        writer.open_new()
+    
+    def lookup_fragment(item):
+        """
+        Busca un fragmento (indice, (inicio en ms, AudioSegment)) en el punto
+        de control y en la caché. Devuelve (resultado, None) si ya está
+        transcrito o (None, trabajo) si hay que pasarlo por el reconocedor.
+        El resultado es (indice, estado, texto, hash del audio, origen,
+        tiempos) donde el origen es "checkpoint", "cache" o None si se llamó
+        al reconocedor y tiempos es (inicio, fin, marcas de palabra).
+        """
+        i, (start_ms, chunk) = item
+        end_ms = start_ms + segment_duration_ms(chunk)
+        fragment_hash = audio_hash(chunk)
+        if resume:
+            entry = checkpoint.completed(i, fragment_hash)
+            if entry:
+                return (i, entry["status"], entry["text"], fragment_hash, "checkpoint",
+                        (start_ms, end_ms, entry.get("words"))), None
         
-        # Reconocimiento de voz
-        try:
-            with sr.AudioFile(chunk_name) as source:
-                audio_data = recognizer.record(source)
-                text = recognizer.recognize_google(audio_data, language=language)
-                
-                # Añadir texto al resultado
-                all_text += text + " "
-                
-                # Guardar progreso parcial
-                with codecs.open(output_file, "a", "utf-8-sig") as f:
-                    f.write("[Fragmento " + str(i+1) + "] " + text + "\n\n")
-                
-                print(f"  - Fragmento {i+1} completado ({len(text)} caracteres)")
-        except sr.UnknownValueError:
-            print(f"  - No se pudo entender el audio en el fragmento {i+1}")
-            with codecs.open(output_file, "a", "utf-8-sig") as f:
-                f.write("[Fragmento " + str(i+1) + "] [No se pudo transcribir]\n\n")
-        except sr.RequestError as e:
-            print(f"  - Error en solicitud a la API: {e}")
-            with codecs.open(output_file, "a", "utf-8-sig") as f:
-                f.write("[Fragmento " + str(i+1) + "] [Error: " + str(e) + "]\n\n")
-        except Exception as e:
-            print(f"  - Error inesperado: {e}")
+        cache_key = make_key(fragment_hash, settings) if cache else None
+        if cache:
+            cached = cache.get(cache_key)
+            if cached:
+                return (i, cached["status"], cached["text"], fragment_hash, "cache",
+                        (start_ms, end_ms, cached.get("words"))), None
+        return None, (i, start_ms, end_ms, chunk, fragment_hash, cache_key)
+    
+    def recognized(job, outcome):
+        """
+        Convierte la salida del motor para un trabajo ((texto, palabras) o
+        una excepción) en el resultado del fragmento
+        """
+        i, start_ms, end_ms, chunk, fragment_hash, cache_key = job
+        if isinstance(outcome, NoSpeechError):
+            text, words, status = "", None, "unknown"
+        elif isinstance(outcome, EngineRequestError):
+            return i, "error", str(outcome), fragment_hash, None, (start_ms, end_ms, None)
+        elif isinstance(outcome, Exception):
+            return i, "failed", str(outcome), fragment_hash, None, (start_ms, end_ms, None)
+        else:
+            (text, words), status = outcome, "ok"
         
-        # Eliminar archivo temporal
-        try:
-            os.remove(chunk_name)
-        except:
-            pass
+        # Solo se guardan resultados definitivos, nunca errores transitorios
+        if cache:
+            cache.set(cache_key, {"status": status, "text": text, "words": words})
+        return i, status, text, fragment_hash, None, (start_ms, end_ms, words)
     
-    # Solo reconstruimos la transcripción completa si hemos llegado al final
-    if end_fragment == total_chunks:
-        try:
-            with codecs.open(output_file, "r", "utf-8-sig") as f:
-                content = f.read()
-            
-            # Eliminar la sección de transcripción completa si existe
-            if "--- TRANSCRIPCION COMPLETA ---" in content:
-                content = content.split("--- TRANSCRIPCION COMPLETA ---")[0]
-            
-            # Extraer todas las partes de texto de los fragmentos
-            import re
-            fragments = re.findall(r'\[Fragmento \d+\] (.*?)(?=\n\n|\Z)', content, re.DOTALL)
-            reconstructed_text = " ".join([f for f in fragments if not f.startswith("[No se pudo") and not f.startswith("[Error:")])
-            
-            # Añadir la transcripción completa al final
-            with codecs.open(output_file, "a", "utf-8-sig") as f:
-                f.write("\n\n--- TRANSCRIPCION COMPLETA ---\n\n")
-                f.write(reconstructed_text)
+    def recognize_batch(batch):
+        """
+        Reconoce un lote de fragmentos con una sola llamada al motor (solo los
+        que no estaban ya transcritos) y devuelve sus resultados en orden
+        """
+        results = []
+        jobs = []
+        for item in batch:
+            result, job = lookup_fragment(item)
+            results.append(result)
+            if job:
+                jobs.append((len(results) - 1, job))
+        if jobs:
+            limiter.wait()
+            try:
+                outcomes = asr.recognize_batch([job[3] for _, job in jobs])
+            except Exception as e:
+                outcomes = [e] * len(jobs)
+            for (position, job), outcome in zip(jobs, outcomes):
+                results[position] = recognized(job, outcome)
+        return results
+    
+    # Procesar fragmentos desde el punto de inicio hasta el punto final.
+    # Los resultados llegan en orden, así que el archivo conserva la secuencia.
+    selected = itertools.islice(enumerate(chunks), start_fragment, end_fragment)
+    results = (result for batch_results in run_in_order(recognize_batch, batched(selected, asr.batch_size), workers)
+               for result in batch_results)
+    try:
+        for i, status, text, fragment_hash, source, timing in results:
+            print(f"Procesando fragmento {i+1}/{total_label}...")
+            if source == "checkpoint":
+                print(f"  - Fragmento {i+1} recuperado del punto de control")
+            else:
+                if source == "cache":
+                    print(f"  - Fragmento {i+1} recuperado de la caché")
+                checkpoint.record(i, status, text, fragment_hash, *timing)
             
+            # Guardar progreso parcial
+            writer.add(i, status, text, *timing)
+            if status == "ok":
+                print(f"  - Fragmento {i+1} completado ({len(text)} caracteres)")
+            elif status == "unknown":
+                print(f"  - No se pudo entender el audio en el fragmento {i+1}")
+            elif status == "error":
+                print(f"  - Error en solicitud a la API: {text}")
+            else:
+                print(f"  - Error inesperado: {text}")
+        
+        # Solo generamos la transcripción completa si hemos llegado al final
+        if reaches_end:
+            writer.finish()
             print("\nSe ha generado la transcripcion completa")
-        except Exception as e:
-            print(f"Error al reconstruir la transcripcion completa: {e}")
-    else:
-        print("\nProceso parcial completado. No se ha generado la transcripcion completa aun.")
+        else:
+            print("\nProceso parcial completado. No se ha generado la transcripcion completa aun.")
+    except AudioDecodeError as e:
+        # Errores del decodificador en streaming (ffmpeg ausente o archivo dañado)
+        print(f"Error al decodificar el archivo de audio: {e}")
+        if raise_errors:
+            raise
+        return writer.full_text()
+    finally:
+        writer.close()
+        checkpoint.compact()
     
     total_time = time.time() - start_time
     print(f"\nProceso completado en {total_time:.2f} segundos")
     print(f"Transcripcion guardada en: {output_file}")
     
-    # Limpiar carpeta temporal
-    try:
-        os.rmdir(temp_folder)
-    except:
-        pass
-    
-    return all_text
+    return writer.full_text()
+
+def handle_worker_job(params):
+    """
+    Atiende un trabajo del modo --worker. params contiene audio_path y
+    cualquier otro argumento de transcribe_audio_file.
+    """
+    params = dict(params)
+    audio_path = params.pop("audio_path", None)
+    if not audio_path or not os.path.exists(audio_path):
+        raise FileNotFoundError(f"El archivo {audio_path} no existe")
+    params.setdefault("raise_errors", True)
+    text = transcribe_audio_file(audio_path, **params)
+    return {"transcript_file": transcript_path_for(audio_path), "characters": len(text)}
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Transcribe un archivo de audio por fragmentos')
+    parser.add_argument('audio_path', nargs='?', help='Ruta del archivo de audio (mp4, m4a, mp3, wav)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Número de fragmentos reconocidos en paralelo')
+    parser.add_argument('--rate_limit', type=float, default=DEFAULT_RATE_LIMIT,
+                        help='Máximo de solicitudes por segundo por hilo (0 sin límite)')
+    parser.add_argument('--no_normalize', action='store_true',
+                        help='No convertir el audio a mono de 16 kHz antes del reconocimiento')
+    parser.add_argument('--stream', action='store_true',
+                        help='Decodificar el audio por ventanas con ffmpeg en lugar de cargarlo completo en memoria')
+    parser.add_argument('--vad', action='store_true',
+                        help='Cortar los fragmentos en las pausas y omitir los tramos de silencio')
+    parser.add_argument('--resume', action='store_true',
+                        help='Reanudar usando el punto de control y omitir los fragmentos ya completados')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='No usar la caché de fragmentos ya transcritos')
+    parser.add_argument('--engine', default=DEFAULT_ENGINE, choices=sorted(ENGINES),
+                        help='Motor de reconocimiento: google (por red) o un modelo local en CPU (vosk, whisper)')
+    parser.add_argument('--model',
+                        help='Modelo del motor local: carpeta del modelo Vosk o tamaño/ruta del modelo Whisper')
+    parser.add_argument('--batch_size', type=int,
+                        help='Fragmentos por lote en los motores locales que lo admiten (por defecto según los núcleos)')
+    parser.add_argument('--timestamps',
+                        help='Archivos alineados en el tiempo separados por comas: jsonl, vtt, srt o none '
+                             '(por defecto jsonl)')
+    parser.add_argument('--worker', action='store_true',
+                        help='Modo trabajador persistente: recibe trabajos JSON por stdin')
+    parser.add_argument('--max_jobs', type=int, default=DEFAULT_MAX_JOBS,
+                        help='Trabajos simultáneos en modo trabajador')
+    args = parser.parse_args()
+    try:
+        timed_formats = parse_timed_formats(args.timestamps)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.worker:
+        serve(handle_worker_job, args.max_jobs, name="transcribe_audio")
+        sys.exit(0)
+    
     # Verificar si se proporcionó un argumento de línea de comandos
-    if len(sys.argv) > 1:
+    if args.audio_path:
         # Usar el primer argumento como ruta del archivo de audio
-        archivo_audio = sys.argv[1]
+        archivo_audio = args.audio_path
         
         # Verificar si la ruta existe
         if not os.path.exists(archivo_audio):
@@ -178,7 +670,18 @@ if __name__ == "__main__":
                 start_fragment=0, 
                 end_fragment=None, 
                 chunk_length_ms=30000, 
-                language="es-ES"
+                language="es-ES",
+                workers=args.workers,
+                rate_limit=args.rate_limit,
+                normalize=not args.no_normalize,
+                stream=args.stream,
+                vad=args.vad,
+                resume=args.resume,
+                use_cache=not args.no_cache,
+                timed_formats=timed_formats,
+                engine=args.engine,
+                engine_model=args.model,
+                batch_size=args.batch_size
             )
             sys.exit(0)
     else:
@@ -212,4 +715,15 @@ if __name__ == "__main__":
                                 start_fragment=fragmento_inicio, 
                                 end_fragment=fragmento_fin, 
                                 chunk_length_ms=30000, 
-                                language=codigo_idioma)
\ No newline at end of file
+                                language=codigo_idioma,
+                                workers=args.workers,
+                                rate_limit=args.rate_limit,
+                                normalize=not args.no_normalize,
+                                stream=args.stream,
+                                vad=args.vad,
+                                resume=args.resume,
+                                use_cache=not args.no_cache,
+                                timed_formats=timed_formats,
+                                engine=args.engine,
+                                engine_model=args.model,
+                                batch_size=args.batch_size)
\ No newline at end of file
@@ -0,0 +1,249 @@
+# Escritura de la transcripción por fragmentos con un único archivo abierto
+#
+# Además del texto se escribe la versión alineada en el tiempo:
+#   <base>_transcripcion.jsonl  una línea por fragmento, a medida que se reconoce:
+#     {"fragment": N, "status": "ok", "start_ms": ..., "end_ms": ..., "text": "...",
+#      "words": [{"word": "...", "start_ms": ..., "end_ms": ...}]}
+#   <base>_transcripcion.vtt / .srt  subtítulos generados al cerrar
+# Las marcas de palabra solo aparecen si el reconocedor las proporciona.
+import os
+import re
+import json
+import time
+
+FULL_TRANSCRIPT_MARKER = "--- TRANSCRIPCION COMPLETA ---"
+FRAGMENT_PATTERN = re.compile(r'\[Fragmento (\d+)\] (.*?)(?=\n\n|\Z)', re.DOTALL)
+
+def fragment_line(index, status, text):
+    """
+    Línea de la transcripción para un fragmento, o None si no se escribe
+    """
+    if status == "ok":
+        return "[Fragmento " + str(index + 1) + "] " + text + "\n\n"
+    if status == "unknown":
+        return "[Fragmento " + str(index + 1) + "] [No se pudo transcribir]\n\n"
+    if status == "error":
+        return "[Fragmento " + str(index + 1) + "] [Error: " + text + "]\n\n"
+    return None
+
+# Formatos alineados en el tiempo que se pueden generar
+TIMED_FORMATS = ("jsonl", "vtt", "srt")
+DEFAULT_TIMED_FORMATS = tuple(name for name in os.environ.get("TRANSCRIPT_TIMED_FORMATS", "jsonl").split(",")
+                              if name in TIMED_FORMATS)
+
+def parse_timed_formats(value):
+    """
+    Convierte "jsonl,vtt" (o "none") en la tupla de formatos alineados
+    """
+    if value is None:
+        return DEFAULT_TIMED_FORMATS
+    names = [name.strip().lower() for name in value.split(",") if name.strip()]
+    if names == ["none"]:
+        return ()
+    unknown = [name for name in names if name not in TIMED_FORMATS]
+    if unknown:
+        raise ValueError(f"formato de marcas de tiempo desconocido: {', '.join(unknown)}")
+    return tuple(names)
+
+def timed_path_for(output_file, extension):
+    """
+    Ruta del archivo alineado en el tiempo junto a la transcripción
+    """
+    return os.path.splitext(output_file)[0] + "." + extension
+
+def format_timestamp(ms, separator="."):
+    """
+    Marca de tiempo HH:MM:SS.mmm (WebVTT) o HH:MM:SS,mmm (SRT)
+    """
+    ms = max(0, int(round(ms)))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+def timed_entry(index, status, text, timing):
+    """
+    Entrada JSONL de un fragmento. timing es (inicio, fin, palabras) en
+    milisegundos desde el principio del audio.
+    """
+    start_ms, end_ms, words = timing
+    entry = {"fragment": index + 1, "status": status, "start_ms": start_ms, "end_ms": end_ms,
+             "text": text if status == "ok" else ""}
+    if words:
+        entry["words"] = words
+    return entry
+
+def absolute_words(words, start_ms):
+    """
+    Pasa las marcas de palabra relativas al fragmento a tiempos absolutos
+    """
+    if not words:
+        return None
+    return [dict(word, start_ms=int(round(start_ms + word["start_ms"])),
+                 end_ms=int(round(start_ms + word["end_ms"]))) for word in words]
+
+def write_subtitles(path, entries, srt=False):
+    """
+    Escribe los fragmentos reconocidos como subtítulos WebVTT o SRT
+    """
+    separator = "," if srt else "."
+    lines = [] if srt else ["WEBVTT", ""]
+    number = 0
+    for entry in entries:
+        if entry["status"] != "ok" or not entry["text"]:
+            continue
+        number += 1
+        if srt:
+            lines.append(str(number))
+        lines.append(f"{format_timestamp(entry['start_ms'], separator)} --> "
+                     f"{format_timestamp(entry['end_ms'], separator)}")
+        lines.append(entry["text"])
+        lines.append("")
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    os.replace(temp_path, path)
+
+class TranscriptWriter:
+    """
+    Mantiene los fragmentos en memoria y los escribe con un solo archivo
+    abierto durante todo el proceso. Cada flush_every fragmentos se vacía el
+    búfer y se sincroniza con el disco. La transcripción completa final se
+    construye desde memoria, sin volver a leer el archivo.
+    Los fragmentos con marcas de tiempo se escriben también en los formatos
+    alineados de timed_formats.
+    """
+    def __init__(self, output_file, audio_path, flush_every=10, timed_formats=DEFAULT_TIMED_FORMATS):
+        self.output_file = output_file
+        self.audio_path = audio_path
+        self.flush_every = max(1, flush_every)
+        self.timed_formats = tuple(timed_formats or ())
+        self.fragments = {}
+        self.timings = {}
+        self.file = None
+        self.timed_file = None
+        self.pending = 0
+
+    def _open_timed(self, mode):
+        if "jsonl" in self.timed_formats:
+            self.timed_file = open(timed_path_for(self.output_file, "jsonl"), mode, encoding="utf-8")
+
+    def _write_timed(self, index):
+        if self.timed_file is None or index not in self.timings:
+            return
+        status, text = self.fragments[index]
+        entry = timed_entry(index, status, text, self.timings[index])
+        self.timed_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def open_new(self):
+        """
+        Crea el archivo con la cabecera (con BOM UTF-8)
+        """
+        self.file = open(self.output_file, "w", encoding="utf-8-sig")
+        self.file.write("Transcripcion de: " + self.audio_path + "\n")
+        self.file.write("Fecha: " + time.strftime('%Y-%m-%d %H:%M:%S') + "\n\n")
+        self._open_timed("w")
+        self.sync()
+
+    def open_existing(self, previous_texts=None, previous_timings=None):
+        """
+        Continúa un archivo existente. Los fragmentos previos se toman de
+        previous_texts ({indice: (estado, texto)}) o, si no se dan, se leen una
+        sola vez del archivo. previous_timings ({indice: (inicio, fin,
+        palabras relativas)}) permite reescribir también el archivo alineado.
+        Devuelve False si no existe el archivo.
+        """
+        try:
+            with open(self.output_file, "r", encoding="utf-8-sig") as f:
+                content = f.read()
+        except OSError:
+            return False
+
+        # Quitar una transcripción completa anterior para no duplicarla
+        if FULL_TRANSCRIPT_MARKER in content:
+            content = content.split(FULL_TRANSCRIPT_MARKER)[0].rstrip("\n") + "\n\n"
+            with open(self.output_file, "w", encoding="utf-8-sig") as f:
+                f.write(content)
+
+        if previous_texts:
+            self.fragments.update(previous_texts)
+        else:
+            for number, text in FRAGMENT_PATTERN.findall(content):
+                if text.startswith("[No se pudo") or text.startswith("[Error:"):
+                    continue
+                self.fragments[int(number) - 1] = ("ok", text)
+
+        # En modo "a" Python no repite el BOM si el archivo ya tiene contenido
+        self.file = open(self.output_file, "a", encoding="utf-8-sig")
+
+        # El archivo alineado se reescribe con los fragmentos previos conocidos
+        if previous_timings:
+            for index, (start_ms, end_ms, words) in previous_timings.items():
+                if index in self.fragments:
+                    self.timings[index] = (start_ms, end_ms, absolute_words(words, start_ms))
+        self._open_timed("w")
+        for index in sorted(self.timings):
+            self._write_timed(index)
+        return True
+
+    def add(self, index, status, text, start_ms=None, end_ms=None, words=None):
+        """
+        Registra un fragmento y lo escribe en el búfer del archivo. start_ms y
+        end_ms son la posición del fragmento en el audio y words sus marcas
+        de palabra (relativas al fragmento) si el reconocedor las da.
+        """
+        self.fragments[index] = (status, text)
+        if start_ms is not None:
+            self.timings[index] = (int(round(start_ms)), int(round(end_ms)), absolute_words(words, start_ms))
+            self._write_timed(index)
+        line = fragment_line(index, status, text)
+        if line is None:
+            return
+        self.file.write(line)
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.sync()
+
+    def full_text(self):
+        """
+        Texto completo de los fragmentos reconocidos, en orden
+        """
+        return " ".join(text for _, (status, text) in sorted(self.fragments.items()) if status == "ok")
+
+    def finish(self):
+        """
+        Añade la sección de transcripción completa
+        """
+        self.file.write("\n\n" + FULL_TRANSCRIPT_MARKER + "\n\n")
+        self.file.write(self.full_text())
+
+    def timed_entries(self):
+        """
+        Entradas alineadas de todos los fragmentos con marcas de tiempo, en orden
+        """
+        return [timed_entry(index, *self.fragments[index], self.timings[index])
+                for index in sorted(self.timings)]
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.timed_file is not None:
+            self.timed_file.flush()
+        self.pending = 0
+
+    def close(self):
+        if self.file is None:
+            return
+        try:
+            self.sync()
+            # Los subtítulos se generan una sola vez, desde memoria
+            for extension in ("vtt", "srt"):
+                if extension in self.timed_formats:
+                    write_subtitles(timed_path_for(self.output_file, extension), self.timed_entries(),
+                                    srt=extension == "srt")
+        finally:
+            self.file.close()
+            self.file = None
+            if self.timed_file is not None:
+                self.timed_file.close()
+                self.timed_file = None
@@ -0,0 +1,156 @@
+# Punto de control para reanudar transcripciones largas tras una caída
+import os
+import json
+import time
+import hashlib
+
+CHECKPOINT_VERSION = 1
+
+# Estados que no hace falta volver a enviar al reconocedor
+COMPLETED_STATUSES = ("ok", "unknown")
+
+def audio_hash(segment):
+    """
+    Calcula el hash del PCM de un fragmento para detectar si el audio cambió
+    """
+    return hashlib.sha1(segment.raw_data).hexdigest()
+
+def journal_path_for(checkpoint_path):
+    """
+    Diario de fragmentos pendientes de consolidar en el punto de control
+    """
+    return checkpoint_path + ".log"
+
+def checkpoint_path_for(output_file):
+    """
+    Ruta del archivo de control asociado a un archivo de transcripción
+    """
+    return os.path.splitext(output_file)[0] + ".checkpoint.json"
+
+class TranscriptionCheckpoint:
+    """
+    Archivo JSON junto a la transcripción que guarda, por cada fragmento, su
+    estado, el texto reconocido y el hash del audio. Cada fragmento se añade
+    como una línea JSON a un diario (<checkpoint>.log), sincronizado con el
+    disco para sobrevivir a una caída; el JSON completo solo se reescribe al
+    empezar y al consolidar con compact(), de modo que el coste por fragmento
+    no crece con la longitud de la grabación.
+    """
+    def __init__(self, path, audio_path, settings):
+        self.path = path
+        self.journal_path = journal_path_for(path)
+        self.audio_path = audio_path
+        self.settings = settings
+        self.fragments = {}
+        self.journal = None
+
+    def load(self):
+        """
+        Carga los fragmentos guardados si el archivo existe y se generó con la
+        misma configuración. Devuelve el número de fragmentos cargados.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            print(f"Aviso: no se pudo leer el punto de control {self.path}: {e}")
+            return 0
+
+        if data.get("version") != CHECKPOINT_VERSION or data.get("settings") != self.settings:
+            print("Aviso: el punto de control se generó con otra configuración. Se ignora.")
+            return 0
+
+        self.fragments = {int(index): entry for index, entry in data.get("fragments", {}).items()}
+        self._replay_journal()
+        return len(self.fragments)
+
+    def _replay_journal(self):
+        # Fragmentos registrados después del último JSON completo. Una última
+        # línea incompleta (caída a mitad de escritura) se descarta.
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    self.fragments[int(entry.pop("index"))] = entry
+        except FileNotFoundError:
+            pass
+
+    def completed(self, index, fragment_hash):
+        """
+        Devuelve la entrada guardada si el fragmento ya se transcribió con el
+        mismo audio, o None si hay que reconocerlo de nuevo
+        """
+        entry = self.fragments.get(index)
+        if entry and entry.get("status") in COMPLETED_STATUSES and entry.get("hash") == fragment_hash:
+            return entry
+        return None
+
+    def record(self, index, status, text, fragment_hash, start_ms=None, end_ms=None, words=None):
+        """
+        Registra el resultado de un fragmento y guarda el archivo. start_ms y
+        end_ms son su posición en el audio y words las marcas de palabra
+        relativas al fragmento, si las hay.
+        """
+        entry = {"status": status, "text": text, "hash": fragment_hash}
+        if start_ms is not None:
+            entry.update(start_ms=int(round(start_ms)), end_ms=int(round(end_ms)))
+        if words:
+            entry["words"] = words
+        self.fragments[index] = entry
+
+        if self.journal is None:
+            # Primera escritura de la ejecución: diario vacío y JSON completo
+            self.journal = open(self.journal_path, "w", encoding="utf-8")
+            self.save()
+        self.journal.write(json.dumps(dict(entry, index=index), ensure_ascii=False) + "\n")
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def compact(self):
+        """
+        Consolida el diario en el JSON completo y lo elimina
+        """
+        if self.journal is None:
+            return
+        self.journal.close()
+        self.journal = None
+        self.save()
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+
+    def entries_before(self, index):
+        """
+        Fragmentos anteriores a index como {indice: (estado, texto)}
+        """
+        return {i: (entry.get("status"), entry.get("text", ""))
+                for i, entry in self.fragments.items() if i < index}
+
+    def timings_before(self, index):
+        """
+        Marcas de tiempo de los fragmentos anteriores a index como
+        {indice: (inicio, fin, palabras)}
+        """
+        return {i: (entry["start_ms"], entry["end_ms"], entry.get("words"))
+                for i, entry in self.fragments.items() if i < index and "start_ms" in entry}
+
+    def save(self):
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "audio": self.audio_path,
+            "settings": self.settings,
+            "updated": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "fragments": {str(index): self.fragments[index] for index in sorted(self.fragments)},
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)